@@ -0,0 +1,54 @@
+"""
+Compares two result files of `benchmarks/suite.py`, e.g. of a branch against master.
+
+For every configuration present in both files, it prints the ratio of the new to the old throughput
+and p99 latency, and flags the configurations whose throughput dropped or whose p99 latency grew by
+more than `--threshold`. The exit status is 1 if any configuration regressed, so the comparison can
+gate a build.
+
+Usage: python benchmarks/compare.py master.json branch.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+KEY_FIELDS = ("bandit_type", "arms", "bandits", "operation", "threads", "processes")
+
+
+def load(path: str) -> Tuple[Dict[tuple, dict], dict]:
+    with open(path) as results_file:
+        report = json.load(results_file)
+    results = {tuple(result[field] for field in KEY_FIELDS): result for result in report["results"]}
+    return results, report["environment"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative change reported as a regression")
+    args = parser.parse_args()
+
+    old, old_environment = load(args.old)
+    new, new_environment = load(args.new)
+    print("old: {}  new: {}".format(old_environment.get("commit"), new_environment.get("commit")))
+
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        throughput = new[key]["throughput"] / old[key]["throughput"]
+        p99 = new[key]["latency_us"]["p99"] / old[key]["latency_us"]["p99"]
+        regressed = throughput < 1 - args.threshold or p99 > 1 + args.threshold
+        regressions += regressed
+        print("{:<18} arms={:<7} bandits={:<4} {:<14} threads={} processes={}  "
+              "throughput x{:.2f}  p99 x{:.2f}{}"
+              .format(*key, throughput, p99, "  REGRESSION" if regressed else ""))
+
+    print("{} of {} configurations regressed".format(regressions, len(old.keys() & new.keys())))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load generator of the pulpo decision server.
+
+Opens `--connections` keep-alive connections, each sending choose + update requests back to back for
+`--duration` seconds, with up to `--pipeline` pairs in flight per connection, and reports the
+sustained requests per second and the latency percentiles of each endpoint. Without `--port`, a
+server with `--bandits` Beta Thompson bandits of `--arms` arms is started in the same process.
+
+Usage: python benchmarks/load_generator.py --connections 64 --pipeline 4 --duration 10 [--port 8000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.metrics import perf_counter_ns
+from pulpo.pulpo import Pulpo
+from pulpo.server import PulpoServer
+
+
+def encode(path: str, payload: dict) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    head = "POST {} HTTP/1.1\r\nContent-Length: {}\r\n\r\n".format(path, len(body))
+    return head.encode("latin-1") + body
+
+
+async def read_body(reader: asyncio.StreamReader) -> dict:
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    length = next(int(line.split(":")[1]) for line in head.split("\r\n")
+                  if line.lower().startswith("content-length"))
+    return json.loads(await reader.readexactly(length))
+
+
+async def connection(host: str, port: int, bandit_ids: List[str], pipeline: int, deadline: float,
+                     latencies: Dict[str, List[int]]):
+    reader, writer = await asyncio.open_connection(host, port)
+    # Every choose + update pair holds a slot until the update is answered
+    slots = asyncio.Semaphore(pipeline)
+    in_flight: asyncio.Queue = asyncio.Queue()
+
+    def send(path: str, payload: dict):
+        writer.write(encode(path, payload))
+        in_flight.put_nowait((path, payload["bandit_id"], perf_counter_ns()))
+
+    async def receive():
+        while True:
+            item = await in_flight.get()
+            if item is None:
+                return
+            path, bandit_id, sent = item
+            response = await read_body(reader)
+            latencies[path].append(perf_counter_ns() - sent)
+            if path == "/choose":
+                send("/update", {"bandit_id": bandit_id, "arm_id": response["arm_id"],
+                                 "reward": float(random.random() < 0.5)})
+            else:
+                slots.release()
+
+    receiving = asyncio.ensure_future(receive())
+    while time.perf_counter() < deadline:
+        await slots.acquire()
+        send("/choose", {"bandit_id": random.choice(bandit_ids)})
+        await writer.drain()
+    for _ in range(pipeline):
+        await slots.acquire()
+    in_flight.put_nowait(None)
+    await receiving
+    writer.close()
+
+
+async def generate(args, port: int) -> Dict[str, List[int]]:
+    latencies: Dict[str, List[int]] = {"/choose": [], "/update": []}
+    bandit_ids = ["bandit" + str(i) for i in range(args.bandits)]
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*[connection(args.host, port, bandit_ids, args.pipeline, deadline,
+                                      latencies) for _ in range(args.connections)])
+    return latencies
+
+
+async def main_async(args):
+    if args.port:
+        return await generate(args, args.port)
+    arm_ids = ["arm" + str(i) for i in range(args.arms)]
+    pulpo = Pulpo([BanditFactory.make_bandit({"bandit_id": "bandit" + str(i),
+                                              "bandit_type": "beta_thompson", "arm_ids": arm_ids})
+                   for i in range(args.bandits)])
+    async with PulpoServer(pulpo, args.host, port=0) as server:
+        latencies = await generate(args, server.port)
+        coalescer = server.coalescer
+        print("coalescing: {:.1f} calls per batch"
+              .format(coalescer.n_calls / max(coalescer.n_batches, 1)))
+        return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None,
+                        help="port of a running server, else one is started")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--pipeline", type=int, default=4,
+                        help="choose + update pairs in flight per connection")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--bandits", type=int, default=10)
+    parser.add_argument("--arms", type=int, default=100)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    latencies = asyncio.new_event_loop().run_until_complete(main_async(args))
+    elapsed = time.perf_counter() - start
+    print("{:<8} {:>10} {:>10} {:>10} {:>10} {:>10}"
+          .format("path", "requests/s", "p50 ms", "p90 ms", "p99 ms", "p99.9 ms"))
+    for path, values in latencies.items():
+        p50, p90, p99, p999 = (np.percentile(values, [50, 90, 99, 99.9]) / 1e6 if values
+                               else [float("nan")] * 4)
+        print("{:<8} {:>10.0f} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+            path, len(values) / elapsed, p50, p90, p99, p999))
+
+
+if __name__ == "__main__":
+    main()
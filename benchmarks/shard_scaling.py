@@ -0,0 +1,62 @@
+"""
+Benchmark of ShardedPulpo across numbers of worker processes.
+
+Feedback for `--bandits` Beta Thompson bandits is sent in columnar chunks with `update_many`
+and the time until every shard has applied it is measured, followed by the rate of `choose`
+calls served from the shared state.
+
+Usage: python benchmarks/shard_scaling.py --processes 1 2 4 --bandits 1000 --events 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BanditConfig
+from pulpo.sharding import ShardedPulpo
+
+
+def run(num_processes: int, num_bandits: int, num_arms: int, num_events: int, chunk_size: int):
+    arm_ids = ["arm" + str(i) for i in range(num_arms)]
+    bandits = [BetaThompsonBandit.make_from_bandit_config(BanditConfig("bandit" + str(i), arm_ids))
+               for i in range(num_bandits)]
+    rng = np.random.default_rng(0)
+
+    with ShardedPulpo(bandits, n_shards=num_processes, batch_size=16 * chunk_size) as pulpo:
+        start = time.perf_counter()
+        for chunk in range(num_events // chunk_size):
+            bandit_id = "bandit" + str(chunk % num_bandits)
+            chunk_arm_ids = [arm_ids[i] for i in rng.integers(num_arms, size=chunk_size)]
+            pulpo.update_many(bandit_id, chunk_arm_ids, rng.random(chunk_size) < 0.1)
+        pulpo.flush()
+        update_rate = num_events / (time.perf_counter() - start)
+
+        num_decisions = 20000
+        start = time.perf_counter()
+        for i in range(num_decisions):
+            pulpo.choose("bandit" + str(i % num_bandits))
+        choose_rate = num_decisions / (time.perf_counter() - start)
+
+    return update_rate, choose_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--bandits", type=int, default=1000)
+    parser.add_argument("--arms", type=int, default=50)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    args = parser.parse_args()
+
+    print("{:>10} {:>16} {:>16}".format("processes", "updates/s", "chooses/s"))
+    for num_processes in args.processes:
+        update_rate, choose_rate = run(num_processes, args.bandits, args.arms, args.events,
+                                       args.chunk_size)
+        print("{:>10} {:>16.0f} {:>16.0f}".format(num_processes, update_rate, choose_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Benchmark suite of the hot path of Pulpo.
+
+For every bandit type of `BanditFactory.MAPPING` and every combination of arm and bandit counts, it
+measures the latency percentiles and the throughput of `Pulpo.choose` and `Pulpo.update`. With
+`--threads`, every thread serves choose + update pairs on a shared ThreadSafePulpo, and with
+`--processes`, feedback is applied by the worker processes of a ShardedPulpo. Each measurement runs
+for at least `--min-time` seconds.
+
+Results are written as JSON, with the commit and the environment of the run, so that two runs can be
+compared with `benchmarks/compare.py`.
+
+Usage: python benchmarks/suite.py --arms 10 1000 100000 --threads 1 4 --output results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.linear import LinearBandit
+from pulpo.metrics import perf_counter_ns
+from pulpo.pulpo import Pulpo
+from pulpo.thread_safe import ThreadSafePulpo
+
+PERCENTILES = (50, 90, 99, 99.9)
+# Linear bandits are benchmarked with a dense context of this many features
+NUM_FEATURES = 10
+FEATURES = ["feature" + str(i) for i in range(NUM_FEATURES)]
+
+
+def is_linear(bandit_type: str) -> bool:
+    return issubclass(BanditFactory.MAPPING[bandit_type], LinearBandit)
+
+
+def cells_per_arm(bandit_type: str) -> int:
+    """
+    :return: [int], approximate number of state values of an arm, i.e. d² + 2d for a linear bandit
+    of d features.
+    """
+    return NUM_FEATURES * NUM_FEATURES + 2 * NUM_FEATURES if is_linear(bandit_type) else 1
+
+
+def make_bandits(bandit_type: str, num_bandits: int, num_arms: int):
+    arm_ids = ["arm" + str(i) for i in range(num_arms)]
+    instruction = {"bandit_type": bandit_type, "arm_ids": arm_ids}
+    if is_linear(bandit_type):
+        instruction["parameters"] = {"features": FEATURES}
+    return [BanditFactory.make_bandit(dict(instruction, bandit_id="bandit" + str(i)))
+            for i in range(num_bandits)]
+
+
+def make_context(bandit_type: str, rng: np.random.Generator):
+    if not is_linear(bandit_type):
+        return None
+    return dict(zip(FEATURES, rng.random(NUM_FEATURES).tolist()))
+
+
+def measure(operation: Callable[[int], None], min_time: float, max_ops: int) -> Dict[str, object]:
+    """
+    Calls `operation` with increasing indices until `min_time` seconds or `max_ops` calls, timing
+    every call.
+    """
+    latencies = []
+    clock = perf_counter_ns
+    start = clock()
+    deadline = start + int(min_time * 1e9)
+    index = 0
+    while index < max_ops:
+        before = clock()
+        operation(index)
+        after = clock()
+        latencies.append(after - before)
+        index += 1
+        if after >= deadline:
+            break
+    return summarize(np.array(latencies), (clock() - start) / 1e9)
+
+
+def summarize(latencies_ns: np.ndarray, elapsed: float) -> Dict[str, object]:
+    return {
+        "ops": int(len(latencies_ns)),
+        "throughput": len(latencies_ns) / elapsed,
+        "latency_us": {"p" + str(percentile): float(value) / 1e3
+                       for percentile, value
+                       in zip(PERCENTILES, np.percentile(latencies_ns, PERCENTILES))}
+    }
+
+
+def bench_single(bandit_type: str, num_bandits: int, num_arms: int, args) -> List[dict]:
+    pulpo = Pulpo(make_bandits(bandit_type, num_bandits, num_arms))
+    rng = np.random.default_rng(0)
+    bandit_ids = ["bandit" + str(i) for i in rng.integers(num_bandits, size=args.max_ops)]
+    arm_ids = ["arm" + str(i) for i in rng.integers(num_arms, size=args.max_ops)]
+    rewards = rng.random(args.max_ops).tolist()
+    context = make_context(bandit_type, rng)
+
+    results = []
+    for operation, call in (
+            ("choose", lambda i: pulpo.choose(bandit_ids[i], context)),
+            ("update", lambda i: pulpo.update(bandit_ids[i], arm_ids[i], rewards[i],
+                                              context=context))):
+        result = measure(call, args.min_time, args.max_ops)
+        results.append(dict(operation=operation, threads=1, processes=0, **result))
+    return results
+
+
+def bench_threads(bandit_type: str, num_bandits: int, num_arms: int, num_threads: int,
+                  args) -> dict:
+    pulpo = ThreadSafePulpo(make_bandits(bandit_type, num_bandits, num_arms), merge_size=64)
+    bandit_ids = ["bandit" + str(i) for i in range(num_bandits)]
+    latencies = [None] * num_threads
+
+    def serve(thread: int):
+        rng = np.random.default_rng(thread)
+        ids = [bandit_ids[i] for i in rng.integers(num_bandits, size=args.max_ops)]
+        context = make_context(bandit_type, rng)
+        latencies[thread] = measure(
+            lambda i: pulpo.update(ids[i], pulpo.choose(ids[i], context), 1.0, context=context),
+            args.min_time, args.max_ops // num_threads)
+
+    threads = [threading.Thread(target=serve, args=(thread,)) for thread in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pulpo.flush()
+    elapsed = time.perf_counter() - start
+
+    ops = sum(latency["ops"] for latency in latencies)
+    return {"operation": "choose+update", "threads": num_threads, "processes": 0, "ops": ops,
+            "throughput": ops / elapsed,
+            "latency_us": {name: max(latency["latency_us"][name] for latency in latencies)
+                           for name in latencies[0]["latency_us"]}}
+
+
+def bench_processes(bandit_type: str, num_bandits: int, num_arms: int, num_processes: int,
+                    args) -> dict:
+    # Imported here, since pulpo.sharding requires Python 3.8+
+    from pulpo.sharding import ShardedPulpo
+
+    bandits = make_bandits(bandit_type, num_bandits, num_arms)
+    rng = np.random.default_rng(0)
+    bandit_ids = ["bandit" + str(i) for i in rng.integers(num_bandits, size=args.max_ops)]
+    arm_ids = ["arm" + str(i) for i in rng.integers(num_arms, size=args.max_ops)]
+    context = make_context(bandit_type, rng)
+
+    with ShardedPulpo(bandits, n_shards=num_processes) as pulpo:
+        start = time.perf_counter()
+        result = measure(lambda i: pulpo.update(bandit_ids[i], arm_ids[i], 1.0, context=context),
+                         args.min_time, args.max_ops)
+        pulpo.flush()
+        # The throughput includes the time the workers take to apply the buffered feedback
+        result["throughput"] = result["ops"] / (time.perf_counter() - start)
+    return dict(operation="update", threads=1, processes=num_processes, **result)
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, universal_newlines=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": sys.version.split()[0], "numpy": np.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bandit-types", nargs="+", default=list(BanditFactory.MAPPING))
+    parser.add_argument("--arms", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--bandits", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--threads", type=int, nargs="*", default=[4])
+    parser.add_argument("--processes", type=int, nargs="*", default=[2])
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per measurement")
+    parser.add_argument("--max-ops", type=int, default=100000, help="maximum calls per measurement")
+    parser.add_argument("--max-cells", type=int, default=10 ** 7,
+                        help="skips the runs whose bandits hold more state values, i.e. "
+                             "arms * bandits times d² + 2d for the linear bandits of d features")
+    parser.add_argument("--output", default=None,
+                        help="JSON file of the results, printed to stdout if omitted")
+    args = parser.parse_args()
+
+    results = []
+    for bandit_type in args.bandit_types:
+        for num_arms in args.arms:
+            for num_bandits in args.bandits:
+                if num_arms * num_bandits * cells_per_arm(bandit_type) > args.max_cells:
+                    continue
+                runs = bench_single(bandit_type, num_bandits, num_arms, args)
+                runs += [bench_threads(bandit_type, num_bandits, num_arms, num_threads, args)
+                         for num_threads in args.threads]
+                runs += [bench_processes(bandit_type, num_bandits, num_arms, num_processes, args)
+                         for num_processes in args.processes]
+                for run in runs:
+                    results.append(dict(bandit_type=bandit_type, arms=num_arms,
+                                        bandits=num_bandits, **run))
+                    print("{bandit_type:<18} arms={arms:<7} bandits={bandits:<4} {operation:<14} "
+                          "threads={threads} processes={processes} {throughput:>12.0f} ops/s "
+                          "p50={p50:.1f}us p99={p99:.1f}us"
+                          .format(p50=run["latency_us"]["p50"], p99=run["latency_us"]["p99"],
+                                  **results[-1]),
+                          file=sys.stderr)
+
+    report = json.dumps({"environment": environment(), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
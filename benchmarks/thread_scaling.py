@@ -0,0 +1,68 @@
+"""
+Stress benchmark of Pulpo shared by several threads.
+
+Every thread serves `--events` decisions on one shared bandit and posts a reward of 1 for each,
+so after the run the total `n` of the arms must have grown by threads * events. The benchmark
+reports the throughput and the number of lost updates per thread count, for the plain Pulpo
+and for ThreadSafePulpo.
+
+Usage: python benchmarks/thread_scaling.py --threads 1 2 4 8 --arms 100 --events 20000
+"""
+import argparse
+import threading
+import time
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BanditConfig
+from pulpo.pulpo import Pulpo
+from pulpo.thread_safe import ThreadSafePulpo
+
+
+def run(pulpo_class, num_threads: int, num_arms: int, num_events: int, merge_size: int):
+    bandit = BetaThompsonBandit.make_from_bandit_config(
+        BanditConfig("bandit", ["arm" + str(i) for i in range(num_arms)]))
+    if pulpo_class is ThreadSafePulpo:
+        pulpo = ThreadSafePulpo([bandit], merge_size=merge_size)
+    else:
+        pulpo = Pulpo([bandit])
+    initial_n = sum(arm.n for arm in bandit.arms_dict.values())
+
+    def serve():
+        for _ in range(num_events):
+            pulpo.update("bandit", pulpo.choose("bandit"), 1)
+
+    threads = [threading.Thread(target=serve) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if pulpo_class is ThreadSafePulpo:
+        pulpo.flush()
+    elapsed = time.perf_counter() - start
+
+    expected = num_threads * num_events
+    lost = expected - (sum(arm.n for arm in bandit.arms_dict.values()) - initial_n)
+    return expected / elapsed, int(round(lost))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--arms", type=int, default=100)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--merge-size", type=int, default=64)
+    args = parser.parse_args()
+
+    print("{:<16} {:>8} {:>14} {:>8}".format("pulpo", "threads", "events/s", "lost"))
+    for pulpo_class in (Pulpo, ThreadSafePulpo):
+        for num_threads in args.threads:
+            throughput, lost = run(pulpo_class, num_threads, args.arms, args.events,
+                                   args.merge_size)
+            print("{:<16} {:>8} {:>14.0f} {:>8}".format(pulpo_class.__name__, num_threads,
+                                                        throughput, lost))
+
+
+if __name__ == "__main__":
+    main()
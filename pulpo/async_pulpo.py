@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from pulpo.pulpo import Pulpo
+
+logger = logging.getLogger(__name__)
+
+_Event = Tuple[str, str, float, Optional[Dict[str, str]], Optional[str]]
+
+
+class AsyncPulpo:
+    """
+    Asyncio front-end of Pulpo.
+
+    Decisions are computed in the event loop, since a vectorized `choose` is cheaper than a hop to
+    an executor. Feedback is put in a bounded queue and applied in batches with
+    `Pulpo.update_events` by a background task, either when `flush_size` events are queued or
+    `flush_interval` seconds after the first event of the batch. Events stay in the queue until
+    their batch is applied, so when `max_pending` events are waiting, `update` waits too, which
+    propagates backpressure to the callers. As with `Pulpo.update_decision`, a rewarded decision is
+    only removed once its feedback is applied, so a decision whose feedback failed stays pending.
+
+    Usage:
+
+        async with AsyncPulpo(pulpo) as async_pulpo:
+            arm_id = await async_pulpo.choose(bandit_id)
+            await async_pulpo.update(bandit_id, arm_id, reward)
+    """
+
+    def __init__(self, pulpo: Pulpo, flush_interval: float = 0.05, flush_size: int = 1024,
+                 max_pending: int = 65536):
+        """
+        AsyncPulpo constructor.
+
+        :param pulpo: [Pulpo], pulpo instance whose bandits are served.
+        :param flush_interval: [float, default=0.05], maximum seconds a feedback event waits before
+        being applied.
+        :param flush_size: [int, default=1024], maximum number of feedback events applied in one
+        batch.
+        :param max_pending: [int, default=65536], maximum number of queued feedback events before
+        `update` waits.
+        """
+        self.pulpo: Pulpo = pulpo
+        self.flush_interval: float = flush_interval
+        self.flush_size: int = flush_size
+        self.max_pending: int = max_pending
+        self._queue: asyncio.Queue = None
+        self._batch_ready: asyncio.Event = None
+        self._flushing: int = 0
+        self._task: asyncio.Future = None
+        # Decisions whose reward is queued but not applied yet
+        self._rewarded: Set[int] = set()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def start(self):
+        """
+        Starts the background task that applies the feedback. Must be awaited in the event loop that
+        serves requests.
+        """
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._batch_ready = asyncio.Event()
+            self._task = asyncio.ensure_future(self._apply_feedback())
+
+    async def choose(self, bandit_id: str, context: Dict[str, str] = None,
+                     track: bool = False) -> Union[str, Tuple[str, int]]:
+        return self.pulpo.choose(bandit_id, context, track)
+
+    async def choose_many(self, bandit_id: str, k: int, context: Dict[str, str] = None,
+                          distinct: bool = False) -> List[str]:
+        return self.pulpo.choose_many(bandit_id, k, context, distinct)
+
+    async def update(self, bandit_id: str, arm_id: str, reward: float, payload: str = None,
+                     context: Dict[str, str] = None):
+        """
+        Queues feedback, waiting while the queue is full.
+        """
+        await self._put((bandit_id, arm_id, reward, context, payload), None)
+
+    async def update_decision(self, decision_id: int, reward: float, payload: str = None):
+        """
+        Queues the reward of a decision tracked by `choose`, waiting while the queue is full.
+        """
+        if self._task is None:
+            raise RuntimeError("AsyncPulpo must be started before receiving feedback")
+        if self.pulpo.decisions is None or decision_id in self._rewarded:
+            raise KeyError("Decision {} is unknown, expired or already rewarded"
+                           .format(decision_id))
+        bandit_id, arm_id, context = self.pulpo.decisions.get(decision_id)
+        self._rewarded.add(decision_id)
+        try:
+            await self._put((bandit_id, arm_id, reward, context, payload), decision_id)
+        except BaseException:
+            self._rewarded.discard(decision_id)
+            raise
+
+    async def flush(self):
+        """
+        Waits until all the queued feedback has been applied.
+        """
+        if self._task is None:
+            return
+        self._flushing += 1
+        self._batch_ready.set()
+        try:
+            await self._queue.join()
+        finally:
+            self._flushing -= 1
+
+    async def close(self):
+        """
+        Applies the queued feedback and stops the background task.
+        """
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _put(self, event: _Event, decision_id: Optional[int]):
+        if self._task is None:
+            raise RuntimeError("AsyncPulpo must be started before receiving feedback")
+        await self._queue.put((event, decision_id))
+        # The background task already holds the first event of the batch
+        if self._queue.qsize() >= self.flush_size - 1:
+            self._batch_ready.set()
+
+    async def _apply_feedback(self):
+        while True:
+            batch = await self._next_batch()
+            events, decision_ids = zip(*batch)
+            failed = set(range(len(events)))
+            try:
+                failures = self.pulpo.update_events(events)
+            except Exception:
+                logger.exception("Failed to apply a batch of %d feedback events", len(events))
+            else:
+                failed = {position for position, _ in failures}
+                if failures:
+                    position, error = failures[0]
+                    logger.error("Failed to apply %d of %d feedback events, e.g. %s: %r",
+                                 len(failures), len(events), events[position], error)
+            finally:
+                self._settle_decisions(decision_ids, failed)
+                for _ in events:
+                    self._queue.task_done()
+
+    def _settle_decisions(self, decision_ids: Tuple[Optional[int], ...], failed: Set[int]):
+        for position, decision_id in enumerate(decision_ids):
+            if decision_id is None:
+                continue
+            self._rewarded.discard(decision_id)
+            if position not in failed:
+                try:
+                    self.pulpo.decisions.pop(decision_id)
+                except KeyError:
+                    # Expired while its reward was queued
+                    pass
+
+    async def _next_batch(self) -> List[Tuple[_Event, Optional[int]]]:
+        batch = [await self._queue.get()]
+        if not self._flushing and self._queue.qsize() < self.flush_size - 1:
+            self._batch_ready.clear()
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < self.flush_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
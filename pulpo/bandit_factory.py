@@ -2,10 +2,17 @@ import json
 from typing import List, Dict
 
 from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.cached import CachedBandit
+from pulpo.bandits.contextual import ContextualBandit
 from pulpo.bandits.dataclasses import BanditConfig
 from pulpo.bandits.epsilon_greedy import EGreedy
 from pulpo.bandits.guassian_thompson import GaussianThompsonBandit
+from pulpo.bandits.lin_ucb import LinUCB
+from pulpo.bandits.linear_thompson import LinearThompsonBandit
 from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.bandits.probability_matching import ProbabilityMatchingBandit
+from pulpo.bandits.softmax import SoftmaxBandit
+from pulpo.bandits.ucb import UCB1, UCBV, KLUCB, BayesUCB
 from pulpo.constants import fields
 
 
@@ -13,7 +20,15 @@ class BanditFactory:
     MAPPING: Dict[str, OnlineBandit] = {
         'epsilon_greedy': EGreedy,
         'gaussian_thompson': GaussianThompsonBandit,
-        'beta_thompson': BetaThompsonBandit}
+        'beta_thompson': BetaThompsonBandit,
+        'lin_ucb': LinUCB,
+        'linear_thompson': LinearThompsonBandit,
+        'softmax': SoftmaxBandit,
+        'probability_matching': ProbabilityMatchingBandit,
+        'ucb1': UCB1,
+        'ucb_v': UCBV,
+        'kl_ucb': KLUCB,
+        'bayes_ucb': BayesUCB}
 
     @staticmethod
     def make_bandits_list(instructions: str) -> List[OnlineBandit]:
@@ -25,7 +40,61 @@ class BanditFactory:
         config: BanditConfig = BanditFactory.parse_bandit_config(instruction)
         bandit_type = instruction.get(fields.BANDIT_TYPE)
         bandit_class = BanditFactory.MAPPING.get(bandit_type)
-        return bandit_class.make_from_bandit_config(config)
+        bandit = bandit_class.make_from_bandit_config(config)
+        if config.parameters and config.parameters.get(fields.MAX_CONTEXTS):
+            bandit = ContextualBandit(bandit, config.parameters[fields.MAX_CONTEXTS])
+        if config.parameters and config.parameters.get(fields.CACHE_SIZE):
+            bandit = CachedBandit(bandit, config.parameters[fields.CACHE_SIZE],
+                                  config.parameters.get(fields.CACHE_UPDATES),
+                                  config.parameters.get(fields.CACHE_TTL))
+        return bandit
+
+    @staticmethod
+    def make_from_bandit_config(config: BanditConfig) -> OnlineBandit:
+        """
+        Makes a bandit from the config of a contextual or cached bandit, whose parameters name the
+        bandit type of the wrapped bandit (see `bandit_type`).
+        """
+        parameters = dict(config.parameters or {})
+        bandit_type = parameters.pop(fields.BANDIT_TYPE, None)
+        if bandit_type not in BanditFactory.MAPPING:
+            raise ValueError("Unknown bandit type {} of wrapped bandit {}"
+                             .format(bandit_type, config.bandit_id))
+        return BanditFactory.make_bandit({fields.BANDIT_ID: config.bandit_id,
+                                          fields.BANDIT_TYPE: bandit_type,
+                                          fields.ARM_IDS: config.arm_ids,
+                                          fields.PRIORS: config.priors,
+                                          fields.PARAMETERS: parameters})
+
+    @staticmethod
+    def bandit_type(bandit: OnlineBandit) -> str:
+        """
+        :return: [str], bandit type of the bandit, or of the bandit wrapped by a contextual or
+        cached bandit.
+        """
+        while isinstance(bandit, (CachedBandit, ContextualBandit)):
+            bandit = bandit.bandit
+        bandit_types = {bandit_class: bandit_type
+                        for bandit_type, bandit_class in BanditFactory.MAPPING.items()}
+        return bandit_types[type(bandit)]
+
+    @staticmethod
+    def make_instruction(bandit: OnlineBandit) -> dict:
+        """
+        Inverse of `make_bandit`: describes a bandit as a JSON serializable instruction, without its
+        learned state.
+        """
+        config: BanditConfig = bandit.to_bandit_config()
+        instruction = {fields.BANDIT_ID: config.bandit_id,
+                       fields.BANDIT_TYPE: BanditFactory.bandit_type(bandit),
+                       fields.ARM_IDS: config.arm_ids}
+        parameters = {name: value for name, value in (config.parameters or {}).items()
+                      if name != fields.BANDIT_TYPE}
+        if config.priors:
+            instruction[fields.PRIORS] = config.priors
+        if parameters:
+            instruction[fields.PARAMETERS] = parameters
+        return instruction
 
     @staticmethod
     def parse_bandit_config(bandit_config) -> BanditConfig:
@@ -0,0 +1,160 @@
+from abc import abstractmethod
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from pulpo.bandits.alias_table import AliasTable
+from pulpo.bandits.arm_store import ArmStore
+from pulpo.bandits.dataclasses import Arm, EpsilonGreedyArm, Feedback
+from pulpo.bandits.decay import make_arm_store
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.constants import fields
+
+
+class AliasBandit(OnlineBandit):
+    """
+    Base class of the bandits that choose every arm with a probability derived from the mean
+    rewards, such as softmax and probability matching.
+
+    The distribution is kept in an `AliasTable`, so a decision costs O(1) instead of O(n_arms). The
+    table is not rebuilt with every update: updates only add the change of the mean reward of their
+    arms, relative to the scale of the policy (see `_drift_scale`), to the drift of the arms, and
+    the table is rebuilt by the update after which the total or the largest drift, depending on the
+    policy (see `_drift`), exceeds `rebuild_tolerance`, so the O(n_arms) rebuild is amortized over
+    many updates. Decisions only read the state arrays, so they can be made from read-only state,
+    e.g. by the readers of a `MappedPulpo`, and without a lock next to the thread that updates, e.g.
+    in a `ThreadSafePulpo`. Decayed and windowed statistics change their means with time, so with
+    them the distribution is computed for every decision instead.
+    """
+    _DEFAULT_N = 1
+    _DEFAULT_REWARD_SUM = 0
+    _DEFAULT_REBUILD_TOLERANCE = 0.05
+
+    def __init__(self, bandit_id: str, arms: List[EpsilonGreedyArm],
+                 rebuild_tolerance: float = 0.05, seed: int = None, half_life: float = None,
+                 window: float = None):
+        """
+        :param arms: [List[EpsilonGreedyArm]], arms with their prior statistics.
+        :param rebuild_tolerance: [float, default=0.05], drift after which the alias table is
+        rebuilt.
+        :param seed: [int, default=None], seed of the random generator of the bandit
+        :param half_life: [float, default=None], if given, the statistics decay with this half life
+        in seconds
+        :param window: [float, default=None], if given, the statistics only count the feedback of
+        the last `window` seconds
+        """
+        super().__init__(bandit_id, seed)
+        self.rebuild_tolerance: float = rebuild_tolerance
+        self.store: ArmStore = make_arm_store(EpsilonGreedyArm, arms, half_life, window)
+        self.table: AliasTable = (AliasTable(len(self.store)) if type(self.store) is ArmStore
+                                  else None)
+        # Drift of every arm since the last rebuild, then their total, their maximum and the scale
+        # of the policy
+        self.drift: np.ndarray = np.zeros(len(self.store))
+        self.drift_totals: np.ndarray = np.zeros(3)
+        if self.table is not None:
+            self._rebuild()
+
+    @abstractmethod
+    def probabilities(self, means: np.ndarray) -> np.ndarray:
+        """
+        :param means: [np.ndarray], mean reward of every arm.
+        :return: [np.ndarray], probability, or any weight proportional to it, of choosing every arm.
+        """
+        pass
+
+    @abstractmethod
+    def _drift_scale(self, means: np.ndarray) -> float:
+        """
+        :return: [float], change of a mean reward that counts as a drift of 1, at the given means.
+        """
+        pass
+
+    @abstractmethod
+    def _drift(self) -> float:
+        """
+        :return: [float], drift of the distribution since the last rebuild, e.g.
+        `self.drift_totals[0]` for the total drift or `self.drift_totals[1]` for the largest drift
+        of an arm.
+        """
+        pass
+
+    @property
+    def arms_dict(self) -> Dict[str, EpsilonGreedyArm]:
+        return self.store.arms()
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        if self.table is None:
+            return self.store.state_arrays()
+        return {**self.store.state_arrays(), fields.ALIAS_PROBABILITIES: self.table.probabilities,
+                fields.ALIAS_INDICES: self.table.aliases, fields.ALIAS_DRIFT: self.drift,
+                fields.ALIAS_DRIFT_TOTALS: self.drift_totals}
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.store.bind_state(arrays)
+        if self.table is not None:
+            self.table.bind(arrays[fields.ALIAS_PROBABILITIES], arrays[fields.ALIAS_INDICES])
+            self.drift = arrays[fields.ALIAS_DRIFT]
+            self.drift_totals = arrays[fields.ALIAS_DRIFT_TOTALS]
+
+    def reset(self):
+        self.store.fill({fields.N: 0.001, fields.REWARD_SUM: 0})
+        if self.table is not None:
+            self._rebuild()
+
+    def choose(self, context=None) -> Arm:
+        if self.table is None:
+            return self.store.arm(int(self.rng.choice(len(self.store), p=self._distribution())))
+        return self.store.arm(self.table.sample(self.rng))
+
+    def choose_many(self, k: int, context=None, distinct: bool = False) -> List[Arm]:
+        if distinct:
+            # Arms are drawn in turn without replacement, so the table does not apply
+            size = min(k, len(self.store))
+            return self.store.arms_at(self.rng.choice(len(self.store), size=size, replace=False,
+                                                      p=self._distribution()))
+        if self.table is None:
+            return self.store.arms_at(self.rng.choice(len(self.store), size=k,
+                                                      p=self._distribution()))
+        return self.store.arms_at(self.table.sample_many(self.rng, k))
+
+    def check_feedback(self, feedback: Feedback):
+        self.store.position(feedback.arm_id)
+
+    def update(self, feedback: Feedback):
+        position = self.store.position(feedback.arm_id)
+        before = self._mean(position)
+        self.store.add(position, {fields.N: 1, fields.REWARD_SUM: feedback.reward})
+        if self.table is not None:
+            self._add_drift(position, abs(self._mean(position) - before))
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None):
+        rewards = np.asarray(rewards, dtype=np.float64)
+        positions = self.store.positions(arm_ids)
+        touched = np.unique(positions)
+        before = self._mean(touched)
+        self.store.add_many(positions, {fields.N: 1, fields.REWARD_SUM: rewards})
+        if self.table is not None:
+            self._add_drift(touched, np.abs(self._mean(touched) - before))
+
+    def _mean(self, positions):
+        return self.store[fields.REWARD_SUM][positions] / self.store[fields.N][positions]
+
+    def _add_drift(self, positions, changes):
+        drift = self.drift[positions] + changes / self.drift_totals[2]
+        self.drift[positions] = drift
+        self.drift_totals[0] += np.sum(changes) / self.drift_totals[2]
+        self.drift_totals[1] = max(self.drift_totals[1], np.max(drift))
+        if self._drift() > self.rebuild_tolerance:
+            self._rebuild()
+
+    def _distribution(self) -> np.ndarray:
+        probabilities = self.probabilities(self.store[fields.REWARD_SUM] / self.store[fields.N])
+        return probabilities / np.sum(probabilities)
+
+    def _rebuild(self):
+        means = self.store[fields.REWARD_SUM] / self.store[fields.N]
+        self.table.build(self.probabilities(means))
+        self.drift[:] = 0
+        self.drift_totals[:] = 0, 0, self._drift_scale(means)
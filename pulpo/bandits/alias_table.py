@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class AliasTable:
+    """
+    Walker alias table of a discrete distribution over n items, for O(1) sampling.
+
+    Every item has a slot holding the probability of keeping the item and the position of its alias,
+    so a draw picks a slot uniformly and keeps it or takes its alias, with a single uniform random
+    number. The table is built in O(n log n) with vectorized operations (see `build`). As with
+    `TournamentTree`, the table is made of float64 arrays, so it can be kept in state arrays with
+    the statistics it is built from.
+    """
+
+    def __init__(self, n_items: int, probabilities: np.ndarray = None, aliases: np.ndarray = None):
+        """
+        Constructor of AliasTable
+
+        :param n_items: [int], number of items.
+        :param probabilities: [np.ndarray, default=None], array of `n_items` slots to use as storage
+        of the probabilities of keeping the items. Must be built with `build` unless it holds a
+        table already.
+        :param aliases: [np.ndarray, default=None], array of `n_items` slots to use as storage of
+        the aliases.
+        """
+        self.n_items: int = n_items
+        self.bind(np.ones(n_items) if probabilities is None else probabilities,
+                  np.arange(n_items, dtype=np.float64) if aliases is None else aliases)
+
+    def bind(self, probabilities: np.ndarray, aliases: np.ndarray):
+        for array in (probabilities, aliases):
+            if array.shape != (self.n_items,):
+                raise ValueError("Expected storage of shape {}, got {}"
+                                 .format((self.n_items,), array.shape))
+        self.probabilities: np.ndarray = probabilities
+        self.aliases: np.ndarray = aliases
+
+    def build(self, weights: np.ndarray):
+        """
+        Builds the table of the distribution proportional to `weights`.
+
+        Vose's algorithm pairs the items below the average weight, the small ones, with items above
+        it, the large ones, one at a time. Here the pairing is found at once: the deficits of the
+        small items and the surpluses of the large items are laid end to end, a small item is
+        aliased to the large item whose surplus covers the start of its deficit, and a large item
+        whose surplus runs out within a deficit becomes small by the overdraft and is aliased to the
+        next large item.
+
+        :param weights: [np.ndarray], non-negative weights of the items, not all zero.
+        """
+        scaled = np.asarray(weights, dtype=np.float64) * (self.n_items / np.sum(weights))
+        small = np.flatnonzero(scaled < 1)
+        large = np.flatnonzero(scaled >= 1)
+        self.probabilities[:] = 1
+        self.aliases[:] = np.arange(self.n_items)
+        if not len(small) or not len(large):
+            # All the weights are equal, up to rounding
+            return
+
+        deficit_ends = np.cumsum(1 - scaled[small])
+        deficit_starts = deficit_ends - (1 - scaled[small])
+        surplus_ends = np.cumsum(scaled[large] - 1)
+        last = len(large) - 1
+
+        self.probabilities[small] = scaled[small]
+        covering = np.searchsorted(surplus_ends, deficit_starts, side='right')
+        self.aliases[small] = large[np.minimum(covering, last)]
+
+        crossing = np.searchsorted(deficit_starts, surplus_ends[:last], side='left') - 1
+        overdrafts = np.where(crossing >= 0,
+                              deficit_ends[np.maximum(crossing, 0)] - surplus_ends[:last], 0)
+        overdrawn = overdrafts > 0
+        self.probabilities[large[:last][overdrawn]] = np.maximum(1 - overdrafts[overdrawn], 0)
+        self.aliases[large[:last][overdrawn]] = large[1:][overdrawn]
+
+    def sample(self, rng: np.random.Generator) -> int:
+        draw = rng.random() * self.n_items
+        position = int(draw)
+        if draw - position < self.probabilities[position]:
+            return position
+        return int(self.aliases[position])
+
+    def sample_many(self, rng: np.random.Generator, k: int) -> np.ndarray:
+        draws = rng.random(k) * self.n_items
+        positions = draws.astype(np.int64)
+        keep = draws - positions < self.probabilities[positions]
+        return np.where(keep, positions, self.aliases[positions].astype(np.int64))
+
+    def distribution(self) -> np.ndarray:
+        """
+        :return: [np.ndarray], probability of every item under the table, e.g. to check it.
+        """
+        aliased = np.bincount(self.aliases.astype(np.int64), weights=1 - self.probabilities,
+                              minlength=self.n_items)
+        return (self.probabilities + aliased) / self.n_items
@@ -0,0 +1,175 @@
+from dataclasses import fields as dataclass_fields
+from functools import lru_cache
+from typing import Dict, List, Sequence, Type, Union
+
+import numpy as np
+
+from pulpo.bandits.dataclasses import Arm
+from pulpo.constants import fields
+
+
+def top_k_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    :return: [np.ndarray], positions of the k highest scores, highest first.
+    """
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+@lru_cache(maxsize=None)
+def _numeric_fields(arm_class: Type[Arm]) -> List[str]:
+    return [field.name for field in dataclass_fields(arm_class) if field.name != 'arm_id']
+
+
+class ArmStore:
+    """
+    Struct-of-arrays storage for the statistics of the arms of a bandit.
+
+    Every numeric field of the arm dataclass (e.g. `n`, `reward_sum`) is kept as a contiguous
+    float64 row of `data`, so that scoring all the arms is a single vectorized operation.
+    Arms are addressed by position, which is resolved from the arm id through `index`.
+    """
+
+    def __init__(self, arm_class: Type[Arm], arm_ids: List[str], data: np.ndarray = None):
+        """
+        Constructor of ArmStore
+
+        :param arm_class: [Type[Arm]], arm dataclass whose numeric fields are stored.
+        :param arm_ids: [List[str]], ids of the arms, in storage order.
+        :param data: [np.ndarray, default=None], array of shape (n_fields, n_arms) to use as
+        storage. A zero-filled array is allocated when omitted.
+        """
+        self.arm_class: Type[Arm] = arm_class
+        self.fields: List[str] = _numeric_fields(arm_class)
+        self.arm_ids: List[str] = list(arm_ids)
+        self.index: Dict[str, int] = {arm_id: position
+                                      for position, arm_id in enumerate(self.arm_ids)}
+
+        if data is None:
+            data = np.zeros((len(self.fields), len(self.arm_ids)))
+        self.bind(data)
+
+    @classmethod
+    def from_arms(cls, arm_class: Type[Arm], arms: List[Arm], **options):
+        """
+        Alternate constructor that copies the statistics of a list of arm dataclasses.
+
+        :param arm_class: [Type[Arm]], arm dataclass whose numeric fields are stored.
+        :param arms: [List[Arm]], arms to copy, in storage order.
+        :param options: keyword arguments of the constructor of the store class.
+        """
+        store = cls(arm_class, [arm.arm_id for arm in arms], **options)
+        store.data[...] = [[getattr(arm, field) for arm in arms] for field in store.fields]
+        return store
+
+    def parameters(self) -> Dict[str, float]:
+        """
+        :return: [Dict[str, float]], bandit parameters that select this kind of store, see
+        `make_arm_store`.
+        """
+        return {}
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        :return: [Dict[str, np.ndarray]], arrays holding the statistics, see
+        `OnlineBandit.state_arrays`.
+        """
+        return {fields.ARM_STATISTICS: self.data}
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        """
+        Makes the store use the given arrays, with the keys and shapes of `state_arrays`, as its
+        storage.
+        """
+        self.bind(arrays[fields.ARM_STATISTICS])
+
+    def bind(self, data: np.ndarray):
+        """
+        Makes the store use `data` as its storage, e.g. a view of a shared memory block. No values
+        are copied.
+
+        :param data: [np.ndarray], float64 array of shape (n_fields, n_arms).
+        """
+        if data.shape != (len(self.fields), len(self.arm_ids)):
+            raise ValueError("Expected storage of shape {}, got {}"
+                             .format((len(self.fields), len(self.arm_ids)), data.shape))
+        self.data: np.ndarray = data
+        self._rows: Dict[str, np.ndarray] = dict(zip(self.fields, data))
+
+    def __len__(self) -> int:
+        return len(self.arm_ids)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        """
+        :return: [np.ndarray], values of `field` for all the arms. The array must be treated as
+        read-only.
+        """
+        return self._rows[field]
+
+    def position(self, arm_id: str) -> int:
+        return self.index[arm_id]
+
+    def positions(self, arm_ids: Sequence[str]) -> np.ndarray:
+        """
+        :return: [np.ndarray], position of each of the given arm ids.
+        """
+        return np.fromiter(map(self.index.__getitem__, arm_ids), dtype=np.intp, count=len(arm_ids))
+
+    def add(self, position: int, increments: Dict[str, float]):
+        """
+        Adds increments to the statistics of one arm
+
+        :param position: [int], position of the arm.
+        :param increments: [Dict[str, float]], increment per field.
+        """
+        for field, increment in increments.items():
+            self._rows[field][position] += increment
+
+    def add_many(self, positions: np.ndarray, increments: Dict[str, Union[float, np.ndarray]]):
+        """
+        Adds a batch of increments, which may repeat arms. The increments are first summed per arm,
+        so that every arm of the batch is written once per field.
+
+        :param positions: [np.ndarray], position of the arm of each increment.
+        :param increments: [Dict[str, Union[float, np.ndarray]]], increments per field, either one
+        value per position or a scalar that applies to every position.
+        """
+        touched, inverse = np.unique(positions, return_inverse=True)
+        for field, increment in increments.items():
+            weights = np.broadcast_to(np.asarray(increment, dtype=np.float64), positions.shape)
+            self._rows[field][touched] += np.bincount(inverse, weights=weights,
+                                                      minlength=len(touched))
+
+    def fill(self, values: Dict[str, float]):
+        """
+        Sets the statistics of all the arms to the same values
+
+        :param values: [Dict[str, float]], value per field.
+        """
+        for field, value in values.items():
+            self._rows[field][:] = value
+
+    def arm(self, position: int) -> Arm:
+        """
+        :return: [Arm], arm dataclass holding a copy of the statistics of the arm at `position`.
+        """
+        return self.arm_class(self.arm_ids[position],
+                              *[float(value) for value in self.data[:, position]])
+
+    def arms_at(self, positions) -> List[Arm]:
+        """
+        :return: [List[Arm]], arm dataclasses for each of the given positions.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        # One gather per field and one conversion to Python floats, instead of one per arm
+        values = np.stack([self[field][positions] for field in self.fields], axis=1).tolist()
+        return [self.arm_class(self.arm_ids[position], *arm_values)
+                for position, arm_values in zip(positions.tolist(), values)]
+
+    def arms(self) -> Dict[str, Arm]:
+        """
+        :return: [Dict[str, Arm]], arm dataclasses keyed by arm id.
+        """
+        return {arm_id: self.arm(position) for position, arm_id in enumerate(self.arm_ids)}
@@ -1,7 +1,9 @@
-from typing import Dict, List
+from typing import Dict, List, Sequence
 
 import numpy as np
 
+from pulpo.bandits.arm_store import ArmStore, top_k_positions
+from pulpo.bandits.decay import make_arm_store
 from pulpo.bandits.dataclasses import Feedback, Arm, BetaArm, BanditConfig
 from pulpo.bandits.online_bandits import OnlineBandit
 from pulpo.constants import fields
@@ -11,9 +13,10 @@ class BetaThompsonBandit(OnlineBandit):
     _DEFAULT_N_REWARDS = 1
     _DEFAULT_N = 2
 
-    def __init__(self, bandit_id: str, arms: List[BetaArm]):
-        super().__init__(bandit_id)
-        self.arms_dict: Dict[str, BetaArm] = {arm.arm_id: arm for arm in arms}
+    def __init__(self, bandit_id: str, arms: List[BetaArm], seed: int = None,
+                 half_life: float = None, window: float = None):
+        super().__init__(bandit_id, seed)
+        self.store: ArmStore = make_arm_store(BetaArm, arms, half_life, window)
 
     @classmethod
     def make_from_bandit_config(cls, config: BanditConfig):
@@ -27,21 +30,56 @@ class BetaThompsonBandit(OnlineBandit):
 
         arms = [BetaArm(arm_id=arm_id, n=prior_n, n_rewards=n_rewards) for arm_id in config.arm_ids]
 
-        return cls(config.bandit_id, arms)
+        parameters = config.parameters or {}
+
+        return cls(config.bandit_id, arms, parameters.get(fields.SEED),
+                   parameters.get(fields.HALF_LIFE), parameters.get(fields.WINDOW))
+
+    def to_bandit_config(self) -> BanditConfig:
+        return BanditConfig(self.bandit_id, self.store.arm_ids,
+                            parameters={**self.store.parameters(),
+                                        **self._seed_parameters()} or None)
+
+    @property
+    def arms_dict(self) -> Dict[str, BetaArm]:
+        return self.store.arms()
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        return self.store.state_arrays()
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.store.bind_state(arrays)
 
     def choose(self, context: Dict[str, str] = None) -> Arm:
-        arms = list(self.arms_dict.values())
-        return max(arms, key=self._get_score)
+        return self.store.arm(int(np.argmax(self._sample_store_scores())))
+
+    def choose_many(self, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[Arm]:
+        if distinct:
+            return self.store.arms_at(top_k_positions(self._sample_store_scores(), k))
+        scores = self._sample_store_scores(size=(k, len(self.store)))
+        return self.store.arms_at(np.argmax(scores, axis=1))
+
+    def check_feedback(self, feedback: Feedback):
+        self.store.position(feedback.arm_id)
 
     def update(self, feedback: Feedback):
-        arm = self.arms_dict[feedback.arm_id]
-        arm.n += 1
-        arm.n_rewards += feedback.reward
+        position = self.store.position(feedback.arm_id)
+        self.store.add(position, {fields.N: 1, fields.N_REWARDS: feedback.reward})
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None):
+        rewards = np.asarray(rewards, dtype=np.float64)
+        self.store.add_many(self.store.positions(arm_ids), {fields.N: 1, fields.N_REWARDS: rewards})
 
     def reset(self):
-        for arm in self.arms_dict.values():
-            arm.n = 2
-            arm.n_rewards = 1
+        self.store.fill({fields.N: 2, fields.N_REWARDS: 1})
+
+    def _sample_store_scores(self, size=None) -> np.ndarray:
+        return self._sample_scores(self.rng, self.store[fields.N], self.store[fields.N_REWARDS],
+                                   size)
 
-    def _get_score(self, arm: BetaArm):
-        return np.random.beta(arm.n_rewards, arm.n - arm.n_rewards)
+    @staticmethod
+    def _sample_scores(rng: np.random.Generator, n: np.ndarray, n_rewards: np.ndarray,
+                       size=None) -> np.ndarray:
+        return rng.beta(n_rewards, n - n_rewards, size)
@@ -0,0 +1,138 @@
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from pulpo.bandits.contextual import context_hash
+from pulpo.bandits.dataclasses import Arm, BanditConfig, Feedback
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.constants import fields
+
+
+class CachedBandit(OnlineBandit):
+    """
+    Serving mode of a bandit for read-heavy traffic: decisions are precomputed in blocks of
+    `cache_size` with one vectorized `choose_many` call, e.g. 10k pre-sampled Thompson decisions,
+    and `choose` returns the next decision of the block, in O(1).
+
+    The decisions of a block are as stale as the state the block was drawn from. All the blocks are
+    dropped after `cache_updates` feedback events or `cache_ttl` seconds, whichever comes first, and
+    are drawn again on demand. A block is kept for every discrete context, up to
+    `max_cached_contexts`, beyond which decisions are not cached. The state is the state of the
+    wrapped bandit.
+    """
+
+    def __init__(self, bandit: OnlineBandit, cache_size: int = 10000, cache_updates: int = None,
+                 cache_ttl: float = None, max_cached_contexts: int = 64,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Constructor of CachedBandit
+
+        :param bandit: [OnlineBandit], bandit whose decisions are cached.
+        :param cache_size: [int, default=10000], number of decisions drawn at once.
+        :param cache_updates: [int, default=None], number of feedback events after which the
+        decisions are drawn again. Never if None.
+        :param cache_ttl: [float, default=None], seconds after which the decisions are drawn again.
+        Never if None.
+        :param max_cached_contexts: [int, default=64], maximum number of contexts with a block of
+        decisions.
+        :param clock: [Callable[[], float], default=time.monotonic], current time in seconds.
+        """
+        super().__init__(bandit.bandit_id, bandit.seed)
+        self.bandit: OnlineBandit = bandit
+        self.cache_size: int = cache_size
+        self.cache_updates: Optional[int] = cache_updates
+        self.cache_ttl: Optional[float] = cache_ttl
+        self.max_cached_contexts: int = max_cached_contexts
+        self.clock: Callable[[], float] = clock
+        self._blocks: Dict[int, Iterator[Arm]] = {}
+        self._updates: int = 0
+        self._expires_at: Optional[float] = None
+
+    @classmethod
+    def make_from_bandit_config(cls, config: BanditConfig):
+        """
+        Makes the bandit with `BanditFactory`, from a config written by `to_bandit_config`, which
+        names the bandit type of the wrapped bandit.
+        """
+        # Imported here, since the factory imports this module
+        from pulpo.bandit_factory import BanditFactory
+        return BanditFactory.make_from_bandit_config(config)
+
+    def to_bandit_config(self) -> BanditConfig:
+        from pulpo.bandit_factory import BanditFactory
+        config = self.bandit.to_bandit_config()
+        parameters = dict(config.parameters or {})
+        parameters[fields.BANDIT_TYPE] = BanditFactory.bandit_type(self.bandit)
+        parameters[fields.CACHE_SIZE] = self.cache_size
+        if self.cache_updates is not None:
+            parameters[fields.CACHE_UPDATES] = self.cache_updates
+        if self.cache_ttl is not None:
+            parameters[fields.CACHE_TTL] = self.cache_ttl
+        return BanditConfig(config.bandit_id, config.arm_ids, config.priors, parameters)
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        return self.bandit.state_arrays()
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.bandit.bind_state(arrays)
+        self.invalidate()
+
+    def exploration_counts(self):
+        return self.bandit.exploration_counts()
+
+    def invalidate(self):
+        """
+        Drops the precomputed decisions, e.g. after the state of the wrapped bandit was changed
+        directly.
+        """
+        self._blocks = {}
+        self._updates = 0
+        self._expires_at = None
+
+    def choose(self, context: Dict[str, str] = None) -> Arm:
+        if self._expires_at is not None and self.clock() >= self._expires_at:
+            self.invalidate()
+        key = context_hash(context)
+        block = self._blocks.get(key)
+        if block is not None:
+            arm = next(block, None)
+            if arm is not None:
+                return arm
+        elif len(self._blocks) >= self.max_cached_contexts:
+            return self.bandit.choose(context)
+        return self._draw(key, context)
+
+    def choose_many(self, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[Arm]:
+        if distinct:
+            return self.bandit.choose_many(k, context, distinct)
+        return [self.choose(context) for _ in range(k)]
+
+    def check_feedback(self, feedback: Feedback):
+        self.bandit.check_feedback(feedback)
+
+    def update(self, feedback: Feedback):
+        self.bandit.update(feedback)
+        self._count_updates(1)
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None):
+        self.bandit.update_many(arm_ids, rewards, context)
+        self._count_updates(len(arm_ids))
+
+    def reset(self):
+        self.bandit.reset()
+        self.invalidate()
+
+    def _count_updates(self, n_updates: int):
+        self._updates += n_updates
+        if self.cache_updates is not None and self._updates >= self.cache_updates:
+            self.invalidate()
+
+    def _draw(self, key: int, context: Optional[Dict[str, str]]) -> Arm:
+        if self._expires_at is None and self.cache_ttl is not None:
+            self._expires_at = self.clock() + self.cache_ttl
+        block = iter(self.bandit.choose_many(self.cache_size, context))
+        self._blocks[key] = block
+        return next(block)
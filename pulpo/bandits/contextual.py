@@ -0,0 +1,197 @@
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pulpo.bandits.dataclasses import Arm, BanditConfig, Feedback
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.constants import fields
+
+
+def _hash_bytes(encoded: bytes) -> int:
+    # 52 bits, so that the hash is stored exactly in a float64 state array, and never 0, which marks
+    # a free slot
+    return (int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little') >> 12) or 1
+
+
+@lru_cache(maxsize=1 << 16)
+def _hash_context_items(items: Tuple[Tuple[str, object], ...]) -> int:
+    return _hash_bytes('\0'.join(name + '\0' + str(value) for name, value in items).encode('utf-8'))
+
+
+def context_hash(context) -> int:
+    """
+    :return: [int], hash of a context, independent of the order of its keys. None and {} are the
+    same context. Besides discrete contexts, the feature values of linear bandits are hashed, as a
+    dict or as an array.
+    """
+    if context is not None and not isinstance(context, dict):
+        return _hash_bytes(np.asarray(context, dtype=np.float64).tobytes())
+    return _hash_context_items(tuple(sorted(context.items())) if context else ())
+
+
+class ContextualBandit(OnlineBandit):
+    """
+    Contextual version of a bandit for discrete contexts: every context seen in the feedback gets
+    its own statistics, learned by a copy of the wrapped bandit.
+
+    The state arrays of the wrapped bandit are stacked into dense arrays of `max_contexts` slots. A
+    context is resolved to its slot through a dict keyed by the hash of the context, so `choose` and
+    `update` cost the same as in the wrapped bandit however many contexts have been seen. When all
+    the slots are taken, the context that received feedback least recently is evicted. A context
+    without a slot is decided with the state the wrapped bandit had when it was wrapped, which is
+    also the starting state of a new slot.
+    """
+
+    def __init__(self, bandit: OnlineBandit, max_contexts: int = 1024):
+        """
+        Constructor of ContextualBandit
+
+        :param bandit: [OnlineBandit], bandit whose current state is the prior of every context.
+        :param max_contexts: [int, default=1024], number of contexts whose statistics are kept.
+        """
+        super().__init__(bandit.bandit_id, bandit.seed)
+        self.bandit: OnlineBandit = bandit
+        self.max_contexts: int = max_contexts
+        bandit.rng = self.rng
+
+        prior = bandit.state_arrays()
+        self._names: List[str] = list(prior)
+        arrays = {name: np.array(array) for name, array in prior.items()}
+        for name, array in prior.items():
+            stacked = np.repeat(array[np.newaxis], max_contexts, axis=0)
+            arrays[fields.CONTEXT_PREFIX + name] = stacked
+        arrays[fields.CONTEXT_HASHES] = np.zeros(max_contexts)
+        arrays[fields.CONTEXT_LAST_USED] = np.zeros(max_contexts)
+        arrays[fields.CONTEXT_CLOCK] = np.zeros(1)
+        self.bind_state(arrays)
+
+    @classmethod
+    def make_from_bandit_config(cls, config: BanditConfig):
+        """
+        Makes the bandit with `BanditFactory`, from a config written by `to_bandit_config`, which
+        names the bandit type of the wrapped bandit.
+        """
+        # Imported here, since the factory imports this module
+        from pulpo.bandit_factory import BanditFactory
+        return BanditFactory.make_from_bandit_config(config)
+
+    def to_bandit_config(self) -> BanditConfig:
+        from pulpo.bandit_factory import BanditFactory
+        config = self.bandit.to_bandit_config()
+        parameters = dict(config.parameters or {})
+        parameters[fields.BANDIT_TYPE] = BanditFactory.bandit_type(self.bandit)
+        parameters[fields.MAX_CONTEXTS] = self.max_contexts
+        return BanditConfig(config.bandit_id, config.arm_ids, config.priors, parameters)
+
+    @property
+    def n_contexts(self) -> int:
+        self._check_index()
+        return len(self._index)
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        return self._arrays
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self._arrays: Dict[str, np.ndarray] = arrays
+        self._hashes: np.ndarray = arrays[fields.CONTEXT_HASHES]
+        self._last_used: np.ndarray = arrays[fields.CONTEXT_LAST_USED]
+        self._clock: np.ndarray = arrays[fields.CONTEXT_CLOCK]
+        self.bandit.bind_state({name: arrays[name] for name in self._names})
+        self._children: List[Optional[OnlineBandit]] = [None] * self.max_contexts
+        self._rebuild_index()
+
+    def context_bandit(self, context: Dict[str, str] = None) -> OnlineBandit:
+        """
+        :return: [OnlineBandit], bandit that decides for the context, i.e. the wrapped bandit if the
+        context has no slot.
+        """
+        _, slot = self._slot(context, create=False)
+        return self.bandit if slot is None else self._child(slot)
+
+    def choose(self, context: Dict[str, str] = None) -> Arm:
+        return self.context_bandit(context).choose(context)
+
+    def choose_many(self, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[Arm]:
+        return self.context_bandit(context).choose_many(k, context, distinct)
+
+    def check_feedback(self, feedback: Feedback):
+        self.bandit.check_feedback(feedback)
+
+    def update(self, feedback: Feedback):
+        key, slot = self._slot(feedback.context, create=True)
+        self._child(slot).update(feedback)
+        self._touch(key, slot)
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None):
+        key, slot = self._slot(context, create=True)
+        self._child(slot).update_many(arm_ids, rewards, context)
+        self._touch(key, slot)
+
+    def exploration_counts(self) -> Optional[Tuple[int, int]]:
+        counts = [bandit.exploration_counts() for bandit in [self.bandit] + self._children
+                  if bandit is not None]
+        if counts[0] is None:
+            return None
+        return (sum(explorations for explorations, _ in counts),
+                sum(exploitations for _, exploitations in counts))
+
+    def reset(self):
+        """
+        Forgets all the contexts. The prior is kept.
+        """
+        self._hashes[:] = 0
+        self._clock[0] += 1
+        self._rebuild_index()
+
+    def _slot(self, context: Optional[Dict[str, str]], create: bool) -> Tuple[int, Optional[int]]:
+        key = context_hash(context)
+        self._check_index()
+        slot = self._index.get(key)
+        if slot is None and create:
+            slot = self._allocate(key)
+        return key, slot
+
+    def _allocate(self, key: int) -> int:
+        if len(self._index) < self.max_contexts:
+            slot = len(self._index)
+        else:
+            _, slot = self._index.popitem(last=False)
+        for name in self._names:
+            self._arrays[fields.CONTEXT_PREFIX + name][slot] = self._arrays[name]
+        self._hashes[slot] = key
+        self._index[key] = slot
+        return slot
+
+    def _touch(self, key: int, slot: int):
+        self._clock[0] += 1
+        self._last_used[slot] = self._clock[0]
+        self._indexed_clock = float(self._clock[0])
+        self._index.move_to_end(key)
+
+    def _child(self, slot: int) -> OnlineBandit:
+        child = self._children[slot]
+        if child is None:
+            child = type(self.bandit).make_from_bandit_config(self.bandit.to_bandit_config())
+            child.rng = self.rng
+            child.bind_state({name: self._arrays[fields.CONTEXT_PREFIX + name][slot]
+                              for name in self._names})
+            self._children[slot] = child
+        return child
+
+    def _check_index(self):
+        # The clock changes with every update, so a state written by another process or loaded
+        # from a file is noticed and the index is built again from the stored hashes.
+        if self._clock[0] != self._indexed_clock:
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        occupied = np.flatnonzero(self._hashes)
+        order = occupied[np.argsort(self._last_used[occupied], kind='stable')]
+        self._index: Dict[int, int] = OrderedDict((int(self._hashes[slot]), int(slot))
+                                                  for slot in order)
+        self._indexed_clock: float = float(self._clock[0])
@@ -31,6 +31,7 @@ class Feedback:
     arm_id: str
     reward: float
     payload: str = None
+    context: Optional[Dict[str, str]] = None
 
 
 @dataclass
@@ -0,0 +1,193 @@
+import math
+import time
+from typing import Callable, Dict, List, Type, Union
+
+import numpy as np
+
+from pulpo.bandits.arm_store import ArmStore
+from pulpo.bandits.dataclasses import Arm
+from pulpo.constants import fields
+
+# Decayed statistics are rebased once their scale reaches 2^_MAX_HALF_LIVES, long before float64
+# overflows
+_MAX_HALF_LIVES = 64
+
+
+class DecayedArmStore(ArmStore):
+    """
+    Arm statistics whose evidence decays exponentially with time, for non-stationary rewards.
+
+    The value of a field is its prior plus the sum of its increments, each weighted by 2^(-age /
+    half_life). Instead of decaying every arm as time passes, increments are stored scaled up by
+    2^((t - reference) / half_life) and all the stored evidence is scaled down by the same factor
+    when it is read, so an update touches only its arm. The evidence is rebased on the current time
+    once the scale grows large, which costs one sweep every `_MAX_HALF_LIVES` half-lives.
+    """
+
+    def __init__(self, arm_class: Type[Arm], arm_ids: List[str], half_life: float,
+                 clock: Callable[[], float] = time.time):
+        """
+        Constructor of DecayedArmStore
+
+        :param arm_class: [Type[Arm]], arm dataclass whose numeric fields are stored.
+        :param arm_ids: [List[str]], ids of the arms, in storage order.
+        :param half_life: [float], seconds after which an increment weighs half.
+        :param clock: [Callable[[], float], default=time.time], current time in seconds.
+        """
+        super().__init__(arm_class, arm_ids)
+        self.half_life: float = half_life
+        self.clock: Callable[[], float] = clock
+        self.bind_state({fields.PRIOR_STATISTICS: self.data,
+                         fields.DECAYED_STATISTICS: np.zeros_like(self.data),
+                         fields.DECAY_REFERENCE: np.array([clock()], dtype=np.float64)})
+
+    def parameters(self) -> Dict[str, float]:
+        return {fields.HALF_LIFE: self.half_life}
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        return {fields.PRIOR_STATISTICS: self.data, fields.DECAYED_STATISTICS: self.evidence,
+                fields.DECAY_REFERENCE: self.reference}
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.bind(arrays[fields.PRIOR_STATISTICS])
+        self.evidence: np.ndarray = arrays[fields.DECAYED_STATISTICS]
+        self.reference: np.ndarray = arrays[fields.DECAY_REFERENCE]
+        self._evidence_rows: Dict[str, np.ndarray] = dict(zip(self.fields, self.evidence))
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self._rows[field] + self._evidence_rows[field] * self._read_scale()
+
+    def add(self, position: int, increments: Dict[str, float]):
+        scale = self._write_scale()
+        for field, increment in increments.items():
+            self._evidence_rows[field][position] += increment * scale
+
+    def add_many(self, positions: np.ndarray, increments: Dict[str, Union[float, np.ndarray]]):
+        touched, inverse = np.unique(positions, return_inverse=True)
+        scale = self._write_scale()
+        for field, increment in increments.items():
+            weights = np.broadcast_to(np.asarray(increment, dtype=np.float64) * scale,
+                                      positions.shape)
+            self._evidence_rows[field][touched] += np.bincount(inverse, weights=weights,
+                                                               minlength=len(touched))
+
+    def fill(self, values: Dict[str, float]):
+        super().fill(values)
+        self.evidence[...] = 0
+        self.reference[0] = self.clock()
+
+    def arm(self, position: int) -> Arm:
+        values = self.data[:, position] + self.evidence[:, position] * self._read_scale()
+        return self.arm_class(self.arm_ids[position], *[float(value) for value in values])
+
+    def _read_scale(self) -> float:
+        return 2.0 ** (-(self.clock() - self.reference[0]) / self.half_life)
+
+    def _write_scale(self) -> float:
+        now = self.clock()
+        half_lives = (now - self.reference[0]) / self.half_life
+        if half_lives > _MAX_HALF_LIVES:
+            self.evidence *= 2.0 ** -half_lives
+            self.reference[0] = now
+            half_lives = 0.0
+        return 2.0 ** half_lives
+
+
+class WindowedArmStore(ArmStore):
+    """
+    Arm statistics that only count the increments of a sliding time window, for non-stationary
+    rewards.
+
+    The window is split into `n_buckets` buckets of `window / n_buckets` seconds, kept per arm in a
+    ring together with the epoch (time divided by the bucket width) that they hold. An update clears
+    its bucket only if it holds an older epoch, so expired increments are dropped lazily by the arms
+    that are updated, and reads only sum the buckets of the last `n_buckets` epochs. The window
+    slides bucket by bucket, so increments are counted for between `window - window / n_buckets` and
+    `window` seconds.
+    """
+
+    def __init__(self, arm_class: Type[Arm], arm_ids: List[str], window: float, n_buckets: int = 16,
+                 clock: Callable[[], float] = time.time):
+        """
+        Constructor of WindowedArmStore
+
+        :param arm_class: [Type[Arm]], arm dataclass whose numeric fields are stored.
+        :param arm_ids: [List[str]], ids of the arms, in storage order.
+        :param window: [float], seconds during which an increment is counted.
+        :param n_buckets: [int, default=16], number of buckets of the window.
+        :param clock: [Callable[[], float], default=time.time], current time in seconds.
+        """
+        super().__init__(arm_class, arm_ids)
+        self.window: float = window
+        self.n_buckets: int = n_buckets
+        self.clock: Callable[[], float] = clock
+        self.bind_state({
+            fields.PRIOR_STATISTICS: self.data,
+            fields.WINDOW_STATISTICS: np.zeros((len(self.fields), n_buckets, len(self.arm_ids))),
+            fields.WINDOW_EPOCHS: np.full((n_buckets, len(self.arm_ids)), -np.inf)})
+
+    def parameters(self) -> Dict[str, float]:
+        return {fields.WINDOW: self.window}
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        return {fields.PRIOR_STATISTICS: self.data, fields.WINDOW_STATISTICS: self.buckets,
+                fields.WINDOW_EPOCHS: self.epochs}
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.bind(arrays[fields.PRIOR_STATISTICS])
+        self.buckets: np.ndarray = arrays[fields.WINDOW_STATISTICS]
+        self.epochs: np.ndarray = arrays[fields.WINDOW_EPOCHS]
+        self._bucket_rows: Dict[str, np.ndarray] = dict(zip(self.fields, self.buckets))
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        live = self.epochs > self._epoch() - self.n_buckets
+        return self._rows[field] + np.einsum('ba,ba->a', self._bucket_rows[field], live)
+
+    def add(self, position: int, increments: Dict[str, float]):
+        epoch = self._epoch()
+        bucket = int(epoch % self.n_buckets)
+        if self.epochs[bucket, position] != epoch:
+            self.buckets[:, bucket, position] = 0
+            self.epochs[bucket, position] = epoch
+        for field, increment in increments.items():
+            self._bucket_rows[field][bucket, position] += increment
+
+    def add_many(self, positions: np.ndarray, increments: Dict[str, Union[float, np.ndarray]]):
+        touched, inverse = np.unique(positions, return_inverse=True)
+        epoch = self._epoch()
+        bucket = int(epoch % self.n_buckets)
+        expired = touched[self.epochs[bucket, touched] != epoch]
+        self.buckets[:, bucket, expired] = 0
+        self.epochs[bucket, expired] = epoch
+        for field, increment in increments.items():
+            weights = np.broadcast_to(np.asarray(increment, dtype=np.float64), positions.shape)
+            self._bucket_rows[field][bucket, touched] += np.bincount(inverse, weights=weights,
+                                                                     minlength=len(touched))
+
+    def fill(self, values: Dict[str, float]):
+        super().fill(values)
+        self.buckets[...] = 0
+        self.epochs[...] = -np.inf
+
+    def arm(self, position: int) -> Arm:
+        live = self.epochs[:, position] > self._epoch() - self.n_buckets
+        values = self.data[:, position] + self.buckets[:, :, position] @ live
+        return self.arm_class(self.arm_ids[position], *[float(value) for value in values])
+
+    def _epoch(self) -> float:
+        return float(math.floor(self.clock() * self.n_buckets / self.window))
+
+
+def make_arm_store(arm_class: Type[Arm], arms: List[Arm], half_life: float = None,
+                   window: float = None) -> ArmStore:
+    """
+    Makes the store of the arms of a bandit: decayed if `half_life` is given, windowed if `window`
+    is given, and plain otherwise.
+    """
+    if half_life and window:
+        raise ValueError("A bandit can't have both a half life and a window")
+    if half_life:
+        return DecayedArmStore.from_arms(arm_class, arms, half_life=half_life)
+    if window:
+        return WindowedArmStore.from_arms(arm_class, arms, window=window)
+    return ArmStore.from_arms(arm_class, arms)
@@ -1,9 +1,13 @@
-import random as rand
-from typing import List, Dict
+from typing import List, Dict, Sequence, Tuple
 
+import numpy as np
+
+from pulpo.bandits.arm_store import ArmStore
+from pulpo.bandits.decay import make_arm_store
 from pulpo.bandits.dataclasses import BanditConfig
 from pulpo.bandits.dataclasses import EpsilonGreedyArm, Arm, Feedback
 from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.bandits.tournament_tree import TournamentTree
 from pulpo.constants import fields
 
 
@@ -16,18 +20,34 @@ class EGreedy(OnlineBandit):
 
     Reinforcement Learning: An Introduction (Version 2)
     Richard S. Sutton and Andrew G. Barto
+
+    The arm with the highest mean reward is kept in a `TournamentTree` that is updated with the
+    arms, so exploiting costs O(1) and an update O(log n_arms). Decayed and windowed statistics
+    change their means with time, so with them the best arm is found with a vectorized scan instead.
     """
 
-    def __init__(self, bandit_id: str, arms: List[EpsilonGreedyArm], epsilon):
-        super().__init__(bandit_id)
+    def __init__(self, bandit_id: str, arms: List[EpsilonGreedyArm], epsilon, seed: int = None,
+                 half_life: float = None, window: float = None):
+        super().__init__(bandit_id, seed)
         """
         Constructor of EGreedy
 
         :param arm_ids: [List[str]], list of arm ids to instantiate.
         :param epsilon: [float, default=0.1], epsilon value in range (0.0, 1.0) for exploration
+        :param seed: [int, default=None], seed of the random generator of the bandit
+        :param half_life: [float, default=None], if given, the statistics decay with this half life
+        in seconds
+        :param window: [float, default=None], if given, the statistics only count the feedback of
+        the last `window` seconds
         """
         self.epsilon: float = epsilon
-        self.arms_dict: Dict[str, EpsilonGreedyArm] = {arm.arm_id: arm for arm in arms}
+        self.explorations: int = 0
+        self.exploitations: int = 0
+        self.store: ArmStore = make_arm_store(EpsilonGreedyArm, arms, half_life, window)
+        self.tree: TournamentTree = (TournamentTree(len(self.store)) if type(self.store) is ArmStore
+                                     else None)
+        if self.tree is not None:
+            self.tree.build(self._mean)
 
     @classmethod
     def make_from_bandit_config(cls, config: BanditConfig):
@@ -40,28 +60,114 @@ class EGreedy(OnlineBandit):
             reward_sum = EGreedy._DEFAULT_REWARD_SUM
 
         if config.parameters:
-            epsilon = config.parameters[fields.EPSILON]
+            epsilon = config.parameters.get(fields.EPSILON, EGreedy._DEFAULT_EPSILON)
+            seed = config.parameters.get(fields.SEED)
+            half_life = config.parameters.get(fields.HALF_LIFE)
+            window = config.parameters.get(fields.WINDOW)
         else:
             epsilon = EGreedy._DEFAULT_EPSILON
+            seed = half_life = window = None
 
         arms = [EpsilonGreedyArm(arm_id, n, reward_sum) for arm_id in config.arm_ids]
 
-        return cls(config.bandit_id, arms, epsilon)
+        return cls(config.bandit_id, arms, epsilon, seed, half_life, window)
+
+    def to_bandit_config(self) -> BanditConfig:
+        return BanditConfig(self.bandit_id, self.store.arm_ids,
+                            parameters={fields.EPSILON: self.epsilon, **self.store.parameters(),
+                                        **self._seed_parameters()})
+
+    @property
+    def arms_dict(self) -> Dict[str, EpsilonGreedyArm]:
+        return self.store.arms()
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        if self.tree is None:
+            return self.store.state_arrays()
+        return {**self.store.state_arrays(), fields.MEAN_TREE: self.tree.tree}
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.store.bind_state(arrays)
+        if self.tree is not None:
+            self.tree.bind(arrays[fields.MEAN_TREE])
 
     def reset(self):
-        for arm in self.arms_dict.values():
-            arm.n = 0.001
-            arm.reward_sum = 0
+        self.store.fill({fields.N: 0.001, fields.REWARD_SUM: 0})
+        if self.tree is not None:
+            self.tree.build(self._mean)
 
     def choose(self, context=None) -> Arm:
 
-        if rand.random() >= self.epsilon:
-            return rand.choice(list(self.arms_dict.values()))
+        if self.rng.random() >= self.epsilon:
+            self.explorations += 1
+            position = int(self.rng.integers(len(self.store)))
         else:
-            return max(self.arms_dict.values(), key=lambda arm: arm.reward_sum / arm.n)
+            self.exploitations += 1
+            position = self._best_position()
+        return self.store.arm(position)
 
-    def update(self, feedback: Feedback):
-        arm = self.arms_dict[feedback.arm_id]
+    def choose_many(self, k: int, context=None, distinct: bool = False) -> List[Arm]:
+        explore = self.rng.random(k) >= self.epsilon
+        if distinct:
+            explore = explore[:len(self.store)]
+        n_explore = int(np.count_nonzero(explore))
+        self.explorations += n_explore
+        self.exploitations += len(explore) - n_explore
 
-        arm.n += 1
-        arm.reward_sum += feedback.reward
+        if distinct:
+            return self.store.arms_at(self._choose_distinct_positions(explore))
+
+        positions = np.where(explore, self.rng.integers(len(self.store), size=k),
+                             self._best_position())
+        return self.store.arms_at(positions)
+
+    def exploration_counts(self) -> Tuple[int, int]:
+        return self.explorations, self.exploitations
+
+    def _choose_distinct_positions(self, explore: np.ndarray) -> List[int]:
+        """
+        Fills the slots in order: an exploring slot takes the next arm of a random permutation
+        and an exploiting slot the next arm by mean reward, skipping arms already taken.
+        """
+        candidates = {
+            True: iter(self.rng.permutation(len(self.store))),
+            False: iter(np.argsort(-self._means(), kind='stable'))
+        }
+        taken = []
+        taken_set = set()
+        for slot_explores in explore:
+            position = next(candidates[bool(slot_explores)])
+            while position in taken_set:
+                position = next(candidates[bool(slot_explores)])
+            taken.append(position)
+            taken_set.add(position)
+        return taken
+
+    def _means(self) -> np.ndarray:
+        return self.store[fields.REWARD_SUM] / self.store[fields.N]
+
+    def _mean(self, positions):
+        return self.store[fields.REWARD_SUM][positions] / self.store[fields.N][positions]
+
+    def _best_position(self) -> int:
+        if self.tree is None:
+            return int(np.argmax(self._means()))
+        return self.tree.argmax()
+
+    def check_feedback(self, feedback: Feedback):
+        self.store.position(feedback.arm_id)
+
+    def update(self, feedback: Feedback):
+        position = self.store.position(feedback.arm_id)
+        self.store.add(position, {fields.N: 1, fields.REWARD_SUM: feedback.reward})
+        if self.tree is not None:
+            reward_sums, counts = self.store[fields.REWARD_SUM], self.store[fields.N]
+            self.tree.update(position, lambda arm: reward_sums[arm] / counts[arm])
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None):
+        rewards = np.asarray(rewards, dtype=np.float64)
+        positions = self.store.positions(arm_ids)
+        self.store.add_many(positions, {fields.N: 1, fields.REWARD_SUM: rewards})
+        if self.tree is not None:
+            self.tree.update_many(positions, self._mean)
@@ -1,7 +1,9 @@
-from typing import List, Dict
+from typing import List, Dict, Sequence
 
 import numpy as np
 
+from pulpo.bandits.arm_store import ArmStore, top_k_positions
+from pulpo.bandits.decay import make_arm_store
 from pulpo.bandits.dataclasses import GaussianArm, Feedback, Arm, BanditConfig
 from pulpo.bandits.online_bandits import OnlineBandit
 from pulpo.constants import fields
@@ -12,10 +14,11 @@ class GaussianThompsonBandit(OnlineBandit):
     _DEFAULT_REWARD_SUM = 2
     _DEFAULT_SQUARED_REWARD_SUM = 2
 
-    def __init__(self, bandit_id: str, arms: List[GaussianArm]):
-        super().__init__(bandit_id)
+    def __init__(self, bandit_id: str, arms: List[GaussianArm], seed: int = None,
+                 half_life: float = None, window: float = None):
+        super().__init__(bandit_id, seed)
         self.bandit_id = bandit_id
-        self.arms_dict: Dict[str, GaussianArm] = {arm.arm_id: arm for arm in arms}
+        self.store: ArmStore = make_arm_store(GaussianArm, arms, half_life, window)
 
     @classmethod
     def make_from_bandit_config(cls, config: BanditConfig):
@@ -30,28 +33,65 @@ class GaussianThompsonBandit(OnlineBandit):
             prior_squared_rewards_sum = GaussianThompsonBandit._DEFAULT_SQUARED_REWARD_SUM
 
         arms = [GaussianArm(arm_id=arm_id, n=prior_n, reward_sum=prior_rewards_sum,
-                            squared_reward_sum=prior_squared_rewards_sum) for arm_id in config.arm_ids]
+                            squared_reward_sum=prior_squared_rewards_sum)
+                for arm_id in config.arm_ids]
 
-        return cls(config.bandit_id, arms)
+        parameters = config.parameters or {}
+
+        return cls(config.bandit_id, arms, parameters.get(fields.SEED),
+                   parameters.get(fields.HALF_LIFE), parameters.get(fields.WINDOW))
+
+    def to_bandit_config(self) -> BanditConfig:
+        return BanditConfig(self.bandit_id, self.store.arm_ids,
+                            parameters={**self.store.parameters(),
+                                        **self._seed_parameters()} or None)
+
+    @property
+    def arms_dict(self) -> Dict[str, GaussianArm]:
+        return self.store.arms()
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        return self.store.state_arrays()
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.store.bind_state(arrays)
 
     def choose(self, context: Dict[str, str] = None) -> Arm:
-        arms = list(self.arms_dict.values())
-        return max(arms, key=self._sample_score)
+        return self.store.arm(int(np.argmax(self._sample_store_scores())))
+
+    def choose_many(self, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[Arm]:
+        if distinct:
+            return self.store.arms_at(top_k_positions(self._sample_store_scores(), k))
+        scores = self._sample_store_scores(size=(k, len(self.store)))
+        return self.store.arms_at(np.argmax(scores, axis=1))
+
+    def check_feedback(self, feedback: Feedback):
+        self.store.position(feedback.arm_id)
 
     def update(self, feedback: Feedback):
-        arm = self.arms_dict[feedback.arm_id]
-        arm.n += 1
-        arm.reward_sum += feedback.reward
-        arm.squared_reward_sum += pow(feedback.reward, 2)
+        position = self.store.position(feedback.arm_id)
+        self.store.add(position, {fields.N: 1, fields.REWARD_SUM: feedback.reward,
+                                  fields.SQUARED_REWARD_SUM: pow(feedback.reward, 2)})
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None):
+        rewards = np.asarray(rewards, dtype=np.float64)
+        self.store.add_many(self.store.positions(arm_ids),
+                            {fields.N: 1, fields.REWARD_SUM: rewards,
+                             fields.SQUARED_REWARD_SUM: np.square(rewards)})
 
     def reset(self):
-        for arm in self.arms_dict.values():
-            arm.n = 2
-            arm.reward_sum = 2
-            arm.squared_reward_sum = 2
+        self.store.fill({fields.N: 2, fields.REWARD_SUM: 2, fields.SQUARED_REWARD_SUM: 2})
+
+    def _sample_store_scores(self, size=None) -> np.ndarray:
+        return self._sample_scores(self.rng, self.store[fields.N], self.store[fields.REWARD_SUM],
+                                   self.store[fields.SQUARED_REWARD_SUM], size)
 
     @staticmethod
-    def _sample_score(arm: GaussianArm):
-        mean = arm.reward_sum / arm.n
-        sd = pow(arm.squared_reward_sum / arm.n - pow(arm.reward_sum / arm.n, 2), 0.5)
-        return np.random.normal(mean, sd)
+    def _sample_scores(rng: np.random.Generator, n: np.ndarray, reward_sum: np.ndarray,
+                       squared_reward_sum: np.ndarray, size=None) -> np.ndarray:
+        mean = reward_sum / n
+        variance = squared_reward_sum / n - np.square(mean)
+        # Rounding can push the variance of an arm with constant rewards slightly below zero
+        return rng.normal(mean, np.sqrt(np.maximum(variance, 0)), size)
@@ -0,0 +1,19 @@
+import numpy as np
+
+from pulpo.bandits.linear import LinearBandit
+
+
+class LinUCB(LinearBandit):
+    """
+    Implementation of the disjoint LinUCB algorithm of Section 3.1 of paper:
+
+    A Contextual-Bandit Approach to Personalized News Article Recommendation
+    Lihong Li, Wei Chu, John Langford, Robert E. Schapire
+
+    The score of an arm is its expected reward plus `alpha` standard deviations.
+    """
+
+    def _scores(self, x: np.ndarray, size: int = None) -> np.ndarray:
+        mean, deviation = self._mean_and_deviation(x)
+        scores = mean + self.alpha * deviation
+        return scores if size is None else np.broadcast_to(scores, (size, len(scores)))
@@ -0,0 +1,166 @@
+from abc import abstractmethod
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from pulpo.bandits.arm_store import top_k_positions
+from pulpo.bandits.dataclasses import Arm, BanditConfig, Feedback
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.constants import fields
+
+Features = Union[Dict[str, Union[str, float]], Sequence[float], np.ndarray]
+
+
+class LinearBandit(OnlineBandit):
+    """
+    Base class of the disjoint linear bandits of:
+
+    A Contextual-Bandit Approach to Personalized News Article Recommendation
+    Lihong Li, Wei Chu, John Langford, Robert E. Schapire
+
+    Every arm has a ridge regression of the reward on the context features. The inverse of the
+    design matrix of every arm is kept up to date with the Sherman-Morrison formula, so an update
+    costs O(d²) and a decision never inverts a matrix. The expected reward and the variance of all
+    the arms are computed with two matrix products.
+
+    The context is either a dict of feature values keyed by feature name, where missing features are
+    0, or an array with the values of `features` in order. Decisions and feedback require a context,
+    as without features the regressions cannot tell the arms apart.
+    """
+    _DEFAULT_ALPHA = 1.0
+    _DEFAULT_REGULARIZATION = 1.0
+
+    def __init__(self, bandit_id: str, arm_ids: List[str], features: List[str],
+                 alpha: float = _DEFAULT_ALPHA, regularization: float = _DEFAULT_REGULARIZATION,
+                 seed: int = None):
+        """
+        Constructor of LinearBandit
+
+        :param bandit_id: [str], bandit id
+        :param arm_ids: [List[str]], list of arm ids to instantiate.
+        :param features: [List[str]], names of the context features, at least one.
+        :param alpha: [float, default=1.0], width of the exploration around the expected reward.
+        :param regularization: [float, default=1.0], ridge regularization, i.e. the prior precision
+        of the coefficients.
+        :param seed: [int, default=None], seed of the random generator of the bandit
+        """
+        if not features:
+            raise ValueError("Linear bandit {} requires at least one context feature"
+                             .format(bandit_id))
+        super().__init__(bandit_id, seed)
+        self.arm_ids: List[str] = list(arm_ids)
+        self.index: Dict[str, int] = {arm_id: position
+                                      for position, arm_id in enumerate(self.arm_ids)}
+        self.features: List[str] = list(features)
+        self.alpha: float = alpha
+        self.regularization: float = regularization
+
+        n_arms, n_features = len(self.arm_ids), len(self.features)
+        self.bind_state({fields.INVERSE_COVARIANCES: np.empty((n_arms, n_features, n_features)),
+                         fields.WEIGHTED_FEATURES: np.empty((n_arms, n_features)),
+                         fields.COEFFICIENTS: np.empty((n_arms, n_features))})
+        self.reset()
+
+    @classmethod
+    def make_from_bandit_config(cls, config: BanditConfig):
+        parameters = config.parameters or {}
+        return cls(config.bandit_id, config.arm_ids, parameters.get(fields.FEATURES),
+                   parameters.get(fields.ALPHA, cls._DEFAULT_ALPHA),
+                   parameters.get(fields.REGULARIZATION, cls._DEFAULT_REGULARIZATION),
+                   parameters.get(fields.SEED))
+
+    def to_bandit_config(self) -> BanditConfig:
+        return BanditConfig(self.bandit_id, self.arm_ids, parameters={
+            fields.FEATURES: self.features, fields.ALPHA: self.alpha,
+            fields.REGULARIZATION: self.regularization, **self._seed_parameters()})
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        return {fields.INVERSE_COVARIANCES: self.inverse_covariances,
+                fields.WEIGHTED_FEATURES: self.weighted_features,
+                fields.COEFFICIENTS: self.coefficients}
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.inverse_covariances: np.ndarray = arrays[fields.INVERSE_COVARIANCES]
+        self.weighted_features: np.ndarray = arrays[fields.WEIGHTED_FEATURES]
+        self.coefficients: np.ndarray = arrays[fields.COEFFICIENTS]
+
+    def reset(self):
+        self.inverse_covariances[...] = np.eye(len(self.features)) / self.regularization
+        self.weighted_features[...] = 0
+        self.coefficients[...] = 0
+
+    def choose(self, context: Features = None) -> Arm:
+        return Arm(self.arm_ids[int(np.argmax(self._scores(self._features(context))))])
+
+    def choose_many(self, k: int, context: Features = None, distinct: bool = False) -> List[Arm]:
+        x = self._features(context)
+        if distinct:
+            positions = top_k_positions(self._scores(x), k)
+        else:
+            positions = np.argmax(self._scores(x, size=k), axis=-1)
+        return [Arm(self.arm_ids[position]) for position in positions]
+
+    def check_feedback(self, feedback: Feedback):
+        self._features(feedback.context)
+        self.index[feedback.arm_id]
+
+    def update(self, feedback: Feedback):
+        self.update_many([feedback.arm_id], [feedback.reward], feedback.context)
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Features = None):
+        """
+        Updates the arms given a batch of feedback in the same context. The events of an arm are
+        merged into one rank-one update of its inverse, since they share the same features.
+        """
+        x = self._features(context)
+        positions = np.fromiter(map(self.index.__getitem__, arm_ids), dtype=np.intp,
+                                count=len(arm_ids))
+        touched, inverse = np.unique(positions, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(touched)).astype(np.float64)
+        reward_sums = np.bincount(inverse, weights=np.asarray(rewards, dtype=np.float64),
+                                  minlength=len(touched))
+
+        inverses = self.inverse_covariances[touched]
+        projected = inverses @ x
+        # Sherman-Morrison: (A + c x xᵀ)⁻¹ = A⁻¹ - c A⁻¹x xᵀA⁻¹ / (1 + c xᵀA⁻¹x)
+        scale = counts / (1 + counts * (projected @ x))
+        outer = projected[:, :, np.newaxis] * projected[:, np.newaxis, :]
+        inverses -= scale[:, np.newaxis, np.newaxis] * outer
+        self.inverse_covariances[touched] = inverses
+        self.weighted_features[touched] += reward_sums[:, np.newaxis] * x
+        weighted = self.weighted_features[touched]
+        self.coefficients[touched] = (inverses @ weighted[:, :, np.newaxis])[:, :, 0]
+
+    def expected_rewards(self, context: Features = None) -> np.ndarray:
+        """
+        :return: [np.ndarray], expected reward of every arm in the context.
+        """
+        return self.coefficients @ self._features(context)
+
+    @abstractmethod
+    def _scores(self, x: np.ndarray, size: int = None) -> np.ndarray:
+        """
+        :return: [np.ndarray], score of every arm, or of every arm in `size` independent decisions.
+        """
+        pass
+
+    def _mean_and_deviation(self, x: np.ndarray):
+        n_arms, n_features = self.inverse_covariances.shape[:2]
+        # One matrix product for all the arms: (n_arms * d, d) @ (d,)
+        stacked = self.inverse_covariances.reshape(n_arms * n_features, n_features)
+        projected = (stacked @ x).reshape(n_arms, n_features)
+        variance = projected @ x
+        return self.coefficients @ x, np.sqrt(np.maximum(variance, 0))
+
+    def _features(self, context: Features) -> np.ndarray:
+        if context is None:
+            raise ValueError("Linear bandit {} requires a context".format(self.bandit_id))
+        if isinstance(context, dict):
+            return np.fromiter((float(context.get(name, 0)) for name in self.features),
+                               dtype=np.float64, count=len(self.features))
+        x = np.asarray(context, dtype=np.float64)
+        if x.shape != (len(self.features),):
+            raise ValueError("Expected a context of {} features, got shape {}"
+                             .format(len(self.features), x.shape))
+        return x
@@ -1,22 +1,50 @@
 from abc import ABCMeta, abstractmethod
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from pulpo.bandits.dataclasses import Arm, Feedback, BanditConfig
+from pulpo.constants import fields
 
 
 class OnlineBandit(metaclass=ABCMeta):
     """
     Base abstract class to inherit from for Online MAB implementations
     """
-    def __init__(self, bandit_id: str):
+    # Draws per requested arm of the generic `choose_many` with distinct arms
+    _MAX_DISTINCT_DRAWS = 10
+
+    def __init__(self, bandit_id: str, seed: int = None):
+        """
+        :param bandit_id: [str], bandit id
+        :param seed: [int, default=None], seed of the random generator of the bandit, for
+        reproducible decisions
+        """
         self.bandit_id: str = bandit_id
+        self.seed: int = seed
+        self._rng: np.random.Generator = None
+
+    @property
+    def rng(self) -> np.random.Generator:
+        """
+        Random generator of the bandit. It is created on first use, as seeding it costs more than
+        building a small bandit.
+        """
+        if self._rng is None:
+            self._rng = np.random.default_rng(self.seed)
+        return self._rng
+
+    @rng.setter
+    def rng(self, rng: np.random.Generator):
+        self._rng = rng
 
     @classmethod
     @abstractmethod
     def make_from_bandit_config(cls, config: BanditConfig):
         """
         Alternate constructor that uses a bandit configuration to instatiate the class.
-        :param config: BanditConfig, this the dataclass which contains the values necessary to configure the bandit
+        :param config: BanditConfig, this the dataclass which contains the values necessary to
+        configure the bandit
         """
         pass
 
@@ -44,15 +72,108 @@ class OnlineBandit(metaclass=ABCMeta):
         """
         pass
 
+    def choose_many(self, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[Arm]:
+        """
+        Chooses several arms in one call. Subclasses should override it with a vectorized
+        implementation.
+
+        :param k: [int], number of decisions.
+        :param context: [dict, default=None], context of the request, as in `choose`.
+        :param distinct: [bool, default=False], if False, the k decisions are independent and may
+        repeat arms. If True, the k best distinct arms are returned in rank order, e.g. to fill the
+        slots of a slate. Here arms are drawn with `choose` until k distinct arms are found, in the
+        order they are first drawn, or up to `_MAX_DISTINCT_DRAWS` * k draws, so fewer arms may be
+        returned.
+        :return: [List[Arm]], arm dataclasses of the decisions.
+        """
+        if not distinct:
+            return [self.choose(context) for _ in range(k)]
+        arms: Dict[str, Arm] = {}
+        for _ in range(self._MAX_DISTINCT_DRAWS * k):
+            if len(arms) == k:
+                break
+            arm = self.choose(context)
+            arms.setdefault(arm.arm_id, arm)
+        return list(arms.values())
+
     @abstractmethod
     def update(self, feedback: Feedback):
         """
         Updates algorithm given the feedback
 
-        :param feeback: [Feedback], dataclass containing the armid and reward
+        :param feeback: [Feedback], dataclass containing the armid, the reward and the context of
+        the decision
         """
         pass
 
+    def check_feedback(self, feedback: Feedback):
+        """
+        Raises the error that `update` would raise for the feedback, e.g. a KeyError for an unknown
+        arm, without changing the state, so that feedback applied later, e.g. buffered by
+        `ThreadSafePulpo`, is rejected first. Bandits that validate their feedback should override
+        it, as nothing is checked here.
+
+        :param feedback: [Feedback], feedback to check.
+        """
+        pass
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None):
+        """
+        Updates algorithm given a batch of feedback. Subclasses should override it so that the batch
+        is aggregated per arm before the state is touched.
+
+        :param arm_ids: [Sequence[str]], arm id of each feedback event.
+        :param rewards: [Sequence[float]], reward of each feedback event.
+        :param context: [dict, default=None], context used when the arms were chosen, shared by the
+        whole batch.
+        """
+        for arm_id, reward in zip(arm_ids, rewards):
+            self.update(Feedback(arm_id, reward, context=context))
+
+    def exploration_counts(self) -> Optional[Tuple[int, int]]:
+        """
+        Number of decisions that explored and that exploited since the bandit was built, for bandits
+        that tell them apart. The counts are not part of the state arrays.
+
+        :return: [Tuple[int, int]], explorations and exploitations, or None.
+        """
+        return None
+
+    def to_bandit_config(self) -> BanditConfig:
+        """
+        Configuration that rebuilds the bandit through `make_from_bandit_config`, without its
+        learned state.
+
+        :return: [BanditConfig], configuration of the bandit.
+        """
+        raise NotImplementedError
+
+    def _seed_parameters(self) -> Dict[str, int]:
+        """
+        :return: [Dict[str, int]], parameters of `to_bandit_config` holding the seed, if one was
+        given.
+        """
+        return {} if self.seed is None else {fields.SEED: self.seed}
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Arrays holding the learned state of the bandit, keyed by name. They are used to persist
+        or share the state, so they must be float64 and must not be replaced between calls.
+
+        :return: [Dict[str, np.ndarray]], state arrays of the bandit.
+        """
+        raise NotImplementedError
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        """
+        Makes the bandit use the given arrays as its state storage, without copying them.
+
+        :param arrays: [Dict[str, np.ndarray]], arrays with the keys and shapes of `state_arrays`.
+        """
+        raise NotImplementedError
+
     @property
     def path(self):
         raise NotImplementedError
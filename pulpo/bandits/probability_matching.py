@@ -0,0 +1,74 @@
+from typing import List
+
+import numpy as np
+
+from pulpo.bandits.alias_bandit import AliasBandit
+from pulpo.bandits.dataclasses import BanditConfig, EpsilonGreedyArm
+from pulpo.constants import fields
+
+
+class ProbabilityMatchingBandit(AliasBandit):
+    """
+    Implementation of the probability matching algorithm as described in:
+
+    An Efficient Rule for Adaptive Operator Selection
+    Dirk Thierens, GECCO 2005
+
+    An arm is chosen with probability p_min + (1 - n_arms * p_min) * mean / sum of the means, so
+    every arm keeps a share of the decisions. Means below 0 count as 0, and all the arms are equally
+    likely while no mean is positive. A change d of a mean reward moves the probabilities by at most
+    2d / (sum of the means) in total, so the drift is measured in units of the sum of the means at
+    the last rebuild, and the table is rebuilt on the total drift.
+    """
+    _DEFAULT_MIN_PROBABILITY_SHARE = 0.1
+
+    def __init__(self, bandit_id: str, arms: List[EpsilonGreedyArm], min_probability: float = None,
+                 rebuild_tolerance: float = 0.05, seed: int = None, half_life: float = None,
+                 window: float = None):
+        """
+        Constructor of ProbabilityMatchingBandit
+
+        :param min_probability: [float, default=None], probability p_min of choosing an arm, lower
+        than 1 / n_arms. If None, 0.1 / n_arms, i.e. 10% of the decisions are spread uniformly. See
+        `AliasBandit` for the other parameters.
+        """
+        if min_probability is None:
+            min_probability = self._DEFAULT_MIN_PROBABILITY_SHARE / len(arms)
+        if not 0 <= min_probability * len(arms) < 1:
+            raise ValueError("min_probability must be in [0, 1 / n_arms), got {}"
+                             .format(min_probability))
+        self.min_probability: float = min_probability
+        super().__init__(bandit_id, arms, rebuild_tolerance, seed, half_life, window)
+
+    @classmethod
+    def make_from_bandit_config(cls, config: BanditConfig):
+        priors = config.priors or {}
+        parameters = config.parameters or {}
+        arms = [EpsilonGreedyArm(arm_id, priors.get(fields.N, cls._DEFAULT_N),
+                                 priors.get(fields.REWARD_SUM, cls._DEFAULT_REWARD_SUM))
+                for arm_id in config.arm_ids]
+
+        return cls(config.bandit_id, arms, parameters.get(fields.MIN_PROBABILITY),
+                   parameters.get(fields.REBUILD_TOLERANCE, cls._DEFAULT_REBUILD_TOLERANCE),
+                   parameters.get(fields.SEED), parameters.get(fields.HALF_LIFE),
+                   parameters.get(fields.WINDOW))
+
+    def to_bandit_config(self) -> BanditConfig:
+        return BanditConfig(self.bandit_id, self.store.arm_ids,
+                            parameters={fields.MIN_PROBABILITY: self.min_probability,
+                                        fields.REBUILD_TOLERANCE: self.rebuild_tolerance,
+                                        **self.store.parameters(), **self._seed_parameters()})
+
+    def probabilities(self, means: np.ndarray) -> np.ndarray:
+        means = np.maximum(means, 0)
+        total = np.sum(means)
+        if total <= 0:
+            return np.ones(len(means))
+        return self.min_probability + (1 - len(means) * self.min_probability) * means / total
+
+    def _drift_scale(self, means: np.ndarray) -> float:
+        # With no positive mean, any change is worth a rebuild
+        return max(float(np.sum(np.maximum(means, 0))), np.finfo(np.float64).tiny)
+
+    def _drift(self) -> float:
+        return self.drift_totals[0]
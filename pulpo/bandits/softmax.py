@@ -0,0 +1,69 @@
+from typing import List
+
+import numpy as np
+
+from pulpo.bandits.alias_bandit import AliasBandit
+from pulpo.bandits.dataclasses import BanditConfig, EpsilonGreedyArm
+from pulpo.constants import fields
+
+
+class SoftmaxBandit(AliasBandit):
+    """
+    Implementation of the softmax (Boltzmann exploration) algorithm as described in Section 2.3 of
+    book:
+
+    Reinforcement Learning: An Introduction (Version 1)
+    Richard S. Sutton and Andrew G. Barto
+
+    An arm is chosen with probability proportional to exp(mean reward / temperature). The drift of
+    an arm is the change of its mean reward in units of the temperature. As the log-probabilities
+    move by at most twice the largest drift, the table is rebuilt on the largest drift, and every
+    probability of the alias table is within a factor exp(2 * rebuild_tolerance) of the current one.
+    """
+    _DEFAULT_TEMPERATURE = 0.1
+    _DEFAULT_REBUILD_TOLERANCE = 0.25
+
+    def __init__(self, bandit_id: str, arms: List[EpsilonGreedyArm], temperature: float = 0.1,
+                 rebuild_tolerance: float = 0.25, seed: int = None, half_life: float = None,
+                 window: float = None):
+        """
+        Constructor of SoftmaxBandit
+
+        :param temperature: [float, default=0.1], the lower, the more the arms with the highest mean
+        are chosen.
+        :param rebuild_tolerance: [float, default=0.25], largest drift after which the alias table
+        is rebuilt. With rewards in [0, 1], a reward of an arm seen n times drifts by up to 1 / (n *
+        temperature), e.g. 0.1 after 100 rewards at the default temperature. See `AliasBandit` for
+        the other parameters.
+        """
+        self.temperature: float = temperature
+        super().__init__(bandit_id, arms, rebuild_tolerance, seed, half_life, window)
+
+    @classmethod
+    def make_from_bandit_config(cls, config: BanditConfig):
+        priors = config.priors or {}
+        parameters = config.parameters or {}
+        arms = [EpsilonGreedyArm(arm_id, priors.get(fields.N, cls._DEFAULT_N),
+                                 priors.get(fields.REWARD_SUM, cls._DEFAULT_REWARD_SUM))
+                for arm_id in config.arm_ids]
+
+        return cls(config.bandit_id, arms,
+                   parameters.get(fields.TEMPERATURE, cls._DEFAULT_TEMPERATURE),
+                   parameters.get(fields.REBUILD_TOLERANCE, cls._DEFAULT_REBUILD_TOLERANCE),
+                   parameters.get(fields.SEED), parameters.get(fields.HALF_LIFE),
+                   parameters.get(fields.WINDOW))
+
+    def to_bandit_config(self) -> BanditConfig:
+        return BanditConfig(self.bandit_id, self.store.arm_ids,
+                            parameters={fields.TEMPERATURE: self.temperature,
+                                        fields.REBUILD_TOLERANCE: self.rebuild_tolerance,
+                                        **self.store.parameters(), **self._seed_parameters()})
+
+    def probabilities(self, means: np.ndarray) -> np.ndarray:
+        return np.exp((means - np.max(means)) / self.temperature)
+
+    def _drift_scale(self, means: np.ndarray) -> float:
+        return self.temperature
+
+    def _drift(self) -> float:
+        return self.drift_totals[1]
@@ -0,0 +1,94 @@
+from typing import Callable, Union
+
+import numpy as np
+
+Values = Callable[[Union[int, np.ndarray]], Union[float, np.ndarray]]
+
+
+class TournamentTree:
+    """
+    Tournament tree that keeps the position of the item with the highest value, for O(1) argmax
+    queries and O(log n) updates.
+
+    The tree is a float64 array of `size` slots, `size` being the next power of two of the number of
+    items: slot 1 is the root and the children of slot i are 2i and 2i + 1, the slots from `size` on
+    being the items themselves. Every slot holds the position of the winner of its subtree, ties
+    going to the lowest position as with `np.argmax`. Values are not stored: they are read through a
+    function of the positions, so the tree must be updated whenever the value of an item changes.
+    Being a plain array, the tree can be kept in state arrays and shared with the values it indexes.
+    """
+
+    def __init__(self, n_items: int, tree: np.ndarray = None):
+        """
+        Constructor of TournamentTree
+
+        :param n_items: [int], number of items.
+        :param tree: [np.ndarray, default=None], array of `size` slots to use as storage. Must be
+        built with `build` unless it already holds a tree of the same items.
+        """
+        self.n_items: int = n_items
+        self.size: int = 1 << max(1, (n_items - 1).bit_length())
+        self.bind(np.zeros(self.size) if tree is None else tree)
+
+    def bind(self, tree: np.ndarray):
+        if tree.shape != (self.size,):
+            raise ValueError("Expected storage of shape {}, got {}"
+                             .format((self.size,), tree.shape))
+        self.tree: np.ndarray = tree
+
+    def argmax(self) -> int:
+        return int(self.tree[1])
+
+    def build(self, values: Values):
+        """
+        Builds the tree from scratch in O(n).
+        """
+        winners = np.arange(self.size)
+        scores = np.full(self.size, -np.inf)
+        scores[:self.n_items] = values(np.arange(self.n_items))
+        while len(winners) > 1:
+            right_wins = scores[1::2] > scores[0::2]
+            winners = np.where(right_wins, winners[1::2], winners[0::2])
+            scores = np.where(right_wins, scores[1::2], scores[0::2])
+            self.tree[len(winners):2 * len(winners)] = winners
+
+    def update(self, position: int, values: Values):
+        """
+        Replays the matches of the item at `position` after its value changed, stopping as soon as
+        the outcome of a match doesn't depend on it.
+        """
+        node = position + self.size
+        winner, score = position, values(position)
+        while node > 1:
+            sibling = node ^ 1
+            rival = self._winner(sibling)
+            if rival < self.n_items:
+                rival_score = values(rival)
+                # A left sibling holds lower positions, which win ties
+                if rival_score > score or (rival_score == score and sibling < node):
+                    winner, score = rival, rival_score
+            node >>= 1
+            if winner == self.tree[node] and winner != position:
+                return
+            self.tree[node] = winner
+
+    def update_many(self, positions: np.ndarray, values: Values):
+        """
+        Replays the matches of several items, level by level, in O(k log n) for k positions.
+        """
+        nodes = np.unique((np.asarray(positions) + self.size) >> 1)
+        while len(nodes) and nodes[0]:
+            left = self._winners(2 * nodes)
+            right = self._winners(2 * nodes + 1)
+            right_scores = np.full(len(nodes), -np.inf)
+            valid = right < self.n_items
+            right_scores[valid] = values(right[valid])
+            self.tree[nodes] = np.where(right_scores > values(left), right, left)
+            nodes = np.unique(nodes >> 1)
+
+    def _winner(self, node: int) -> int:
+        return node - self.size if node >= self.size else int(self.tree[node])
+
+    def _winners(self, nodes: np.ndarray) -> np.ndarray:
+        return np.where(nodes >= self.size, nodes - self.size,
+                        self.tree[nodes % self.size]).astype(np.intp)
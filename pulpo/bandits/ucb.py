@@ -0,0 +1,308 @@
+import math
+from abc import abstractmethod
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from pulpo.bandits.arm_store import ArmStore, top_k_positions
+from pulpo.bandits.dataclasses import Arm, BanditConfig, Feedback, GaussianArm
+from pulpo.bandits.decay import make_arm_store
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.constants import fields
+
+# Upper bounds of KL-UCB are found within [mean, 1 - _KL_EPSILON], where the divergence is finite
+_KL_EPSILON = 1e-12
+_KL_TOLERANCE = 1e-10
+_KL_MAX_ITERATIONS = 50
+
+# Coefficients of the rational approximations of the normal quantile of Peter Acklam
+_ACKLAM_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+             1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_ACKLAM_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+             6.680131188771972e+01, -1.328068155288572e+01)
+_ACKLAM_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+             -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_ACKLAM_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+             3.754408661907416e+00)
+_ACKLAM_LOW = 0.02425
+
+
+def _polynomial(coefficients, x: float) -> float:
+    value = 0.0
+    for coefficient in coefficients:
+        value = value * x + coefficient
+    return value
+
+
+def normal_quantile(p: float) -> float:
+    """
+    Inverse of the standard normal CDF, with the rational approximation of Peter Acklam (relative
+    error below 1.2e-9) refined by one step of Halley's method on `math.erfc`, which brings it to
+    full double precision.
+
+    :param p: [float], probability, in (0, 1).
+    :return: [float], x such that P(Z <= x) = p for a standard normal Z.
+    """
+    if not 0 < p < 1:
+        raise ValueError("p must be in (0, 1), got {}".format(p))
+    if p > 0.5:
+        # By symmetry, since 1 - p is exact there and the lower tail keeps the precision of erfc
+        return -normal_quantile(1 - p)
+    if p < _ACKLAM_LOW:
+        q = math.sqrt(-2 * math.log(p))
+        x = _polynomial(_ACKLAM_C, q) / (_polynomial(_ACKLAM_D, q) * q + 1)
+    else:
+        q = p - 0.5
+        r = q * q
+        x = _polynomial(_ACKLAM_A, r) * q / (_polynomial(_ACKLAM_B, r) * r + 1)
+    error = 0.5 * math.erfc(-x / math.sqrt(2)) - p
+    step = error * math.sqrt(2 * math.pi) * math.exp(x * x / 2)
+    return x - step / (1 + x * step / 2)
+
+
+def bernoulli_kl(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    :return: [np.ndarray], Kullback-Leibler divergence of Bernoulli(q) from Bernoulli(p),
+    elementwise.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (np.where(p > 0, p * np.log(p / q), 0.0)
+                + np.where(p < 1, (1 - p) * np.log((1 - p) / (1 - q)), 0.0))
+
+
+def kl_upper_bounds(means: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    """
+    Solves max {q in [mean, 1] : kl(mean, q) <= level} for all the arms at once.
+
+    The root is searched in x = -ln(1 - q), in which kl(mean, q) is convex and increasing above the
+    mean and grows linearly instead of diverging as q approaches 1. Newton's method started above
+    the root then decreases monotonically to it, and Pinsker's inequality, kl(p, q) >= 2 (q - p)^2,
+    gives such a start at q = mean + sqrt(level / 2). The iterations run on whole arrays until every
+    bound has converged, which takes a handful of iterations, instead of one scalar root search per
+    arm.
+
+    :param means: [np.ndarray], empirical means, in [0, 1].
+    :param levels: [np.ndarray], non-negative divergence levels.
+    :return: [np.ndarray], upper confidence bounds.
+    """
+    means = np.clip(means, 0, 1)
+    bounds = np.minimum(means + np.sqrt(levels / 2), 1 - _KL_EPSILON)
+    active = (bounds > means) & (levels > 0)
+    p, level = means[active], levels[active]
+    lowest, highest = -np.log1p(-p), -np.log(_KL_EPSILON)
+    x = -np.log1p(-bounds[active])
+    q = bounds[active]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # kl(p, q) = p ln(p / q) + (1 - p) (ln(1 - p) + x), exact in x even when q rounds to 1
+        p_log_p = np.where(p > 0, p * np.log(p), 0.0)
+        complement_log = np.where(p < 1, (1 - p) * np.log1p(-p), 0.0)
+    for _ in range(_KL_MAX_ITERATIONS):
+        if not len(x):
+            break
+        divergence = p_log_p - p * np.log(q) + complement_log + (1 - p) * x
+        # d kl(p, q) / dx = (q - p) / q
+        x = np.clip(x - (divergence - level) * q / (q - p), lowest, highest)
+        updated = -np.expm1(-x)
+        converged = np.max(np.abs(updated - q)) < _KL_TOLERANCE
+        q = updated
+        if converged:
+            break
+    bounds[active] = q
+    # Without exploration, or with a mean of 1, the bound is the mean
+    bounds[~active] = means[~active]
+    return bounds
+
+
+class UCBBandit(OnlineBandit):
+    """
+    Base class of the upper confidence bound bandits, which choose the arm with the highest index,
+    an optimistic estimate of its mean reward that shrinks as the arm is chosen. Rewards are
+    expected in [0, 1].
+
+    The decisions are deterministic: the indices of all the arms are computed at once from the
+    statistics arrays, and the arms that were never chosen, without a prior, come first. `alpha`
+    sets the width of the exploration, as defined by every algorithm.
+    """
+    _DEFAULT_N = 0
+    _DEFAULT_REWARD_SUM = 0
+    _DEFAULT_SQUARED_REWARD_SUM = 0
+    _DEFAULT_ALPHA = 1.0
+
+    def __init__(self, bandit_id: str, arms: List[GaussianArm], alpha: float = None,
+                 seed: int = None, half_life: float = None, window: float = None):
+        """
+        :param arms: [List[GaussianArm]], arms with their prior statistics.
+        :param alpha: [float, default=None], width of the exploration. The default of the algorithm
+        if None.
+        :param seed: [int, default=None], seed of the random generator of the bandit
+        :param half_life: [float, default=None], if given, the statistics decay with this half life
+        in seconds
+        :param window: [float, default=None], if given, the statistics only count the feedback of
+        the last `window` seconds
+        """
+        super().__init__(bandit_id, seed)
+        self.alpha: float = self._DEFAULT_ALPHA if alpha is None else alpha
+        self.store: ArmStore = make_arm_store(GaussianArm, arms, half_life, window)
+
+    @classmethod
+    def make_from_bandit_config(cls, config: BanditConfig):
+        priors = config.priors or {}
+        parameters = config.parameters or {}
+        arms = [GaussianArm(arm_id, priors.get(fields.N, cls._DEFAULT_N),
+                            priors.get(fields.REWARD_SUM, cls._DEFAULT_REWARD_SUM),
+                            priors.get(fields.SQUARED_REWARD_SUM, cls._DEFAULT_SQUARED_REWARD_SUM))
+                for arm_id in config.arm_ids]
+
+        return cls(config.bandit_id, arms, parameters.get(fields.ALPHA),
+                   parameters.get(fields.SEED), parameters.get(fields.HALF_LIFE),
+                   parameters.get(fields.WINDOW))
+
+    def to_bandit_config(self) -> BanditConfig:
+        return BanditConfig(self.bandit_id, self.store.arm_ids,
+                            parameters={fields.ALPHA: self.alpha, **self.store.parameters(),
+                                        **self._seed_parameters()})
+
+    @abstractmethod
+    def _indices(self, n: np.ndarray, reward_sum: np.ndarray, squared_reward_sum: np.ndarray,
+                 log_t: float) -> np.ndarray:
+        """
+        :param n: [np.ndarray], number of rewards of every arm, all positive.
+        :param log_t: [float], logarithm of the total number of rewards, at least 1.
+        :return: [np.ndarray], index of every arm.
+        """
+        pass
+
+    @property
+    def arms_dict(self) -> Dict[str, GaussianArm]:
+        return self.store.arms()
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        return self.store.state_arrays()
+
+    def bind_state(self, arrays: Dict[str, np.ndarray]):
+        self.store.bind_state(arrays)
+
+    def indices(self) -> np.ndarray:
+        """
+        :return: [np.ndarray], index of every arm, infinite for the arms never chosen.
+        """
+        n = self.store[fields.N]
+        chosen = n > 0
+        indices = np.full(len(n), np.inf)
+        indices[chosen] = self._indices(n[chosen], self.store[fields.REWARD_SUM][chosen],
+                                        self.store[fields.SQUARED_REWARD_SUM][chosen],
+                                        self._log_t(n))
+        return indices
+
+    def choose(self, context: Dict[str, str] = None) -> Arm:
+        return self.store.arm(int(np.argmax(self.indices())))
+
+    def choose_many(self, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[Arm]:
+        if distinct:
+            return self.store.arms_at(top_k_positions(self.indices(), k))
+        return self.store.arms_at(np.full(k, np.argmax(self.indices())))
+
+    def check_feedback(self, feedback: Feedback):
+        self.store.position(feedback.arm_id)
+
+    def update(self, feedback: Feedback):
+        position = self.store.position(feedback.arm_id)
+        self.store.add(position, {fields.N: 1, fields.REWARD_SUM: feedback.reward,
+                                  fields.SQUARED_REWARD_SUM: pow(feedback.reward, 2)})
+
+    def update_many(self, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None):
+        rewards = np.asarray(rewards, dtype=np.float64)
+        self.store.add_many(self.store.positions(arm_ids),
+                            {fields.N: 1, fields.REWARD_SUM: rewards,
+                             fields.SQUARED_REWARD_SUM: np.square(rewards)})
+
+    def reset(self):
+        self.store.fill({fields.N: 0, fields.REWARD_SUM: 0, fields.SQUARED_REWARD_SUM: 0})
+
+    @staticmethod
+    def _log_t(n: np.ndarray) -> float:
+        # Clamped to 1, so that ln(ln(t)) and the exploration terms are defined and non-negative
+        # from the start
+        return max(math.log(max(float(np.sum(n)), 1.0)), 1.0)
+
+
+class UCB1(UCBBandit):
+    """
+    Implementation of the UCB1 algorithm of paper:
+
+    Finite-time Analysis of the Multiarmed Bandit Problem
+    Peter Auer, Nicolò Cesa-Bianchi, Paul Fischer
+
+    The index of an arm is mean + sqrt(alpha * ln(t) / n), with alpha = 2 in the paper.
+    """
+    _DEFAULT_ALPHA = 2.0
+
+    def _indices(self, n, reward_sum, squared_reward_sum, log_t):
+        return reward_sum / n + np.sqrt(self.alpha * log_t / n)
+
+
+class UCBV(UCBBandit):
+    """
+    Implementation of the UCB-V algorithm of paper:
+
+    Exploration-exploitation tradeoff using variance estimates in multi-armed bandits
+    Jean-Yves Audibert, Rémi Munos, Csaba Szepesvári
+
+    The index of an arm is mean + sqrt(2 * variance * e / n) + 3 * e / n with e = alpha * ln(t), so
+    arms with steady rewards are explored less than with UCB1. alpha is the zeta of the paper, 1.2
+    by default.
+    """
+    _DEFAULT_ALPHA = 1.2
+
+    def _indices(self, n, reward_sum, squared_reward_sum, log_t):
+        mean = reward_sum / n
+        # Rounding can push the variance of an arm with constant rewards slightly below zero
+        variance = np.maximum(squared_reward_sum / n - np.square(mean), 0)
+        exploration = self.alpha * log_t / n
+        return mean + np.sqrt(2 * variance * exploration) + 3 * exploration
+
+
+class KLUCB(UCBBandit):
+    """
+    Implementation of the KL-UCB algorithm for Bernoulli rewards of paper:
+
+    The KL-UCB Algorithm for Bounded Stochastic Bandits and Beyond
+    Aurélien Garivier, Olivier Cappé
+
+    The index of an arm is the largest q such that n * kl(mean, q) <= ln(t) + alpha * ln(ln(t)),
+    found for all the arms at once with `kl_upper_bounds`. alpha is the c of the paper, 0 by default
+    as recommended there for practical use.
+    """
+    _DEFAULT_ALPHA = 0.0
+
+    def _indices(self, n, reward_sum, squared_reward_sum, log_t):
+        return kl_upper_bounds(reward_sum / n, (log_t + self.alpha * np.log(log_t)) / n)
+
+
+class BayesUCB(UCBBandit):
+    """
+    Implementation of the Bayes-UCB algorithm for Bernoulli rewards of paper:
+
+    On Bayesian Upper Confidence Bounds for Bandit Problems
+    Emilie Kaufmann, Olivier Cappé, Aurélien Garivier
+
+    The index of an arm is the quantile of order 1 - 1 / (t * ln(t)^alpha) of the Beta(1 + rewards,
+    1 + n - rewards) posterior of its mean, without the horizon of the paper. The quantile is
+    computed with the normal approximation of the posterior, so that a single inverse normal CDF
+    serves all the arms. alpha is the c of the paper, 0 by default as recommended there for
+    practical use.
+    """
+    _DEFAULT_ALPHA = 0.0
+
+    def indices(self) -> np.ndarray:
+        # The posterior of an arm never chosen is the uniform prior, so every arm has a finite index
+        n = self.store[fields.N]
+        return self._indices(n, self.store[fields.REWARD_SUM],
+                             self.store[fields.SQUARED_REWARD_SUM], self._log_t(n))
+
+    def _indices(self, n, reward_sum, squared_reward_sum, log_t):
+        mean = (reward_sum + 1) / (n + 2)
+        deviation = np.sqrt(mean * (1 - mean) / (n + 3))
+        return mean + normal_quantile(1 - np.exp(-log_t) / log_t ** self.alpha) * deviation
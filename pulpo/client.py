@@ -0,0 +1,318 @@
+import itertools
+import json
+import logging
+import queue
+import socket
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_Event = Tuple[str, str, float, Optional[dict], Optional[str]]
+
+
+class PulpoServerError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__("{}: {}".format(status, message))
+        self.status: int = status
+
+
+class _Connection:
+    """
+    Persistent HTTP/1.1 connection to a pulpo server, used by one request at a time.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.socket: socket.socket = socket.create_connection((host, port), timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile('rb')
+        self.host: str = host
+
+    def request(self, path: str, payload: dict) -> Tuple[int, dict]:
+        self.socket.sendall(self._encode(path, payload))
+        return self._read_response()
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def _encode(self, path: str, payload: dict) -> bytes:
+        body = json.dumps(payload).encode('utf-8')
+        return ('POST {} HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\n'
+                'Content-Length: {}\r\n\r\n'
+                .format(path, self.host, len(body)).encode('latin-1') + body)
+
+    def _read_response(self) -> Tuple[int, dict]:
+        status_line = self.file.readline()
+        if not status_line:
+            raise ConnectionError("The server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = self.file.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                length = int(value)
+        body = self.file.read(length) if length else b''
+        return status, json.loads(body) if body else {}
+
+
+class _ConnectionPool:
+    """
+    At most `size` connections, reused in last-in first-out order so that idle connections are the
+    ones the server may have closed.
+    """
+
+    def __init__(self, host: str, port: int, size: int, timeout: float):
+        self.host: str = host
+        self.port: int = port
+        self.timeout: float = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots: threading.BoundedSemaphore = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self, fresh: bool = False):
+        with self._slots:
+            connection = None
+            if not fresh:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    pass
+            if connection is None:
+                connection = _Connection(self.host, self.port, self.timeout)
+            try:
+                yield connection
+            except BaseException:
+                # The connection may hold unread responses
+                connection.close()
+                raise
+            self._idle.put(connection)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PulpoClient:
+    """
+    Client of a pulpo decision server (see `pulpo.server`), with the `choose` and `update`
+    signatures of Pulpo.
+
+    Requests go through a pool of persistent connections shared by the threads of the application.
+    Feedback is not sent by `update`: it is buffered and sent in batches, once `batch_size` events
+    are buffered or every `flush_interval` seconds from a background thread, and on `flush` and
+    `close`. A batch is one `/update_events` request, so it costs one round-trip, and is sent with a
+    batch id that the server uses to apply it only once. A batch is kept until the server
+    acknowledged it: if it cannot be delivered, e.g. while the server is down or when the connection
+    is lost before the response, `flush` raises and the batch is sent again, with the same batch id,
+    by the next flush, so feedback is delivered exactly once. The events the server rejects, e.g.
+    for an unknown arm, and the oldest batches once more than `max_pending` events are kept, are
+    dropped and counted in `n_dropped`. Errors of the background flushes are logged.
+
+    Usage:
+
+        with PulpoClient("localhost", 8000) as pulpo:
+            arm_id = pulpo.choose(bandit_id)
+            pulpo.update(bandit_id, arm_id, reward)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8000, pool_size: int = 8,
+                 batch_size: int = 256, flush_interval: Optional[float] = 0.1,
+                 timeout: float = 5.0, max_pending: int = 65536):
+        """
+        PulpoClient constructor.
+
+        :param host: [str, default='127.0.0.1'], host of the server.
+        :param port: [int, default=8000], port of the server.
+        :param pool_size: [int, default=8], maximum number of connections.
+        :param batch_size: [int, default=256], number of buffered feedback events that triggers a
+        flush.
+        :param flush_interval: [float, default=0.1], maximum seconds an event stays buffered, or
+        None to only flush by size or explicitly.
+        :param timeout: [float, default=5.0], socket timeout in seconds.
+        :param max_pending: [int, default=65536], maximum number of flushed events kept until the
+        server acknowledges them, beyond which the oldest batches are dropped.
+        """
+        self.batch_size: int = batch_size
+        self.flush_interval: Optional[float] = flush_interval
+        self.max_pending: int = max_pending
+        self.n_dropped: int = 0
+        self._pool: _ConnectionPool = _ConnectionPool(host, port, pool_size, timeout)
+        self._buffer: List[_Event] = []
+        self._buffer_lock: threading.Lock = threading.Lock()
+        # Flushed batches not acknowledged by the server yet, oldest first, sent by one thread at a
+        # time
+        self._pending: Deque[Tuple[str, List[_Event]]] = deque()
+        self._n_pending: int = 0
+        self._send_lock: threading.Lock = threading.Lock()
+        self._batch_prefix: str = uuid.uuid4().hex
+        self._batch_numbers = itertools.count()
+        self._closed: threading.Event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_periodically,
+                                             name='pulpo-client-flush', daemon=True)
+            self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def choose(self, bandit_id: str, context: Dict[str, str] = None) -> str:
+        """
+        Chooses an arm, see `Pulpo.choose`.
+
+        :return: [str], an arm name
+        """
+        return self._request('/choose',
+                             self._payload(bandit_id=bandit_id, context=context))['arm_id']
+
+    def choose_batch(self, bandit_ids: List[str], context: Dict[str, str] = None) -> List[str]:
+        """
+        Chooses one arm for each of the given bandit ids in one request, see `Pulpo.choose_batch`.
+
+        :return: [List[str]], an arm name per bandit id, in the same order
+        """
+        return self._request('/choose_batch',
+                             self._payload(bandit_ids=bandit_ids, context=context))['arm_ids']
+
+    def update(self, bandit_id: str, arm_id: str, reward: float, payload: str = None,
+               context: Dict[str, str] = None):
+        """
+        Buffers feedback, see `Pulpo.update`.
+        """
+        self._buffer_events([(bandit_id, arm_id, float(reward), context, payload)])
+
+    def update_many(self, bandit_id: str, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None, payloads: Sequence[Optional[str]] = None):
+        """
+        Buffers a batch of feedback, see `Pulpo.update_many`.
+        """
+        if len(arm_ids) != len(rewards) or (payloads is not None and len(payloads) != len(arm_ids)):
+            raise ValueError("arm_ids, rewards and payloads must have the same length")
+        if payloads is None:
+            payloads = [None] * len(arm_ids)
+        self._buffer_events([(bandit_id, arm_id, float(reward), context, payload)
+                             for arm_id, reward, payload in zip(arm_ids, rewards, payloads)])
+
+    def flush(self):
+        """
+        Sends the buffered feedback and the batches that could not be delivered before, raising
+        `OSError` or `PulpoServerError` if a batch could not be delivered, and `PulpoServerError` if
+        the server rejected events.
+        """
+        with self._send_lock:
+            with self._buffer_lock:
+                events, self._buffer = self._buffer, []
+            if events:
+                batch_id = '{}-{}'.format(self._batch_prefix, next(self._batch_numbers))
+                self._pending.append((batch_id, events))
+                self._n_pending += len(events)
+                while self._n_pending > self.max_pending:
+                    self._drop_pending("the client holds more than {} events"
+                                       .format(self.max_pending))
+
+            n_rejected, error = 0, None
+            while self._pending:
+                batch_id, events = self._pending[0]
+                try:
+                    failed = self._send_events(batch_id, events)
+                except (KeyError, PulpoServerError) as rejection:
+                    if isinstance(rejection, PulpoServerError) and rejection.status >= 500:
+                        raise
+                    # The request was rejected as a whole, so sending it again would fail again
+                    self._drop_pending(rejection)
+                    raise
+                self._pending.popleft()
+                self._n_pending -= len(events)
+                if failed:
+                    self.n_dropped += len(failed)
+                    n_rejected += len(failed)
+                    error = failed[0]['error']
+                    logger.warning("The server rejected %d feedback events, e.g. %s",
+                                   len(failed), error)
+            if n_rejected:
+                raise PulpoServerError(400, "{} feedback events were not applied, e.g. {}"
+                                       .format(n_rejected, error))
+
+    def close(self):
+        """
+        Sends the buffered feedback and closes the connections.
+        """
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        try:
+            self.flush()
+        finally:
+            with self._send_lock:
+                while self._pending:
+                    self._drop_pending("the client is closed")
+            self._pool.close()
+
+    def _buffer_events(self, events: List[_Event]):
+        if self._closed.is_set():
+            raise RuntimeError("The client is closed")
+        with self._buffer_lock:
+            self._buffer.extend(events)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def _send_events(self, batch_id: str, events: List[_Event]) -> List[dict]:
+        """
+        :return: [List[dict]], failures of the events that the server did not apply
+        """
+        encoded = []
+        for bandit_id, arm_id, reward, context, payload in events:
+            if payload is not None:
+                encoded.append([bandit_id, arm_id, reward, context or None, payload])
+            elif context:
+                encoded.append([bandit_id, arm_id, reward, context])
+            else:
+                encoded.append([bandit_id, arm_id, reward])
+        return self._request('/update_events', {'batch_id': batch_id, 'events': encoded})['failed']
+
+    def _drop_pending(self, reason):
+        _, events = self._pending.popleft()
+        self._n_pending -= len(events)
+        self.n_dropped += len(events)
+        logger.error("Dropped %d feedback events that could not be delivered: %s",
+                     len(events), reason)
+
+    def _request(self, path: str, payload: dict) -> dict:
+        try:
+            with self._pool.connection() as connection:
+                status, body = connection.request(path, payload)
+        except OSError:
+            with self._pool.connection(fresh=True) as connection:
+                status, body = connection.request(path, payload)
+        if status == 404:
+            raise KeyError(body.get('error'))
+        if status != 200:
+            raise PulpoServerError(status, body.get('error'))
+        return body
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush the feedback, %d events are kept to be sent "
+                                 "again", self._n_pending)
+
+    @staticmethod
+    def _payload(**values) -> dict:
+        return {name: value for name, value in values.items() if value is not None}
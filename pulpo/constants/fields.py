@@ -5,11 +5,50 @@ PRIORS = 'priors'
 ARM_IDS = 'arm_ids'
 PARAMETERS = 'parameters'
 
+# Logged events
+ARM_ID = 'arm_id'
+REWARD = 'reward'
+PROPENSITY = 'propensity'
+CONTEXT = 'context'
+
 # Values
 N = 'n'
 REWARD_SUM = 'reward_sum'
 SQUARED_REWARD_SUM = 'squared_reward_sum'
 N_REWARDS = 'n_rewards'
 
+# State arrays
+ARM_STATISTICS = 'arm_statistics'
+CONTEXT_HASHES = 'context_hashes'
+CONTEXT_LAST_USED = 'context_last_used'
+CONTEXT_CLOCK = 'context_clock'
+CONTEXT_PREFIX = 'context_'
+INVERSE_COVARIANCES = 'inverse_covariances'
+WEIGHTED_FEATURES = 'weighted_features'
+COEFFICIENTS = 'coefficients'
+MEAN_TREE = 'mean_tree'
+ALIAS_PROBABILITIES = 'alias_probabilities'
+ALIAS_INDICES = 'alias_indices'
+ALIAS_DRIFT = 'alias_drift'
+ALIAS_DRIFT_TOTALS = 'alias_drift_totals'
+PRIOR_STATISTICS = 'prior_statistics'
+DECAYED_STATISTICS = 'decayed_statistics'
+DECAY_REFERENCE = 'decay_reference'
+WINDOW_STATISTICS = 'window_statistics'
+WINDOW_EPOCHS = 'window_epochs'
+
 # Parametres
 EPSILON = 'epsilon'
+SEED = 'seed'
+MAX_CONTEXTS = 'max_contexts'
+FEATURES = 'features'
+ALPHA = 'alpha'
+REGULARIZATION = 'regularization'
+HALF_LIFE = 'half_life'
+WINDOW = 'window'
+TEMPERATURE = 'temperature'
+MIN_PROBABILITY = 'min_probability'
+REBUILD_TOLERANCE = 'rebuild_tolerance'
+CACHE_SIZE = 'cache_size'
+CACHE_UPDATES = 'cache_updates'
+CACHE_TTL = 'cache_ttl'
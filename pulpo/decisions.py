@@ -0,0 +1,171 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pulpo.bandits.contextual import context_hash
+
+Decision = Tuple[str, str, Optional[Dict[str, str]]]
+
+
+class DecisionTable:
+    """
+    Pending decisions of Pulpo, waiting for their reward.
+
+    Decisions get consecutive ids and live in a ring buffer of `capacity` slots, in columnar form:
+    the time of the decision and interned codes of its bandit and arm. Since ids and times grow
+    together, the decisions that outlived `ttl` are always the oldest ones, so expiring them only
+    moves the tail of the ring, and the slot of a decision id is found without any lookup table.
+    When the ring is full, the oldest decisions expire early to make room.
+    """
+
+    def __init__(self, ttl: float = 3600.0, capacity: int = 1 << 20,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        DecisionTable constructor.
+
+        :param ttl: [float, default=3600.0], seconds a decision waits for its reward before it
+        expires.
+        :param capacity: [int, default=1048576], maximum number of pending decisions.
+        :param clock: [Callable[[], float], default=time.monotonic], current time in seconds.
+        """
+        self.ttl: float = ttl
+        self.capacity: int = capacity
+        self.clock: Callable[[], float] = clock
+
+        self.ids: np.ndarray = np.full(capacity, -1, dtype=np.int64)
+        self.times: np.ndarray = np.zeros(capacity)
+        self.bandit_codes: np.ndarray = np.zeros(capacity, dtype=np.int32)
+        self.arm_codes: np.ndarray = np.zeros(capacity, dtype=np.int32)
+        self.pending: np.ndarray = np.zeros(capacity, dtype=bool)
+        self.contexts: np.ndarray = np.empty(capacity, dtype=object)
+        self.head: int = 0
+        self.tail: int = 0
+
+        self._bandit_codes: Dict[str, int] = {}
+        self._bandit_ids: List[str] = []
+        self._arm_codes: Dict[str, int] = {}
+        self._arm_ids: List[str] = []
+
+    def __len__(self) -> int:
+        """
+        :return: [int], number of decisions in the ring, including those that already received their
+        reward.
+        """
+        return self.head - self.tail
+
+    def add(self, bandit_id: str, arm_id: str, context: Dict[str, str] = None) -> int:
+        """
+        Records a decision. The ring must have room for it, see `expire`.
+
+        :return: [int], decision id.
+        """
+        if self.head - self.tail >= self.capacity:
+            raise OverflowError("The decision table is full")
+        decision_id = self.head
+        slot = decision_id % self.capacity
+        self.ids[slot] = decision_id
+        self.times[slot] = self.clock()
+        self.bandit_codes[slot] = self._intern(bandit_id, self._bandit_codes, self._bandit_ids)
+        self.arm_codes[slot] = self._intern(arm_id, self._arm_codes, self._arm_ids)
+        self.pending[slot] = True
+        self.contexts[slot] = context
+        self.head += 1
+        return decision_id
+
+    def get(self, decision_id: int) -> Decision:
+        """
+        Finds a pending decision without removing it, e.g. to apply its reward before `pop`.
+
+        :return: [Tuple[str, str, dict]], bandit id, arm id and context of the decision.
+        """
+        slot = decision_id % self.capacity
+        if not (self.tail <= decision_id < self.head and self.ids[slot] == decision_id
+                and self.pending[slot]):
+            raise KeyError("Decision {} is unknown, expired or already rewarded"
+                           .format(decision_id))
+        return (self._bandit_ids[self.bandit_codes[slot]], self._arm_ids[self.arm_codes[slot]],
+                self.contexts[slot])
+
+    def pop(self, decision_id: int) -> Decision:
+        """
+        Removes a pending decision.
+
+        :return: [Tuple[str, str, dict]], bandit id, arm id and context of the decision.
+        """
+        decision = self.get(decision_id)
+        slot = decision_id % self.capacity
+        self.pending[slot] = False
+        self.contexts[slot] = None
+        return decision
+
+    def expire(self, reserve: int = 0,
+               apply: Callable[[str, Optional[Dict[str, str]], List[str]], None] = None
+               ) -> List[Tuple[str, Optional[Dict[str, str]], List[str]]]:
+        """
+        Removes the decisions older than `ttl`, and the oldest decisions beyond
+        `capacity - reserve`.
+
+        :param reserve: [int, default=0], number of slots to free for new decisions.
+        :param apply: [Callable[[str, dict, List[str]], None], default=None], called with the bandit
+        id, context and arm ids of every group of expired decisions still waiting for their reward.
+        A group is removed only once `apply` returns, and the tail of the ring moves only once every
+        group is removed, so if `apply` raises, the groups it did not apply are still pending for
+        the next call.
+        :return: [List[Tuple[str, dict, List[str]]]], arm ids of the expired decisions still waiting
+        for their reward, grouped by bandit id and context.
+        """
+        oldest_alive = self.clock() - self.ttl
+        start, end = self.tail % self.capacity, self.head % self.capacity
+        wrapped = start >= end and self.head > self.tail
+        segments = [(start, self.capacity), (0, end)] if wrapped else [(start, end)]
+        n_expired = 0
+        for segment_start, segment_end in segments:
+            times = self.times[segment_start:segment_end]
+            n_segment = int(np.searchsorted(times, oldest_alive, side='right'))
+            n_expired += n_segment
+            if n_segment < segment_end - segment_start:
+                break
+        n_expired = max(n_expired, len(self) - (self.capacity - reserve))
+        if n_expired <= 0:
+            return []
+
+        slots = np.arange(self.tail, self.tail + n_expired) % self.capacity
+        groups = self._group(slots[self.pending[slots]])
+        for bandit_id, context, arm_ids, group_slots in groups:
+            if apply is not None:
+                apply(bandit_id, context, arm_ids)
+            self.pending[group_slots] = False
+            self.contexts[group_slots] = None
+        self.tail += n_expired
+        return [(bandit_id, context, arm_ids) for bandit_id, context, arm_ids, _ in groups]
+
+    def _group(self, slots: np.ndarray
+               ) -> List[Tuple[str, Optional[Dict[str, str]], List[str], np.ndarray]]:
+        contexts = self.contexts[slots]
+        if any(context is not None for context in contexts):
+            groups: Dict[Tuple[int, int], List[int]] = {}
+            bandit_codes = self.bandit_codes[slots].tolist()
+            for position, (bandit_code, context) in enumerate(zip(bandit_codes, contexts)):
+                key = (bandit_code, context_hash(context))
+                groups.setdefault(key, []).append(position)
+            return [(self._bandit_ids[bandit_code], contexts[positions[0]],
+                     [self._arm_ids[code] for code in self.arm_codes[slots[positions]].tolist()],
+                     slots[positions])
+                    for (bandit_code, _), positions in groups.items()]
+
+        bandit_codes = self.bandit_codes[slots]
+        order = np.argsort(bandit_codes, kind='stable')
+        boundaries = np.flatnonzero(np.diff(bandit_codes[order])) + 1
+        return [(self._bandit_ids[bandit_codes[positions[0]]], None,
+                 [self._arm_ids[code] for code in self.arm_codes[slots[positions]].tolist()],
+                 slots[positions])
+                for positions in np.split(order, boundaries) if len(positions)]
+
+    @staticmethod
+    def _intern(key: str, codes: Dict[str, int], keys: List[str]) -> int:
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(keys)
+            keys.append(key)
+        return code
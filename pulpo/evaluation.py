@@ -0,0 +1,260 @@
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.constants import fields
+
+
+@dataclass
+class LoggedEvents:
+    """
+    Chunk of logged decisions in columnar form: the arm chosen by the logging policy, its reward,
+    the probability with which the logging policy chose it and the context of the decision, or None.
+    """
+    arm_ids: np.ndarray
+    rewards: np.ndarray
+    propensities: np.ndarray
+    contexts: List[Optional[dict]]
+
+    def __len__(self) -> int:
+        return len(self.arm_ids)
+
+
+@dataclass
+class EvaluationResult:
+    """
+    Estimated average reward per decision of a policy on a log.
+
+    replay: mean reward of the logged events on which the policy chose the logged arm.
+    ips: inverse propensity scoring estimate, with its standard error.
+    dr: doubly robust estimate, with its standard error.
+    """
+    n_events: int
+    n_matched: int
+    replay: float
+    ips: float
+    ips_stderr: float
+    dr: float
+    dr_stderr: float
+
+
+def read_logged_events(path: str, chunk_size: int = 65536) -> Iterator[LoggedEvents]:
+    """
+    Streams a log of JSON lines with the fields `arm_id`, `reward`, `propensity` and optionally
+    `context`, `chunk_size` events at a time, so the log never has to fit in memory. Raises
+    `ValueError` for an event whose propensity is not positive, as it cannot be reweighted.
+
+    :param path: [str], path of the log
+    :param chunk_size: [int, default=65536], number of events per chunk
+    """
+    with open(path) as log_file:
+        n_read = 0
+        while True:
+            records = [json.loads(line) for line in itertools.islice(log_file, chunk_size)]
+            if not records:
+                return
+            propensities = np.fromiter((record[fields.PROPENSITY] for record in records),
+                                       dtype=np.float64, count=len(records))
+            invalid = np.flatnonzero(~(propensities > 0))
+            if len(invalid):
+                raise ValueError("Event {} of {} has propensity {}, propensities must be positive"
+                                 .format(n_read + invalid[0], path, propensities[invalid[0]]))
+            n_read += len(records)
+            arm_ids = np.array([record[fields.ARM_ID] for record in records], dtype=object)
+            yield LoggedEvents(arm_ids,
+                               np.fromiter((record[fields.REWARD] for record in records),
+                                           dtype=np.float64, count=len(records)),
+                               propensities,
+                               [record.get(fields.CONTEXT) for record in records])
+
+
+class OfflineEvaluator:
+    """
+    Estimates the value of a bandit on logged traffic, with the estimators of:
+
+    Unbiased Offline Evaluation of Contextual-bandit-based News Article Recommendation Algorithms
+    Lihong Li, Wei Chu, John Langford, Xuanhui Wang
+
+    Doubly Robust Policy Evaluation and Learning
+    Miroslav Dudík, John Langford, Lihong Li
+
+    The bandit decides every logged event and learns from the events on which it chose the logged
+    arm, as it would have in production. Decisions are made `batch_size` events at a time with one
+    `choose_many` call per distinct context, and the matched feedback of a batch is applied with
+    `update_many`, so the bandit sees feedback with a delay of up to `batch_size` events, like a
+    service that merges feedback in batches. The reward model of the doubly robust estimator is the
+    mean logged reward of every arm in every discrete context, falling back to its mean over all the
+    contexts, and it is only updated after the batch is estimated.
+    """
+
+    def __init__(self, bandit: OnlineBandit, batch_size: int = 100):
+        """
+        OfflineEvaluator constructor.
+
+        :param bandit: [OnlineBandit], bandit to evaluate. It learns from the log.
+        :param batch_size: [int, default=100], number of events decided before the bandit is
+        updated.
+        """
+        self.bandit: OnlineBandit = bandit
+        self.batch_size: int = batch_size
+        self.arm_ids: List[str] = list(bandit.to_bandit_config().arm_ids)
+        self.positions: Dict[str, int] = {arm_id: position
+                                          for position, arm_id in enumerate(self.arm_ids)}
+        n_arms = len(self.arm_ids)
+        # Reward model: sums and counts of the logged rewards per arm, per discrete context and
+        # overall
+        self._model: Dict[Optional[str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._overall: Tuple[np.ndarray, np.ndarray] = (np.zeros(n_arms), np.zeros(n_arms))
+
+        self.n_events: int = 0
+        self.n_matched: int = 0
+        self._replay_sum: float = 0.0
+        self._ips_sums: np.ndarray = np.zeros(2)
+        self._dr_sums: np.ndarray = np.zeros(2)
+
+    def process(self, events: LoggedEvents):
+        """
+        Evaluates the bandit on a chunk of the log.
+        """
+        logged = np.fromiter((self.positions.get(arm_id, -1) for arm_id in events.arm_ids),
+                             dtype=np.intp, count=len(events))
+        for start in range(0, len(events), self.batch_size):
+            end = min(start + self.batch_size, len(events))
+            for context, key, rows in self._group_by_context(events.contexts, start, end):
+                self._process_group(context, key, rows, logged[rows], events.rewards[rows],
+                                    events.propensities[rows], events.arm_ids[rows])
+
+    def result(self) -> EvaluationResult:
+        replay = self._replay_sum / self.n_matched if self.n_matched else float('nan')
+        return EvaluationResult(self.n_events, self.n_matched, replay,
+                                *self._mean_and_stderr(self._ips_sums),
+                                *self._mean_and_stderr(self._dr_sums))
+
+    def _process_group(self, context: Optional[dict], key: Optional[str], rows: np.ndarray,
+                       logged: np.ndarray, rewards: np.ndarray, propensities: np.ndarray,
+                       logged_arm_ids: np.ndarray):
+        arms = self.bandit.choose_many(len(rows), context)
+        chosen = np.fromiter((self.positions[arm.arm_id] for arm in arms), dtype=np.intp,
+                             count=len(rows))
+        matched = chosen == logged
+
+        estimates = self._estimates(key)
+        # Only the matched events are reweighted, the propensities of the others are not divided by
+        ips = np.divide(rewards, propensities, out=np.zeros_like(rewards), where=matched)
+        known = logged >= 0
+        logged_estimates = np.where(known, estimates[np.where(known, logged, 0)], 0.0)
+        dr = estimates[chosen] + np.divide(rewards - logged_estimates, propensities,
+                                           out=np.zeros_like(rewards), where=matched)
+
+        self.n_events += len(rows)
+        self.n_matched += int(np.count_nonzero(matched))
+        self._replay_sum += float(rewards[matched].sum())
+        self._ips_sums += (ips.sum(), (ips ** 2).sum())
+        self._dr_sums += (dr.sum(), (dr ** 2).sum())
+
+        models = [self._overall]
+        if key is not None:
+            models.append(self._model.setdefault(key, self._empty_model()))
+        for sums, counts in models:
+            np.add.at(sums, logged[known], rewards[known])
+            np.add.at(counts, logged[known], 1)
+
+        if matched.any():
+            self.bandit.update_many(logged_arm_ids[matched].tolist(), rewards[matched], context)
+
+    def _estimates(self, key: Optional[str]) -> np.ndarray:
+        sums, counts = self._overall
+        estimates = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        if key in self._model:
+            context_sums, context_counts = self._model[key]
+            estimates = np.divide(context_sums, context_counts, out=estimates,
+                                  where=context_counts > 0)
+        return estimates
+
+    def _empty_model(self) -> Tuple[np.ndarray, np.ndarray]:
+        return np.zeros(len(self.arm_ids)), np.zeros(len(self.arm_ids))
+
+    def _mean_and_stderr(self, sums: np.ndarray) -> Tuple[float, float]:
+        if not self.n_events:
+            return float('nan'), float('nan')
+        mean = sums[0] / self.n_events
+        variance = max(sums[1] / self.n_events - mean ** 2, 0.0)
+        return float(mean), math.sqrt(variance / self.n_events)
+
+    @staticmethod
+    def _group_by_context(contexts: List[Optional[dict]], start: int, end: int):
+        """
+        Yields the context, the reward model key and the rows of every distinct context of the
+        batch. Only contexts with discrete values have their own reward model, other contexts use
+        the overall one.
+        """
+        if all(context is None for context in contexts[start:end]):
+            yield None, None, np.arange(start, end)
+            return
+        groups: Dict[str, List[int]] = {}
+        for row in range(start, end):
+            groups.setdefault(json.dumps(contexts[row], sort_keys=True), []).append(row)
+        for encoded, rows in groups.items():
+            context = contexts[rows[0]]
+            discrete = (isinstance(context, dict)
+                        and all(isinstance(value, str) for value in context.values()))
+            yield context, encoded if discrete else None, np.array(rows)
+
+
+def evaluate(bandit: OnlineBandit, events: Iterable[LoggedEvents],
+             batch_size: int = 100) -> EvaluationResult:
+    """
+    Estimates the value of a bandit on a stream of logged events, see `OfflineEvaluator`.
+    """
+    evaluator = OfflineEvaluator(bandit, batch_size)
+    for chunk in events:
+        evaluator.process(chunk)
+    return evaluator.result()
+
+
+def evaluate_many(instructions: List[dict], path: str, processes: int = None,
+                  chunk_size: int = 65536, batch_size: int = 100) -> List[EvaluationResult]:
+    """
+    Estimates the value of candidate bandit configurations on a log written as in
+    `read_logged_events`.
+
+    The candidates are split among `processes` worker processes, and every worker streams the log
+    once, evaluating all its candidates on each chunk, so memory is bounded by the chunk size
+    whatever the size of the log.
+
+    :param instructions: [List[dict]], `BanditFactory.make_bandit` instructions of the candidates.
+    Set a seed in their parameters for reproducible results.
+    :param path: [str], path of the log
+    :param processes: [int, default=None], number of worker processes, by default the number of CPUs
+    :param chunk_size: [int, default=65536], number of events read at a time
+    :param batch_size: [int, default=100], number of events decided before a candidate is updated
+    :return: [List[EvaluationResult]], result of every candidate, in order
+    """
+    processes = max(min(processes or os.cpu_count() or 1, len(instructions)), 1)
+    groups = [instructions[worker::processes] for worker in range(processes)]
+    with ProcessPoolExecutor(processes) as executor:
+        group_results = list(executor.map(_evaluate_group, groups, itertools.repeat(path),
+                                          itertools.repeat(chunk_size),
+                                          itertools.repeat(batch_size)))
+    results: List[EvaluationResult] = [None] * len(instructions)
+    for worker, worker_results in enumerate(group_results):
+        results[worker::processes] = worker_results
+    return results
+
+
+def _evaluate_group(instructions: List[dict], path: str, chunk_size: int,
+                    batch_size: int) -> List[EvaluationResult]:
+    evaluators = [OfflineEvaluator(BanditFactory.make_bandit(instruction), batch_size)
+                  for instruction in instructions]
+    for chunk in read_logged_events(path, chunk_size):
+        for evaluator in evaluators:
+            evaluator.process(chunk)
+    return [evaluator.result() for evaluator in evaluators]
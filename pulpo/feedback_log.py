@@ -0,0 +1,376 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pulpo.bandits.online_bandits import OnlineBandit
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'PULPOWAL'
+_FILE_HEADER = struct.Struct('<8sQ')
+_BLOCK_MAGIC = b'PFB1'
+_BLOCK_HEADER = struct.Struct('<4sIIIII')
+_NO_PAYLOAD = -1
+
+_Key = Tuple[str, Optional[str], Optional[str]]
+
+
+@dataclass
+class LogBlock:
+    """
+    Feedback events of one block of a feedback log, in columnar form. Events whose arm id is None
+    are bandit resets. Contexts are JSON encoded, feature arrays as lists, or None. `groups` numbers
+    the distinct (bandit id, context) pairs of the log. Payloads are decoded on demand with
+    `payloads`, as replay doesn't need them.
+    """
+    offset: int
+    end: int
+    bandit_ids: np.ndarray
+    arm_ids: np.ndarray
+    contexts: np.ndarray
+    groups: np.ndarray
+    rewards: np.ndarray
+    payload_lengths: np.ndarray
+    encoded_payloads: bytes
+
+    def payloads(self) -> List[Optional[str]]:
+        payloads = []
+        position = 0
+        for length in self.payload_lengths.tolist():
+            if length == _NO_PAYLOAD:
+                payloads.append(None)
+            else:
+                payloads.append(self.encoded_payloads[position:position + length].decode('utf-8'))
+                position += length
+        return payloads
+
+
+class _KeyTable:
+    """
+    Interned (bandit id, arm id, context) keys of a log file, with growable arrays so that the keys
+    of a block of events are resolved with one fancy indexing operation.
+    """
+
+    def __init__(self):
+        self.codes: Dict[_Key, int] = {}
+        self.group_codes: Dict[Tuple[str, Optional[str]], int] = {}
+        self.bandit_ids = np.empty(64, dtype=object)
+        self.arm_ids = np.empty(64, dtype=object)
+        self.contexts = np.empty(64, dtype=object)
+        self.groups = np.empty(64, dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def add(self, keys: List[_Key]):
+        size = len(self.codes) + len(keys)
+        if size > len(self.bandit_ids):
+            capacity = max(size, 2 * len(self.bandit_ids))
+            self.bandit_ids = np.resize(self.bandit_ids, capacity)
+            self.arm_ids = np.resize(self.arm_ids, capacity)
+            self.contexts = np.resize(self.contexts, capacity)
+            self.groups = np.resize(self.groups, capacity)
+        for bandit_id, arm_id, context in keys:
+            code = len(self.codes)
+            self.codes[(bandit_id, arm_id, context)] = code
+            self.bandit_ids[code] = bandit_id
+            self.arm_ids[code] = arm_id
+            self.contexts[code] = context
+            self.groups[code] = self.group_codes.setdefault((bandit_id, context),
+                                                            len(self.group_codes))
+
+
+class FeedbackLog:
+    """
+    Append-only binary log of the feedback and resets applied by Pulpo.
+
+    Events are buffered and written as one block, followed by one fsync, every `sync_size` events or
+    `sync_interval` seconds, so at most that much feedback is lost on a crash. The interval is kept
+    by a background thread, so the events of an idle process are written as well. A block stores the
+    events in columnar form (rewards, interned key codes, payload lengths) plus the keys and
+    payloads it introduces, and a CRC32 so that a block torn by a crash is detected and dropped.
+    Every log file has a generation number, which grows each time the log is compacted into a
+    snapshot (see `Pulpo.compact`). The log can be shared by threads, e.g. by a `ThreadSafePulpo`,
+    as appends and writes are serialized by a lock.
+    """
+
+    def __init__(self, path: str, sync_size: int = 1024, sync_interval: Optional[float] = 1.0):
+        """
+        FeedbackLog constructor. Opens the log for appending, creating it if needed and dropping a
+        torn last block.
+
+        :param path: [str], path of the log file.
+        :param sync_size: [int, default=1024], number of buffered events that triggers a write and
+        fsync.
+        :param sync_interval: [float, default=1.0], maximum seconds an event stays buffered before
+        it is written and fsynced, or None to only write by size or on `sync`.
+        """
+        self.path: str = path
+        self.sync_size: int = sync_size
+        self.sync_interval: float = sync_interval
+        # Reentrant, since an append may sync
+        self._lock: threading.RLock = threading.RLock()
+
+        if not os.path.exists(path):
+            _write_empty_log(path, 0)
+        self._open()
+
+        self._closed: threading.Event = threading.Event()
+        self._syncer: Optional[threading.Thread] = None
+        if sync_interval is not None:
+            self._syncer = threading.Thread(target=self._sync_periodically, name='pulpo-log-sync',
+                                            daemon=True)
+            self._syncer.start()
+
+    def append(self, bandit_id: str, arm_id: str, reward: float, payload: str = None,
+               context: Dict[str, str] = None):
+        with self._lock:
+            self._buffer_codes.append(self._code(bandit_id, arm_id, _encode_context(context)))
+            self._buffer_rewards.append(reward)
+            self._buffer_payloads.append(payload)
+            self._after_append()
+
+    def append_many(self, bandit_id: str, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None, payloads: Sequence[Optional[str]] = None):
+        encoded_context = _encode_context(context)
+        with self._lock:
+            self._buffer_codes.extend([self._code(bandit_id, arm_id, encoded_context)
+                                       for arm_id in arm_ids])
+            self._buffer_rewards.extend(rewards)
+            self._buffer_payloads.extend(payloads if payloads is not None
+                                         else [None] * len(arm_ids))
+            self._after_append()
+
+    def append_reset(self, bandit_id: str):
+        self.append(bandit_id, None, 0.0)
+
+    def sync(self):
+        """
+        Writes the buffered events as one block and fsyncs the file.
+        """
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        self._last_sync = time.monotonic()
+        if not self._buffer_codes:
+            return
+        payloads = [b'' if payload is None else payload.encode('utf-8')
+                    for payload in self._buffer_payloads]
+        payload_lengths = [_NO_PAYLOAD if payload is None else len(encoded)
+                           for payload, encoded in zip(self._buffer_payloads, payloads)]
+        encoded_keys = json.dumps(self._buffer_keys).encode('utf-8')
+        encoded_payloads = b''.join(payloads)
+        body = b''.join([np.asarray(self._buffer_rewards, dtype='<f8').tobytes(),
+                         np.asarray(self._buffer_codes, dtype='<i4').tobytes(),
+                         np.asarray(payload_lengths, dtype='<i4').tobytes(),
+                         encoded_keys, encoded_payloads])
+        body += b'\0' * (-len(body) % 8)
+        header = _BLOCK_HEADER.pack(_BLOCK_MAGIC, len(self._buffer_codes), len(self._buffer_keys),
+                                    len(encoded_keys), len(encoded_payloads), zlib.crc32(body))
+        self._file.write(header + body)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.position += len(header) + len(body)
+        self._clear_buffer()
+
+    def rotate(self):
+        """
+        Starts a new, empty generation of the log, discarding the events of the current one.
+        """
+        with self._lock:
+            self._sync()
+            self._file.close()
+            _write_empty_log(self.path, self.generation + 1)
+            self._open()
+
+    def close(self):
+        self._closed.set()
+        if self._syncer is not None and self._syncer is not threading.current_thread():
+            self._syncer.join()
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def _open(self):
+        reader = LogReader(self.path)
+        for _ in reader.blocks():
+            pass
+        self.generation: int = reader.generation
+        self.position: int = reader.end
+        self._keys: _KeyTable = reader.keys
+
+        self._file = open(self.path, 'r+b')
+        self._file.truncate(self.position)
+        self._file.seek(self.position)
+        self._clear_buffer()
+
+    def _code(self, bandit_id: str, arm_id: Optional[str], context: Optional[str] = None) -> int:
+        key = (bandit_id, arm_id, context)
+        code = self._keys.codes.get(key)
+        if code is None:
+            code = len(self._keys)
+            self._keys.add([key])
+            self._buffer_keys.append(list(key))
+        return code
+
+    def _after_append(self):
+        if len(self._buffer_codes) >= self.sync_size or (
+                self.sync_interval is not None
+                and time.monotonic() - self._last_sync >= self.sync_interval):
+            self._sync()
+
+    def _sync_periodically(self):
+        delay = self.sync_interval
+        while not self._closed.wait(delay):
+            with self._lock:
+                # Waits again for the rest of the interval when an append synced in the meantime
+                delay = self._last_sync + self.sync_interval - time.monotonic()
+                if delay > 0:
+                    continue
+                delay = self.sync_interval
+                try:
+                    self._sync()
+                except OSError:
+                    logger.exception("Failed to write the feedback log %s", self.path)
+
+    def _clear_buffer(self):
+        self._buffer_codes: List[int] = []
+        self._buffer_rewards: List[float] = []
+        self._buffer_payloads: List[Optional[str]] = []
+        self._buffer_keys: List[List[Optional[str]]] = []
+        self._last_sync: float = time.monotonic()
+
+
+class LogReader:
+    """
+    Sequential reader of the blocks of a feedback log file. Reading stops at the first torn or
+    corrupt block.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        with open(path, 'rb') as log_file:
+            magic, self.generation = _FILE_HEADER.unpack(log_file.read(_FILE_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError("{} is not a pulpo feedback log".format(path))
+        self.keys: _KeyTable = _KeyTable()
+        self.end: int = _FILE_HEADER.size
+
+    def blocks(self, start: int = 0) -> Iterator[LogBlock]:
+        """
+        :param start: [int, default=0], offset from which blocks are returned. Earlier blocks are
+        only read for their keys.
+        :return: [Iterator[LogBlock]], the valid blocks of the log, in order.
+        """
+        with open(self.path, 'rb') as log_file:
+            log_file.seek(self.end)
+            while True:
+                header = log_file.read(_BLOCK_HEADER.size)
+                if len(header) < _BLOCK_HEADER.size:
+                    return
+                magic, n_events, _, keys_size, payloads_size, crc = _BLOCK_HEADER.unpack(header)
+                body_size = 16 * n_events + keys_size + payloads_size
+                body = log_file.read(body_size + (-body_size % 8))
+                if magic != _BLOCK_MAGIC or len(body) < body_size or zlib.crc32(body) != crc:
+                    return
+
+                offset = self.end
+                keys_start = 16 * n_events
+                keys = json.loads(body[keys_start:keys_start + keys_size])
+                self.keys.add([tuple(key) for key in keys])
+                self.end += _BLOCK_HEADER.size + len(body)
+                if offset < start:
+                    continue
+
+                codes = np.frombuffer(body, dtype='<i4', count=n_events, offset=8 * n_events)
+                payload_lengths = np.frombuffer(body, dtype='<i4', count=n_events,
+                                                offset=12 * n_events)
+                yield LogBlock(offset, self.end, self.keys.bandit_ids[codes],
+                               self.keys.arm_ids[codes], self.keys.contexts[codes],
+                               self.keys.groups[codes],
+                               np.frombuffer(body, dtype='<f8', count=n_events), payload_lengths,
+                               body[keys_start + keys_size:body_size])
+
+
+def replay(bandits: Dict[str, OnlineBandit], path: str, start: int = 0,
+           chunk_size: int = 1 << 20) -> int:
+    """
+    Applies the feedback of a log to bandits. Blocks are gathered into chunks of about `chunk_size`
+    events and each chunk is applied with one `update_many` call per bandit and context, split only
+    around bandit resets. The log does not store the time of the events, so decayed and windowed
+    statistics (see `pulpo.bandits.decay`) count the replayed events as received at replay time, and
+    recover with more weight on the older feedback than they had.
+
+    :param bandits: [Dict[str, OnlineBandit]], bandits keyed by bandit id.
+    :param path: [str], path of the log file.
+    :param start: [int, default=0], offset of the first block to apply.
+    :param chunk_size: [int, default=1048576], number of events applied together.
+    :return: [int], number of replayed events.
+    """
+    chunk: List[LogBlock] = []
+    chunk_events = 0
+    n_events = 0
+    for block in LogReader(path).blocks(start):
+        chunk.append(block)
+        chunk_events += len(block.rewards)
+        if chunk_events >= chunk_size:
+            _apply_chunk(bandits, chunk)
+            n_events += chunk_events
+            chunk = []
+            chunk_events = 0
+    _apply_chunk(bandits, chunk)
+    return n_events + chunk_events
+
+
+def _apply_chunk(bandits: Dict[str, OnlineBandit], chunk: List[LogBlock]):
+    if not chunk:
+        return
+    columns = [np.concatenate([getattr(block, name) for block in chunk])
+               for name in ('bandit_ids', 'arm_ids', 'contexts', 'groups', 'rewards')]
+
+    segment_start = 0
+    for reset in np.flatnonzero(np.equal(columns[1], None)):
+        _apply_segment(bandits, *[column[segment_start:reset] for column in columns])
+        bandits[columns[0][reset]].reset()
+        segment_start = reset + 1
+    _apply_segment(bandits, *[column[segment_start:] for column in columns])
+
+
+def _apply_segment(bandits: Dict[str, OnlineBandit], bandit_ids: np.ndarray, arm_ids: np.ndarray,
+                   contexts: np.ndarray, groups: np.ndarray, rewards: np.ndarray):
+    if not len(groups):
+        return
+    order = np.argsort(groups, kind='stable')
+    boundaries = np.flatnonzero(np.diff(groups[order])) + 1
+    for events in np.split(order, boundaries):
+        first = events[0]
+        context = None if contexts[first] is None else json.loads(contexts[first])
+        bandits[bandit_ids[first]].update_many(arm_ids[events].tolist(), rewards[events], context)
+
+
+def _encode_context(context) -> Optional[str]:
+    if context is None:
+        return None
+    if not isinstance(context, dict):
+        # The feature values of a linear bandit, replayed as a list
+        return json.dumps(np.asarray(context, dtype=np.float64).tolist())
+    return json.dumps(context, sort_keys=True) if context else None
+
+
+def _write_empty_log(path: str, generation: int):
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as log_file:
+        log_file.write(_FILE_HEADER.pack(_MAGIC, generation))
+        log_file.flush()
+        os.fsync(log_file.fileno())
+    os.replace(temporary_path, path)
@@ -0,0 +1,181 @@
+import codecs
+import hashlib
+import io
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.constants import fields
+from pulpo.persistence import load_bandits, save_bandits
+
+_WHITESPACE_AND_SEPARATORS = ' \t\n\r,'
+
+
+def index_config(source: BinaryIO, block_size: int = 1 << 20) -> Dict[str, Tuple[int, int]]:
+    """
+    Indexes a JSON array of bandit instructions, as read by `BanditFactory.make_bandits_list`,
+    without building any bandit. The array is decoded one instruction at a time from blocks of
+    `block_size` bytes, so only the index is kept in memory.
+
+    :param source: [BinaryIO], binary file positioned at the start of the array.
+    :param block_size: [int, default=1048576], number of bytes read at a time.
+    :return: [Dict[str, Tuple[int, int]]], byte offset and length of the instruction of every bandit
+    id.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    index: Dict[str, Tuple[int, int]] = {}
+    # The byte offset of buffer[mark] is known, so offsets are found by encoding the text after the
+    # mark only
+    buffer, position, mark, mark_offset = '', 0, 0, 0
+    started, exhausted = False, False
+
+    while True:
+        while position < len(buffer) and buffer[position] in _WHITESPACE_AND_SEPARATORS:
+            position += 1
+        if position < len(buffer) and not started:
+            if buffer[position] != '[':
+                raise ValueError("Expected a JSON array of bandit instructions")
+            started, position = True, position + 1
+            continue
+        if position < len(buffer) and buffer[position] == ']':
+            return index
+
+        instruction = None
+        if position < len(buffer):
+            try:
+                instruction, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The instruction may continue in the next block
+                if exhausted:
+                    raise
+        if instruction is None:
+            if exhausted:
+                raise ValueError("Unterminated JSON array of bandit instructions")
+            block = source.read(block_size)
+            exhausted = not block
+            buffer = buffer[mark:] + text_decoder.decode(block, final=exhausted)
+            position, mark = position - mark, 0
+            continue
+
+        start = mark_offset + len(buffer[mark:position].encode('utf-8'))
+        length = len(buffer[position:end].encode('utf-8'))
+        index[instruction[fields.BANDIT_ID]] = (start, length)
+        position, mark, mark_offset = end, end, start + length
+
+
+class LazyBandits(Mapping):
+    """
+    Bandits keyed by bandit id, built from their instruction on first access.
+
+    Only the offset index of the configuration is built up front. At most `max_resident` bandits are
+    kept in memory, in least recently used order: an evicted bandit is saved to its own snapshot
+    file in `spill_dir` with `save_bandits`, and is loaded back from it instead of being built again
+    the next time it is needed. As the spilled state outlives the process, pointing a new instance
+    to the same `spill_dir` resumes the learned state, once the resident bandits are saved with
+    `spill`. `on_load` and `on_evict`, if set, are called with every bandit brought into memory and
+    with the id of every evicted bandit, e.g. by Pulpo to register the bandits in its metrics.
+    """
+
+    def __init__(self, read_instruction: Callable[[int, int], bytes],
+                 index: Dict[str, Tuple[int, int]], max_resident: int = None,
+                 spill_dir: str = None):
+        """
+        LazyBandits constructor, see `from_file` and `from_json`.
+
+        :param read_instruction: [Callable[[int, int], bytes]], reads `length` bytes of
+        configuration at `offset`.
+        :param index: [Dict[str, Tuple[int, int]]], offset and length of the instruction of every
+        bandit id.
+        :param max_resident: [int, default=None], maximum number of bandits in memory. Unbounded if
+        None.
+        :param spill_dir: [str, default=None], directory of the state of the evicted bandits.
+        Required with `max_resident`.
+        """
+        if max_resident is not None and spill_dir is None:
+            raise ValueError("Evicting bandits requires a spill directory")
+        self.index: Dict[str, Tuple[int, int]] = index
+        self.max_resident: int = max_resident
+        self.spill_dir: str = spill_dir
+        self.resident: Dict[str, OnlineBandit] = OrderedDict()
+        self.on_load: Optional[Callable[[OnlineBandit], None]] = None
+        self.on_evict: Optional[Callable[[str], None]] = None
+        self._read_instruction = read_instruction
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @classmethod
+    def from_file(cls, path: str, max_resident: int = None, spill_dir: str = None):
+        """
+        :param path: [str], path of a JSON array of bandit instructions
+        """
+        with open(path, 'rb') as config_file:
+            index = index_config(config_file)
+
+        def read_instruction(offset: int, length: int) -> bytes:
+            with open(path, 'rb') as config_file:
+                config_file.seek(offset)
+                return config_file.read(length)
+
+        return cls(read_instruction, index, max_resident, spill_dir)
+
+    @classmethod
+    def from_json(cls, configuration: str, max_resident: int = None, spill_dir: str = None):
+        """
+        :param configuration: [str], JSON array of bandit instructions
+        """
+        encoded = memoryview(configuration.encode('utf-8'))
+        index = index_config(io.BytesIO(encoded))
+        return cls(lambda offset, length: encoded[offset:offset + length], index, max_resident,
+                   spill_dir)
+
+    def __getitem__(self, bandit_id: str) -> OnlineBandit:
+        bandit = self.resident.get(bandit_id)
+        if bandit is not None:
+            self.resident.move_to_end(bandit_id)
+            return bandit
+        offset, length = self.index[bandit_id]
+
+        spill_path = self._spill_path(bandit_id)
+        if spill_path is not None and os.path.exists(spill_path):
+            bandit = load_bandits(spill_path)[0]
+        else:
+            instruction = json.loads(bytes(self._read_instruction(offset, length)))
+            bandit = BanditFactory.make_bandit(instruction)
+        self.resident[bandit_id] = bandit
+        if self.on_load is not None:
+            self.on_load(bandit)
+        if self.max_resident is not None and len(self.resident) > self.max_resident:
+            evicted_id, evicted = self.resident.popitem(last=False)
+            save_bandits([evicted], self._spill_path(evicted_id))
+            if self.on_evict is not None:
+                self.on_evict(evicted_id)
+        return bandit
+
+    def __contains__(self, bandit_id) -> bool:
+        return bandit_id in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def spill(self):
+        """
+        Saves the state of the resident bandits to the spill directory, e.g. before the process
+        stops.
+        """
+        for bandit_id, bandit in self.resident.items():
+            save_bandits([bandit], self._spill_path(bandit_id))
+
+    def _spill_path(self, bandit_id: str) -> Optional[str]:
+        if self.spill_dir is None:
+            return None
+        # Bandit ids may contain any character, so the file is named after a digest of the id
+        digest = hashlib.blake2b(bandit_id.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.spill_dir, digest + '.npz')
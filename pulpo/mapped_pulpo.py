@@ -0,0 +1,186 @@
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+
+import numpy as np
+
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.persistence import make_header, make_bandits_from_header
+from pulpo.pulpo import Pulpo
+from pulpo.state_layout import write_locked
+
+_MAGIC = b'PULPOMM1'
+_PREAMBLE = struct.Struct('<8sQ')
+_PAGE_SIZE = mmap.PAGESIZE
+
+T = TypeVar('T')
+
+
+def _data_offset(header_size: int) -> int:
+    return -(-(_PREAMBLE.size + header_size) // _PAGE_SIZE) * _PAGE_SIZE
+
+
+class MappedPulpo(Pulpo):
+    """
+    Pulpo whose bandit state lives in a memory-mapped file shared by the processes of a host.
+
+    The file holds a preamble, the JSON header of `pulpo.persistence.make_header` and, from the next
+    page boundary, the `StateLayout` buffer with the version counter and the state arrays of every
+    bandit. One process opens the file writable and applies the feedback directly into the mapped
+    pages, making the version of a bandit odd while it writes. Any number of processes open it
+    read-only: their bandits use the mapped pages as storage, so they pay no deserialization nor
+    copy, and a decision is retried if the version of its bandit changed while it was computed.
+
+    Usage:
+
+        MappedPulpo.create(path, bandits).close()
+        writer = MappedPulpo(path, writable=True)  # in the process that receives feedback
+        reader = MappedPulpo(path)  # in every serving process
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        """
+        MappedPulpo constructor. Maps a state file written by `create`.
+
+        :param path: [str], path of the state file.
+        :param writable: [bool, default=False], whether this process applies the feedback. There
+        must be a single writer per file.
+        """
+        self.path: str = path
+        self.writable: bool = writable
+        with open(path, 'r+b' if writable else 'rb') as state_file:
+            # An empty file cannot be mapped, and a shorter one has no preamble
+            if os.fstat(state_file.fileno()).st_size < _PREAMBLE.size:
+                raise ValueError("{} is not a pulpo state file".format(path))
+            self._map = mmap.mmap(state_file.fileno(), 0,
+                                  access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+        magic, header_size = _PREAMBLE.unpack_from(self._map)
+        if magic != _MAGIC:
+            self._map.close()
+            raise ValueError("{} is not a pulpo state file".format(path))
+        try:
+            encoded_header = self._map[_PREAMBLE.size:_PREAMBLE.size + header_size]
+            header = json.loads(encoded_header.decode('utf-8'))
+            bandits, self.layout = make_bandits_from_header(header)
+            if len(self._map) < _data_offset(header_size) + self.layout.nbytes:
+                raise ValueError("{} is a truncated pulpo state file".format(path))
+        except Exception:
+            self._map.close()
+            raise
+        super().__init__(bandits)
+
+        self._buffer = memoryview(self._map)[_data_offset(header_size):]
+        self._versions: np.ndarray = self.layout.versions(self._buffer)
+        self.layout.bind(bandits, self._buffer)
+
+    @classmethod
+    def create(cls, path: str, bandits: List[OnlineBandit]):
+        """
+        Writes a state file with the bandits and their current state, and opens it writable.
+
+        :param path: [str], path of the state file. An existing file is replaced.
+        :param bandits: [List[OnlineBandit]], bandits to store.
+        """
+        header, layout = make_header(bandits)
+        encoded_header = json.dumps(header).encode('utf-8')
+        data_offset = _data_offset(len(encoded_header))
+        buffer = bytearray(data_offset + layout.nbytes)
+        _PREAMBLE.pack_into(buffer, 0, _MAGIC, len(encoded_header))
+        buffer[_PREAMBLE.size:_PREAMBLE.size + len(encoded_header)] = encoded_header
+        state = memoryview(buffer)[data_offset:]
+        layout.versions(state)[:] = 0
+        layout.write(bandits, state)
+        state.release()
+
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as state_file:
+            state_file.write(buffer)
+        os.replace(temporary_path, path)
+        return cls(path, writable=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def version(self, bandit_id: str) -> int:
+        """
+        :return: [int], version counter of the bandit, which grows by 2 with every applied write.
+        """
+        return int(self._versions[self.layout.positions[bandit_id]])
+
+    def reset(self, bandit_id: str):
+        self._write(bandit_id, self.bandits[bandit_id].reset)
+
+    def choose(self, bandit_id: str, context: Dict[str, str] = None,
+               track: bool = False) -> Union[str, Tuple[str, int]]:
+        if track and not self.writable:
+            raise RuntimeError("{} is mapped read-only, decisions must be tracked by the writer"
+                               .format(self.path))
+        choose = super().choose
+        return self._read(bandit_id, lambda: choose(bandit_id, context, track))
+
+    def choose_many(self, bandit_id: str, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[str]:
+        choose_many = super().choose_many
+        return self._read(bandit_id, lambda: choose_many(bandit_id, k, context, distinct))
+
+    def update(self, bandit_id: str, arm_id: str, reward: float, payload: str = None,
+               context: Dict[str, str] = None):
+        update = super().update
+        self._write(bandit_id, lambda: update(bandit_id, arm_id, reward, payload, context))
+
+    def update_many(self, bandit_id: str, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None, payloads: Sequence[Optional[str]] = None):
+        update_many = super().update_many
+        self._write(bandit_id, lambda: update_many(bandit_id, arm_ids, rewards, context, payloads))
+
+    def flush(self):
+        """
+        Writes the mapped pages back to the file. Readers see updates without it.
+        """
+        if self.writable:
+            self._map.flush()
+
+    def close(self):
+        """
+        Unmaps the file. The bandits keep working on a private copy of their last state.
+        """
+        if self._map is None:
+            return
+        self.flush()
+        for bandit in self.bandits.values():
+            bandit.bind_state({name: np.array(array)
+                               for name, array in bandit.state_arrays().items()})
+        self._versions = None
+        self._buffer.release()
+        self._map.close()
+        self._map = None
+
+    def _write(self, bandit_id: str, write: Callable[[], None]):
+        if not self.writable:
+            raise RuntimeError("{} is mapped read-only, feedback must be sent to the writer"
+                               .format(self.path))
+        write_locked(self._versions, self.layout.positions[bandit_id], write)
+
+    def _read(self, bandit_id: str, read: Callable[[], T]) -> T:
+        if self.writable:
+            return read()
+        position = self.layout.positions[bandit_id]
+        while True:
+            version = self._versions[position]
+            if version % 2 == 0:
+                try:
+                    result = read()
+                except Exception:
+                    if self._versions[position] == version:
+                        raise
+                    continue
+                if self._versions[position] == version:
+                    return result
+            time.sleep(0)
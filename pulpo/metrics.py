@@ -0,0 +1,223 @@
+import os
+import tempfile
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pulpo.bandits.online_bandits import OnlineBandit
+
+try:
+    from time import perf_counter_ns
+except ImportError:
+    # Python 3.6
+    from time import perf_counter
+
+    def perf_counter_ns() -> int:
+        return int(perf_counter() * 1e9)
+
+# Upper bounds of the latency buckets in seconds, from 1µs to 1s in 1-2.5-5 steps
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = tuple(
+    mantissa * 10.0 ** exponent
+    for exponent in range(-6, 0) for mantissa in (1.0, 2.5, 5.0)) + (1.0,)
+
+
+class Histogram:
+    """
+    Histogram with fixed bucket bounds, as in Prometheus: an observation costs a bisection of the
+    bounds and an increment, and nothing is allocated. Latencies are observed in nanoseconds, as
+    measured with `perf_counter_ns`, and exported in seconds.
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        Histogram constructor.
+
+        :param bounds: [Sequence[float], default=DEFAULT_LATENCY_BUCKETS], increasing upper bounds
+        of the buckets in seconds. Observations above the last bound fall into an implicit +Inf
+        bucket.
+        """
+        self.bounds: Tuple[float, ...] = tuple(bounds)
+        self._bounds_ns: Tuple[int, ...] = tuple(round(bound * 1e9) for bound in self.bounds)
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.sum_ns: int = 0
+
+    def observe(self, value_ns: int):
+        self.counts[bisect_left(self._bounds_ns, value_ns)] += 1
+        self.sum_ns += value_ns
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def snapshot(self) -> dict:
+        """
+        :return: [dict], non-cumulative count of every bucket keyed by its upper bound, with the sum
+        and count.
+        """
+        return {'buckets': dict(zip(self.bounds + (float('inf'),), self.counts)),
+                'sum': self.sum_ns / 1e9, 'count': self.count}
+
+
+class BanditMetrics:
+    """
+    Counters and latency histograms of one bandit.
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.decisions: int = 0
+        self.updates: int = 0
+        self.reward_sum: float = 0.0
+        self.choose_latency: Histogram = Histogram(bounds)
+        self.update_latency: Histogram = Histogram(bounds)
+
+
+class Metrics:
+    """
+    Runtime metrics of Pulpo, enabled by passing an instance to its constructor: decisions, updates
+    and cumulative reward per bandit, and histograms of the latency of `choose` and `update`. The
+    exploration counts are read from the bandits that keep them, see
+    `OnlineBandit.exploration_counts`.
+
+    Counters are plain integers updated without a lock, so under concurrent threads a few increments
+    may be lost; they are meant for monitoring, not accounting.
+    """
+    _COUNTERS = (
+        ('decisions', 'pulpo_decisions_total', 'Arms chosen.'),
+        ('updates', 'pulpo_updates_total', 'Feedback events applied.'),
+        ('reward_sum', 'pulpo_reward_total', 'Sum of the rewards of the applied feedback.'),
+        ('explorations', 'pulpo_explorations_total', 'Decisions that explored.'),
+        ('exploitations', 'pulpo_exploitations_total', 'Decisions that exploited.'),
+    )
+    _HISTOGRAMS = (
+        ('choose_latency', 'pulpo_choose_latency_seconds', 'Latency of choose calls.'),
+        ('update_latency', 'pulpo_update_latency_seconds', 'Latency of update calls.'),
+    )
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        Metrics constructor.
+
+        :param bounds: [Sequence[float], default=DEFAULT_LATENCY_BUCKETS], upper bounds in seconds
+        of the buckets of the latency histograms.
+        """
+        self.bounds: Tuple[float, ...] = tuple(bounds)
+        self.bandits: Dict[str, BanditMetrics] = {}
+        self._sources: Dict[str, OnlineBandit] = {}
+        # Exploration counts of the instances of a bandit that were unregistered
+        self._retired_counts: Dict[str, Tuple[int, int]] = {}
+
+    def register(self, bandit: OnlineBandit):
+        """
+        Adds a bandit, whose exploration counts are then reported. A bandit registered again, e.g.
+        when it is loaded back after an eviction, keeps counting from the counts of the previous
+        instance.
+        """
+        if self._sources.get(bandit.bandit_id) is not bandit:
+            self.unregister(bandit.bandit_id)
+        self._sources[bandit.bandit_id] = bandit
+        self.bandit(bandit.bandit_id)
+
+    def unregister(self, bandit_id: str):
+        """
+        Stops reading the exploration counts of a bandit, e.g. when it is evicted from memory,
+        keeping the counts reported so far.
+        """
+        bandit = self._sources.pop(bandit_id, None)
+        counts = bandit.exploration_counts() if bandit is not None else None
+        if counts is not None:
+            explorations, exploitations = self._retired_counts.get(bandit_id, (0, 0))
+            self._retired_counts[bandit_id] = (explorations + counts[0], exploitations + counts[1])
+
+    def bandit(self, bandit_id: str) -> BanditMetrics:
+        metrics = self.bandits.get(bandit_id)
+        if metrics is None:
+            metrics = self.bandits[bandit_id] = BanditMetrics(self.bounds)
+        return metrics
+
+    def observe_choose(self, bandit_id: str, n_decisions: int, latency_ns: int):
+        metrics = self.bandit(bandit_id)
+        metrics.decisions += n_decisions
+        metrics.choose_latency.observe(latency_ns)
+
+    def observe_update(self, bandit_id: str, n_updates: int, reward_sum: float, latency_ns: int):
+        metrics = self.bandit(bandit_id)
+        metrics.updates += n_updates
+        metrics.reward_sum += reward_sum
+        metrics.update_latency.observe(latency_ns)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        :return: [Dict[str, dict]], counters and histograms of every bandit, keyed by bandit id.
+        """
+        snapshot = {}
+        for bandit_id, metrics in self.bandits.items():
+            explorations, exploitations = self._exploration_counts(bandit_id)
+            snapshot[bandit_id] = {
+                'decisions': metrics.decisions, 'updates': metrics.updates,
+                'reward_sum': metrics.reward_sum,
+                'explorations': explorations, 'exploitations': exploitations,
+                'choose_latency': metrics.choose_latency.snapshot(),
+                'update_latency': metrics.update_latency.snapshot()}
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """
+        :return: [str], the metrics in the Prometheus text exposition format, labelled by bandit id.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for key, name, description in self._COUNTERS:
+            lines += ['# HELP {} {}'.format(name, description), '# TYPE {} counter'.format(name)]
+            lines += ['{}{{bandit_id="{}"}} {}'
+                      .format(name, _escape(bandit_id), _format(values[key]))
+                      for bandit_id, values in snapshot.items() if values[key] is not None]
+        for key, name, description in self._HISTOGRAMS:
+            lines += ['# HELP {} {}'.format(name, description), '# TYPE {} histogram'.format(name)]
+            for bandit_id, values in snapshot.items():
+                label = _escape(bandit_id)
+                cumulative = 0
+                for bound, count in values[key]['buckets'].items():
+                    cumulative += count
+                    lines.append('{}_bucket{{bandit_id="{}",le="{}"}} {}'
+                                 .format(name, label, _format(bound), cumulative))
+                lines.append('{}_sum{{bandit_id="{}"}} {}'
+                             .format(name, label, _format(values[key]['sum'])))
+                lines.append('{}_count{{bandit_id="{}"}} {}'
+                             .format(name, label, values[key]['count']))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """
+        Writes the metrics in the Prometheus text format, e.g. for the textfile collector of the
+        node exporter. The file is replaced atomically, so a scrape never reads a partial file.
+
+        :param path: [str], path of the file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix='.pulpo-metrics-')
+        try:
+            with os.fdopen(descriptor, 'w') as temporary_file:
+                temporary_file.write(self.to_prometheus())
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def _exploration_counts(self, bandit_id: str) -> Tuple[Optional[int], Optional[int]]:
+        bandit = self._sources.get(bandit_id)
+        counts = bandit.exploration_counts() if bandit is not None else None
+        retired = self._retired_counts.get(bandit_id)
+        if retired is None:
+            return counts if counts is not None else (None, None)
+        if counts is None:
+            return retired
+        return retired[0] + counts[0], retired[1] + counts[1]
+
+
+def _escape(label: str) -> str:
+    return label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
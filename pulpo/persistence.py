@@ -0,0 +1,94 @@
+import json
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.state_layout import StateLayout
+
+_FORMAT_VERSION = 1
+_HEADER = 'header'
+_STATE = 'state'
+
+
+def make_header(bandits: List[OnlineBandit], metadata: dict = None) -> Tuple[dict, StateLayout]:
+    """
+    Describes bandits for a state file: the instruction of every bandit (see
+    `BanditFactory.make_instruction`) and the `StateLayout` of their state.
+
+    :param metadata: [dict, default=None], JSON serializable information stored along.
+    :return: [Tuple[dict, StateLayout]], JSON serializable header and layout of the state.
+    """
+    layout = StateLayout.from_bandits(bandits)
+    header = {
+        'format_version': _FORMAT_VERSION,
+        'bandits': [BanditFactory.make_instruction(bandit) for bandit in bandits],
+        'layout': layout.to_dict(),
+        'metadata': metadata or {}
+    }
+    return header, layout
+
+
+def make_bandits_from_header(header: dict) -> Tuple[List[OnlineBandit], StateLayout]:
+    """
+    Inverse of `make_header`. The bandits are built with their configured priors, not with their
+    saved state.
+
+    :return: [Tuple[List[OnlineBandit], StateLayout]], bandits and layout of their state.
+    """
+    if header['format_version'] != _FORMAT_VERSION:
+        raise ValueError("Unsupported state file format version: {}"
+                         .format(header['format_version']))
+    bandits = [BanditFactory.make_bandit(instruction) for instruction in header['bandits']]
+    return bandits, StateLayout.from_dict(header['layout'])
+
+
+def save_bandits(bandits: List[OnlineBandit], path: str, metadata: dict = None):
+    """
+    Saves bandits to an uncompressed `.npz` file with two arrays: the JSON header of `make_header`
+    and the state of the bandits as one flat buffer. The file is written next to `path` and then
+    moved over it, so an interrupted save never leaves a truncated snapshot behind.
+
+    :param bandits: [List[OnlineBandit]], bandits to save.
+    :param path: [str], path of the snapshot file.
+    :param metadata: [dict, default=None], JSON serializable information stored along, see
+    `load_snapshot`.
+    """
+    header, layout = make_header(bandits, metadata)
+    state = np.zeros(layout.nbytes, dtype=np.uint8)
+    layout.write(bandits, state)
+
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as snapshot:
+        encoded_header = np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8)
+        np.savez(snapshot, **{_HEADER: encoded_header, _STATE: state})
+    os.replace(temporary_path, path)
+
+
+def load_bandits(path: str) -> List[OnlineBandit]:
+    """
+    Loads bandits saved with `save_bandits`. The bandits use views of the loaded state buffer as
+    their storage, so their state is not copied again after reading the file.
+
+    :param path: [str], path of the snapshot file.
+    :return: [List[OnlineBandit]], the saved bandits, with their learned state.
+    """
+    return load_snapshot(path)[0]
+
+
+def load_snapshot(path: str) -> Tuple[List[OnlineBandit], dict]:
+    """
+    Same as `load_bandits`, but also returns the metadata saved along with the bandits.
+
+    :param path: [str], path of the snapshot file.
+    :return: [Tuple[List[OnlineBandit], dict]], the saved bandits and metadata.
+    """
+    with np.load(path, allow_pickle=False) as snapshot:
+        header = json.loads(snapshot[_HEADER].tobytes().decode('utf-8'))
+        state = snapshot[_STATE]
+
+    bandits, layout = make_bandits_from_header(header)
+    layout.bind(bandits, state)
+    return bandits, header.get('metadata', {})
@@ -1,34 +1,155 @@
-from typing import List, Dict
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 
 from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.contextual import context_hash
 from pulpo.bandits.dataclasses import Feedback
 from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.decisions import DecisionTable
+from pulpo.feedback_log import FeedbackLog, LogReader, replay
+from pulpo.lazy import LazyBandits
+from pulpo.metrics import Metrics, perf_counter_ns
+from pulpo.persistence import save_bandits, load_bandits, load_snapshot
 
 
 class Pulpo:
-    def __init__(self, bandits: List[OnlineBandit]):
+    def __init__(self, bandits: Union[List[OnlineBandit], Mapping[str, OnlineBandit]],
+                 feedback_log: FeedbackLog = None, decisions: DecisionTable = None,
+                 metrics: Metrics = None):
         """
         Pulpo constructor.
 
         The objective of this class is to manage the bandit campaign.
 
-        :param bandits: List[OnlineBandit], List of bandits that will be managed.
+        :param bandits: List[OnlineBandit], List of bandits that will be managed, or a mapping of
+        bandit id to bandit, such as `LazyBandits`.
+        :param feedback_log: [FeedbackLog, default=None], log to which the applied feedback and
+        resets are appended, so that the state can be recovered after a crash (see `recover`).
+        :param decisions: [DecisionTable, default=None], table of the decisions tracked by `choose`.
+        A table with the default TTL and capacity is created on the first tracked decision when
+        omitted.
+        :param metrics: [Metrics, default=None], metrics in which the decisions, feedback and
+        latencies are recorded. Nothing is measured when omitted.
 
         """
-        self.bandits: map[str, OnlineBandit] = {bandit.bandit_id: bandit for bandit in bandits}
+        if isinstance(bandits, Mapping):
+            self.bandits: Mapping[str, OnlineBandit] = bandits
+        else:
+            self.bandits: Mapping[str, OnlineBandit] = {bandit.bandit_id: bandit
+                                                        for bandit in bandits}
+        self.feedback_log: FeedbackLog = feedback_log
+        self.decisions: DecisionTable = decisions
+        self.metrics: Metrics = metrics
+        if metrics is not None:
+            if isinstance(bandits, LazyBandits):
+                # Only the resident bandits are registered, the others once they are built
+                bandits.on_load, bandits.on_evict = metrics.register, metrics.unregister
+                resident = list(bandits.resident.values())
+            else:
+                resident = list(self.bandits.values())
+            for bandit in resident:
+                metrics.register(bandit)
 
     @classmethod
-    def make_from_json(cls, configuration: str):
+    def make_from_json(cls, configuration: str, lazy: bool = False, max_resident: int = None,
+                       spill_dir: str = None):
+        """
+        Instantiates Pulpo from a JSON array of bandit instructions
+
+        :param configuration: [str], JSON array of bandit instructions
+        :param lazy: [bool, default=False], if True, only an index of the configuration is built,
+        and every bandit is built on first use (see `LazyBandits`).
+        :param max_resident: [int, default=None], in lazy mode, maximum number of bandits kept in
+        memory.
+        :param spill_dir: [str, default=None], in lazy mode, directory where the evicted bandits are
+        saved.
+        """
+        if lazy:
+            return cls(LazyBandits.from_json(configuration, max_resident, spill_dir))
         bandits: List[OnlineBandit] = BanditFactory.make_bandits_list(configuration)
         return cls(bandits)
 
+    @classmethod
+    def make_from_json_file(cls, path: str, lazy: bool = False, max_resident: int = None,
+                            spill_dir: str = None):
+        """
+        Same as `make_from_json`, reading the configuration from a file. In lazy mode the file is
+        indexed without being loaded in memory, and instructions are read from it on demand.
+
+        :param path: [str], path of a JSON array of bandit instructions
+        """
+        if lazy:
+            return cls(LazyBandits.from_file(path, max_resident, spill_dir))
+        with open(path) as config_file:
+            return cls.make_from_json(config_file.read())
+
+    def save(self, path: str):
+        """
+        Saves the bandits, with their learned state, to a binary snapshot file
+
+        :param path: [str], path of the snapshot file
+        """
+        save_bandits(list(self.bandits.values()), path)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Instantiates Pulpo from a snapshot file written by `save`
+
+        :param path: [str], path of the snapshot file
+        """
+        return cls(load_bandits(path))
+
+    def compact(self, snapshot_path: str):
+        """
+        Saves a snapshot that includes all the logged feedback and starts a new generation of the
+        feedback log. The snapshot records the generation and end offset of the log, so `recover`
+        never applies an event twice, even if the process stops between writing the snapshot and
+        rotating the log.
+
+        :param snapshot_path: [str], path of the snapshot file
+        """
+        self.feedback_log.sync()
+        metadata = {'feedback_log': {'generation': self.feedback_log.generation,
+                                     'offset': self.feedback_log.position}}
+        save_bandits(list(self.bandits.values()), snapshot_path, metadata)
+        self.feedback_log.rotate()
+
+    @classmethod
+    def recover(cls, snapshot_path: str, log_path: str, **log_options):
+        """
+        Instantiates Pulpo from the last snapshot written by `compact` and the feedback logged after
+        it, and keeps appending to the same log.
+
+        :param snapshot_path: [str], path of the snapshot file
+        :param log_path: [str], path of the feedback log file
+        :param log_options: keyword arguments of the `FeedbackLog` constructor
+        """
+        bandits, metadata = load_snapshot(snapshot_path)
+        compacted = metadata.get('feedback_log', {'generation': -1, 'offset': 0})
+        generation = LogReader(log_path).generation
+        if generation == compacted['generation']:
+            start = compacted['offset']
+        elif generation == compacted['generation'] + 1:
+            start = 0
+        else:
+            raise ValueError("Feedback log {} of generation {} does not follow snapshot {}"
+                             .format(log_path, generation, snapshot_path))
+
+        pulpo = cls(bandits)
+        replay(pulpo.bandits, log_path, start)
+        pulpo.feedback_log = FeedbackLog(log_path, **log_options)
+        return pulpo
+
     def reset(self, bandit_id: str):
         """
         Resets state of bandit strategy
         """
-        self.bandits[bandit_id].reset()
+        self._apply_reset(bandit_id)
+        if self.feedback_log is not None:
+            self.feedback_log.append_reset(bandit_id)
 
-    def choose(self, bandit_id: str, context: Dict[str, str] = None) -> str:
+    def choose(self, bandit_id: str, context: Dict[str, str] = None,
+               track: bool = False) -> Union[str, Tuple[str, int]]:
         """
         Chooses an arm
 
@@ -41,19 +162,212 @@ class Pulpo:
             "context_c: "value_c2"
         }
 
-        :return: [str], an arm name
+        :param track: [bool, default=False], whether to keep the decision until its reward is given
+        with `update_decision`, or until it expires and counts as a zero reward (see
+        `expire_decisions`).
+
+        :return: [str], an arm name, or [Tuple[str, int]], an arm name and a decision id if `track`
+        is True
         """
+        metrics = self.metrics
+        start = perf_counter_ns() if metrics is not None else 0
         arm = self.bandits[bandit_id].choose(context)
-        return arm.arm_id
+        if metrics is not None:
+            metrics.observe_choose(bandit_id, 1, perf_counter_ns() - start)
+        if not track:
+            return arm.arm_id
+        if self.decisions is None:
+            self.decisions = DecisionTable()
+        self.expire_decisions(reserve=1)
+        return arm.arm_id, self.decisions.add(bandit_id, arm.arm_id, context)
+
+    def choose_many(self, bandit_id: str, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[str]:
+        """
+        Chooses several arms of a bandit in one call
+
+        :param bandit_id: [str], bandit id
+        :param k: [int], number of decisions
+        :param context: [dict, default=None], context of the request, as in `choose`.
+        :param distinct: [bool, default=False], if False, returns k independent decisions, as if
+        `choose` was called k times. If True, returns the k best distinct arms in rank order, e.g.
+        to fill a slate.
 
-    def update(self, bandit_id: str, arm_id: str, reward: float, payload: str = None) -> str:
+        :return: [List[str]], arm names
+        """
+        metrics = self.metrics
+        start = perf_counter_ns() if metrics is not None else 0
+        arms = self.bandits[bandit_id].choose_many(k, context, distinct)
+        if metrics is not None:
+            metrics.observe_choose(bandit_id, len(arms), perf_counter_ns() - start)
+        return [arm.arm_id for arm in arms]
+
+    def choose_batch(self, bandit_ids: List[str], context: Dict[str, str] = None) -> List[str]:
+        """
+        Chooses one arm for each of the given bandit ids. Repeated bandit ids are decided together
+        with one `choose_many` call.
+
+        :param bandit_ids: [List[str]], bandit ids, which may repeat
+        :param context: [dict, default=None], context of the request, as in `choose`.
+
+        :return: [List[str]], an arm name per bandit id, in the same order
+        """
+        slots: Dict[str, List[int]] = {}
+        for slot, bandit_id in enumerate(bandit_ids):
+            slots.setdefault(bandit_id, []).append(slot)
+
+        arm_ids: List[str] = [None] * len(bandit_ids)
+        for bandit_id, bandit_slots in slots.items():
+            chosen = self.choose_many(bandit_id, len(bandit_slots), context)
+            for slot, arm_id in zip(bandit_slots, chosen):
+                arm_ids[slot] = arm_id
+        return arm_ids
+
+    def update(self, bandit_id: str, arm_id: str, reward: float, payload: str = None,
+               context: Dict[str, str] = None) -> str:
         """
         Updates bandit strategy given the feedback
 
         :param bandit_id: [str], bandit id
         :param arm_id: [str], arm name
         :param reward: [float], reward of the chosen arm name
+        :param payload: [str, default=None], payload of the feedback.
         :param context: [dict, default=None], context used when choose was called.
         """
-        bandit: OnlineBandit = self.bandits[bandit_id]
-        bandit.update(Feedback(arm_id, reward, payload))
+        metrics = self.metrics
+        start = perf_counter_ns() if metrics is not None else 0
+        self._apply_update(bandit_id, Feedback(arm_id, reward, payload, context))
+        if self.feedback_log is not None:
+            self.feedback_log.append(bandit_id, arm_id, reward, payload, context)
+        if metrics is not None:
+            metrics.observe_update(bandit_id, 1, reward, perf_counter_ns() - start)
+
+    def update_decision(self, decision_id: int, reward: float, payload: str = None):
+        """
+        Updates bandit strategy given the reward of a decision tracked by `choose`
+
+        :param decision_id: [int], decision id returned by `choose`
+        :param reward: [float], reward of the decision
+        :param payload: [str, default=None], payload of the feedback.
+        """
+        self.expire_decisions()
+        if self.decisions is None:
+            raise KeyError("Decision {} is unknown, expired or already rewarded"
+                           .format(decision_id))
+        bandit_id, arm_id, context = self.decisions.get(decision_id)
+        self.update(bandit_id, arm_id, reward, payload, context)
+        # Removed only once applied, so a failed update leaves the decision pending
+        self.decisions.pop(decision_id)
+
+    def expire_decisions(self, reserve: int = 0) -> int:
+        """
+        Counts the tracked decisions that waited longer than the TTL of the decision table as zero
+        rewards, applied in bulk with `update_many`.
+
+        :param reserve: [int, default=0], number of slots of the decision table to free for new
+        decisions.
+        :return: [int], number of decisions that expired without a reward.
+        """
+        if self.decisions is None:
+            return 0
+        expired = self.decisions.expire(
+            reserve, lambda bandit_id, context, arm_ids: self.update_many(
+                bandit_id, arm_ids, [0.0] * len(arm_ids), context))
+        return sum(len(arm_ids) for _, _, arm_ids in expired)
+
+    def update_many(self, bandit_id: str, arm_ids: Sequence[str], rewards: Sequence[float],
+                    context: Dict[str, str] = None, payloads: Sequence[Optional[str]] = None):
+        """
+        Updates bandit strategy given a batch of feedback, in columnar form
+
+        :param bandit_id: [str], bandit id
+        :param arm_ids: [Sequence[str]], arm name of each feedback event
+        :param rewards: [Sequence[float]], reward of each feedback event
+        :param context: [dict, default=None], context used when choose was called, shared by the
+        whole batch.
+        :param payloads: [Sequence[str], default=None], payload of each feedback event, or None if
+        none has one.
+        """
+        if len(arm_ids) != len(rewards) or (payloads is not None and len(payloads) != len(arm_ids)):
+            raise ValueError("arm_ids, rewards and payloads must have the same length")
+        metrics = self.metrics
+        start = perf_counter_ns() if metrics is not None else 0
+        self._apply_update_many(bandit_id, arm_ids, rewards, context)
+        if self.feedback_log is not None:
+            self.feedback_log.append_many(bandit_id, arm_ids, rewards, context, payloads)
+        if metrics is not None:
+            metrics.observe_update(bandit_id, len(arm_ids), float(sum(rewards)),
+                                   perf_counter_ns() - start)
+
+    def update_events(self, events: Iterable[Tuple]) -> List[Tuple[int, Exception]]:
+        """
+        Updates bandit strategies given a batch of feedback events of possibly different bandits and
+        contexts
+
+        The events are first checked with `OnlineBandit.check_feedback`, so that a bad event, e.g.
+        of an unknown bandit or arm, only fails itself. The valid events of a bandit and context are
+        then applied with one `update_many`. If that fails, e.g. when the feedback log cannot be
+        written, the events of the call are reported as failed but not applied again, as the bandit
+        may have applied them already.
+
+        :param events: [Iterable[Tuple]], (bandit id, arm name, reward) tuples, or (bandit id, arm
+        name, reward, context) tuples for contextual feedback, or (bandit id, arm name, reward,
+        context, payload) tuples.
+        :return: [List[Tuple[int, Exception]]], position in `events` and error of every event that
+        was not applied.
+        """
+        columns: Dict[Tuple[str, int], Tuple[Optional[Dict[str, str]], List[int], List[str],
+                                             List[float], List[Optional[str]]]] = {}
+        for position, (bandit_id, arm_id, reward, *optional) in enumerate(events):
+            context = optional[0] if optional else None
+            payload = optional[1] if len(optional) > 1 else None
+            key = (bandit_id, context_hash(context))
+            _, positions, arm_ids, rewards, payloads = columns.setdefault(key,
+                                                                          (context, [], [], [], []))
+            positions.append(position)
+            arm_ids.append(arm_id)
+            rewards.append(reward)
+            payloads.append(payload)
+
+        failures: List[Tuple[int, Exception]] = []
+        for (bandit_id, _), (context, positions, arm_ids, rewards, payloads) in columns.items():
+            try:
+                bandit = self.bandits[bandit_id]
+            except KeyError as error:
+                failures += [(position, error) for position in positions]
+                continue
+            valid_positions, valid_arm_ids, valid_rewards, valid_payloads = [], [], [], []
+            for position, arm_id, reward, payload in zip(positions, arm_ids, rewards, payloads):
+                try:
+                    bandit.check_feedback(Feedback(arm_id, reward, payload, context))
+                except (KeyError, ValueError, TypeError) as error:
+                    failures.append((position, error))
+                else:
+                    valid_positions.append(position)
+                    valid_arm_ids.append(arm_id)
+                    valid_rewards.append(reward)
+                    valid_payloads.append(payload)
+            if not valid_positions:
+                continue
+            if all(payload is None for payload in valid_payloads):
+                valid_payloads = None
+            try:
+                self.update_many(bandit_id, valid_arm_ids, valid_rewards, context, valid_payloads)
+            except Exception as error:
+                failures += [(position, error) for position in valid_positions]
+        return sorted(failures, key=lambda failure: failure[0])
+
+    def _apply_reset(self, bandit_id: str):
+        """
+        Resets a bandit. Subclasses that apply the changes elsewhere override the `_apply_*`
+        methods, so that `reset`, `update` and `update_many` still log the feedback and record the
+        metrics.
+        """
+        self.bandits[bandit_id].reset()
+
+    def _apply_update(self, bandit_id: str, feedback: Feedback):
+        self.bandits[bandit_id].update(feedback)
+
+    def _apply_update_many(self, bandit_id: str, arm_ids: Sequence[str], rewards: Sequence[float],
+                           context: Optional[Dict[str, str]]):
+        self.bandits[bandit_id].update_many(arm_ids, rewards, context)
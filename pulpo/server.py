@@ -0,0 +1,407 @@
+"""
+HTTP decision service around Pulpo, built on asyncio streams.
+
+Endpoints, all POST with JSON bodies:
+
+    /choose         {"bandit_id": ..., "context": {...}}     -> {"arm_id": ...}
+    /choose_batch   {"bandit_ids": [...], "context": {...}}  -> {"arm_ids": [...]}
+    /update         {"bandit_id": ..., "arm_id": ..., "reward": ...,
+                     "context": {...}, "payload": ...}       -> {}
+    /update_events  {"events": [[bandit_id, arm_id, reward,
+                                 context, payload], ...],
+                     "batch_id": ...}                        -> {"failed": [...]}
+
+`context` and `payload` are optional everywhere. Errors are answered with {"error": ...} and status
+400, or 404 for an unknown bandit or path. The events of `/update_events` are applied independently:
+the events that were not applied, e.g. for an unknown bandit or arm, are listed as
+{"index": ..., "error": ...} and the others are applied. A batch sent with a `batch_id` is applied
+once: the server remembers its last `max_batch_ids` batch ids, and a batch sent again, e.g. by a
+client retrying after a lost response, is answered with the outcome of the first one.
+
+Usage: python -m pulpo.server --config bandits.json --port 8000
+"""
+import argparse
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pulpo.bandits.contextual import context_hash
+from pulpo.pulpo import Pulpo
+
+logger = logging.getLogger(__name__)
+
+_Event = Tuple[str, str, float, Optional[dict], Optional[str]]
+
+try:
+    from asyncio import current_task
+except ImportError:
+    # Python 3.6
+    current_task = asyncio.Task.current_task
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status: int = status
+
+
+class Coalescer:
+    """
+    Turns the concurrent `choose` and `update` calls of a bandit into one vectorized call.
+
+    Calls are grouped by bandit id and context until the end of the current iteration of the event
+    loop, so every request that was read in the same iteration joins the batch and no request waits
+    for a timer. A group of decisions is made with one `Pulpo.choose_many`, and the feedback of the
+    iteration is applied with one `Pulpo.update_events`, i.e. one `update_many` per bandit and
+    context. The feedback of an iteration is applied before its decisions are made, and other calls
+    are deferred with `call` to keep that order.
+    """
+
+    def __init__(self, pulpo: Pulpo):
+        self.pulpo: Pulpo = pulpo
+        self.n_calls: int = 0
+        self.n_batches: int = 0
+        self._choices: Dict[Tuple[str, int], Tuple[Optional[dict], List[asyncio.Future]]] = {}
+        self._feedback: List[Tuple[_Event, asyncio.Future]] = []
+        # Deferred calls, run with the feedback (True) or after the decisions (False)
+        self._calls: Dict[bool, List[Tuple[Callable, tuple, asyncio.Future]]] = {
+            True: [], False: []}
+        self._scheduled: bool = False
+
+    def call(self, function: Callable, *args, feedback: bool = False) -> asyncio.Future:
+        """
+        Defers a call to the end of the iteration, with the feedback if `feedback` is True or with
+        the decisions.
+        """
+        future = self._future()
+        self._calls[feedback].append((function, args, future))
+        return future
+
+    def choose(self, bandit_id: str, context: dict = None) -> asyncio.Future:
+        future = self._future()
+        _, futures = self._choices.setdefault((bandit_id, context_hash(context)), (context, []))
+        futures.append(future)
+        return future
+
+    def update(self, bandit_id: str, arm_id: str, reward: float, context: dict = None,
+               payload: str = None) -> asyncio.Future:
+        future = self._future()
+        self._feedback.append(((bandit_id, arm_id, reward, context, payload), future))
+        return future
+
+    def _future(self) -> asyncio.Future:
+        loop = asyncio.get_event_loop()
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._flush)
+        self.n_calls += 1
+        return loop.create_future()
+
+    def _flush(self):
+        self._scheduled = False
+        choices, self._choices = self._choices, {}
+        feedback, self._feedback = self._feedback, []
+        calls, self._calls = self._calls, {True: [], False: []}
+        self.n_batches += len(choices) + bool(feedback) + len(calls[True]) + len(calls[False])
+
+        _run_calls(calls[True])
+
+        if feedback:
+            events, futures = zip(*feedback)
+            try:
+                # Bad events, e.g. of an unknown arm, fail alone
+                failures = dict(self.pulpo.update_events(events))
+            except Exception as error:
+                _set_exception(futures, error)
+            else:
+                for position, future in enumerate(futures):
+                    if position in failures:
+                        _set_exception([future], failures[position])
+                    else:
+                        _set_results([future], [None])
+
+        for (bandit_id, _), (context, futures) in choices.items():
+            try:
+                arm_ids = self.pulpo.choose_many(bandit_id, len(futures), context)
+            except Exception as error:
+                _set_exception(futures, error)
+            else:
+                _set_results(futures, arm_ids)
+
+        _run_calls(calls[False])
+
+
+def _run_calls(calls: List[Tuple[Callable, tuple, asyncio.Future]]):
+    for function, args, future in calls:
+        try:
+            result = function(*args)
+        except Exception as error:
+            _set_exception([future], error)
+        else:
+            _set_results([future], [result])
+
+
+def _set_results(futures: List[asyncio.Future], results: list):
+    for future, result in zip(futures, results):
+        if not future.done():
+            future.set_result(result)
+
+
+def _set_exception(futures: List[asyncio.Future], error: Exception):
+    for future in futures:
+        if not future.done():
+            future.set_exception(error)
+
+
+class PulpoServer:
+    """
+    HTTP/1.1 server of the decisions and feedback of a Pulpo instance.
+
+    Connections are kept alive, and requests pipelined on a connection are handled concurrently,
+    with their responses written in request order. Decisions and feedback go through a `Coalescer`,
+    so the bandits are called once per bandit and event loop iteration however many clients are
+    connected.
+    """
+
+    def __init__(self, pulpo: Pulpo, host: str = '127.0.0.1', port: int = 8000,
+                 max_body_size: int = 1 << 20, max_batch_ids: int = 65536):
+        """
+        PulpoServer constructor.
+
+        :param pulpo: [Pulpo], pulpo instance whose bandits are served.
+        :param host: [str, default='127.0.0.1'], address to listen on.
+        :param port: [int, default=8000], port to listen on, or 0 for any free port (see `port`
+        after `start`).
+        :param max_body_size: [int, default=1048576], maximum size in bytes of a request body.
+        :param max_batch_ids: [int, default=65536], number of the last batch ids of `/update_events`
+        that are remembered to apply a batch sent again only once.
+        """
+        self.pulpo: Pulpo = pulpo
+        self.host: str = host
+        self.port: int = port
+        self.max_body_size: int = max_body_size
+        self.max_batch_ids: int = max_batch_ids
+        self.coalescer: Coalescer = Coalescer(pulpo)
+        self._server: asyncio.AbstractServer = None
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Future] = {}
+        self._batches: OrderedDict = OrderedDict()
+        self._routes = {'/choose': self._choose, '/choose_batch': self._choose_batch,
+                        '/update': self._update, '/update_events': self._update_events}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        # Server.serve_forever requires Python 3.7+
+        await self._server.wait_closed()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Idle keep-alive connections would otherwise hold the server open
+            handlers = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[writer] = current_task()
+        responses: asyncio.Queue = asyncio.Queue()
+        writing = asyncio.ensure_future(self._write_responses(responses, writer))
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                path, body, keep_alive = request
+                await responses.put((asyncio.ensure_future(self._handle(path, body)), keep_alive))
+                if not keep_alive:
+                    break
+        except HttpError as error:
+            await responses.put((_completed(_response(error.status, {'error': str(error)})), False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await responses.put(None)
+            await writing
+
+    async def _write_responses(self, responses: asyncio.Queue, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                item = await responses.get()
+                if item is None:
+                    break
+                response, keep_alive = item
+                writer.write(await response)
+                # Only wait for the socket when nothing else is ready, so pipelined responses are
+                # sent together
+                if responses.empty():
+                    await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader
+                            ) -> Optional[Tuple[str, bytes, bool]]:
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as error:
+            if error.partial:
+                raise
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(400, "Request head too large")
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, path, version = lines[0].split(' ')
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "Malformed Content-Length")
+        if length > self.max_body_size:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        if method != 'POST':
+            # The body was read, so the connection can go on
+            return path, None, _keep_alive(version, headers)
+        return path, body, _keep_alive(version, headers)
+
+    async def _handle(self, path: str, body: Optional[bytes]) -> bytes:
+        route = self._routes.get(path)
+        if route is None:
+            return _response(404, {'error': "Unknown path {}".format(path)})
+        if body is None:
+            return _response(405, {'error': "Only POST is supported"})
+        try:
+            return _response(200, await route(json.loads(body)))
+        except HttpError as error:
+            return _response(error.status, {'error': str(error)})
+        except (KeyError, ValueError, TypeError) as error:
+            return _response(400, {'error': _describe(error)})
+        except Exception:
+            logger.exception("Failed to handle a request to %s", path)
+            return _response(500, {'error': "Internal server error"})
+
+    async def _choose(self, request: dict) -> dict:
+        bandit_id = self._bandit_id(request['bandit_id'])
+        return {'arm_id': await self.coalescer.choose(bandit_id, request.get('context'))}
+
+    async def _choose_batch(self, request: dict) -> dict:
+        bandit_ids = [self._bandit_id(bandit_id) for bandit_id in request['bandit_ids']]
+        return {'arm_ids': await self.coalescer.call(self.pulpo.choose_batch, bandit_ids,
+                                                     request.get('context'))}
+
+    async def _update(self, request: dict) -> dict:
+        await self.coalescer.update(self._bandit_id(request['bandit_id']), request['arm_id'],
+                                    float(request['reward']), request.get('context'),
+                                    request.get('payload'))
+        return {}
+
+    async def _update_events(self, request: dict) -> dict:
+        events = [(bandit_id, arm_id, float(reward), *optional)
+                  for bandit_id, arm_id, reward, *optional in request['events']]
+        batch_id = request.get('batch_id')
+        if batch_id is None:
+            failures = await self.coalescer.call(self.pulpo.update_events, events, feedback=True)
+        else:
+            # Shielded, as the outcome is shared with the retries of the batch
+            failures = await asyncio.shield(self._update_batch(str(batch_id), events))
+        return {'failed': [{'index': index, 'error': _describe(error)}
+                           for index, error in failures]}
+
+    def _update_batch(self, batch_id: str, events: list) -> asyncio.Future:
+        future = self._batches.get(batch_id)
+        if future is None:
+            future = self.coalescer.call(self.pulpo.update_events, events, feedback=True)
+            future.add_done_callback(lambda done: self._forget_failed_batch(batch_id, done))
+            self._batches[batch_id] = future
+            if len(self._batches) > self.max_batch_ids:
+                self._batches.popitem(last=False)
+        return future
+
+    def _forget_failed_batch(self, batch_id: str, future: asyncio.Future):
+        # A batch that failed as a whole may be sent again
+        failed = future.cancelled() or future.exception() is not None
+        if failed and self._batches.get(batch_id) is future:
+            del self._batches[batch_id]
+
+    def _bandit_id(self, bandit_id: str) -> str:
+        if bandit_id not in self.pulpo.bandits:
+            raise HttpError(404, "Unknown bandit {}".format(bandit_id))
+        return bandit_id
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, KeyError):
+        return "Missing or unknown {}".format(error)
+    return str(error)
+
+
+def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+def _response(status: int, payload: dict) -> bytes:
+    body = json.dumps(payload).encode('utf-8')
+    return ('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n'
+            .format(status, _REASONS.get(status, ''), len(body)).encode('latin-1') + body)
+
+
+def _completed(response: bytes) -> asyncio.Future:
+    future = asyncio.get_event_loop().create_future()
+    future.set_result(response)
+    return future
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", required=True, help="JSON array of bandit instructions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--lazy", action="store_true", help="build the bandits on first use")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    pulpo = Pulpo.make_from_json_file(args.config, lazy=args.lazy)
+    server = PulpoServer(pulpo, args.host, args.port)
+    logger.info("Serving %s on %s:%d", args.config, args.host, args.port)
+    # asyncio.run requires Python 3.7+
+    asyncio.new_event_loop().run_until_complete(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import logging
+import multiprocessing
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from pulpo.bandits.contextual import context_hash
+from pulpo.bandits.dataclasses import Feedback
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.decisions import DecisionTable
+from pulpo.feedback_log import FeedbackLog
+from pulpo.metrics import Metrics
+from pulpo.pulpo import Pulpo
+from pulpo.state_layout import StateLayout, read_consistent, write_locked
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    raise ImportError("pulpo.sharding requires Python 3.8+, for multiprocessing.shared_memory"
+                      ) from None
+
+logger = logging.getLogger(__name__)
+
+_UPDATE = 'update'
+_RESET = 'reset'
+_FLUSH = 'flush'
+
+
+def shard_of(bandit_id: str, n_shards: int) -> int:
+    """
+    :return: [int], shard that owns the bandit. Unlike `hash`, the result is the same in every
+    process.
+    """
+    return zlib.crc32(bandit_id.encode('utf-8')) % n_shards
+
+
+@dataclass
+class ShardHandle:
+    """
+    What another process needs to serve the bandits of a `ShardedPulpo`, see `ShardedPulpo.handle`.
+    It holds the inboxes of the workers, which are multiprocessing queues, so it can only be passed
+    to a process as an argument of `multiprocessing.Process`.
+    """
+    memory_name: str
+    layout: dict
+    bandits: List[OnlineBandit]
+    inboxes: list
+    batch_size: int
+
+
+class ShardedPulpo(Pulpo):
+    """
+    Pulpo whose bandits are partitioned across worker processes by a hash of the bandit id.
+
+    The state of all the bandits lives in one `multiprocessing.shared_memory` block laid out by
+    `StateLayout`. Feedback is buffered per shard and sent in batches to the worker process that
+    owns the bandit, which is the only writer of its state. `choose` is served for any bandit from a
+    consistent snapshot of the shared state, which is refreshed only when the version of the bandit
+    has changed.
+
+    Decisions need no owner, so they are not sent to the workers: a round trip to a worker would
+    cost more than the decision itself. They scale with the cores instead through `attach`, with
+    which every process started by this one, e.g. each process of a pre-forking server, serves
+    decisions from the shared state and sends its feedback to the workers.
+
+    Requires Python 3.8+, for `multiprocessing.shared_memory`.
+    """
+
+    def __init__(self, bandits: List[OnlineBandit], n_shards: int = None, batch_size: int = 1024,
+                 feedback_log: FeedbackLog = None, decisions: DecisionTable = None,
+                 metrics: Metrics = None):
+        """
+        ShardedPulpo constructor. Starts the worker processes.
+
+        :param bandits: List[OnlineBandit], List of bandits that will be managed.
+        :param n_shards: [int, default=None], number of worker processes. Defaults to the number of
+        CPUs.
+        :param batch_size: [int, default=1024], number of buffered feedback events of a shard that
+        triggers a send. See `Pulpo` for the other parameters. Feedback is logged and counted in the
+        metrics in this process, when it is buffered.
+        """
+        super().__init__(bandits, feedback_log, decisions, metrics)
+        self.layout: StateLayout = StateLayout.from_bandits(bandits)
+        memory = shared_memory.SharedMemory(create=True, size=max(self.layout.nbytes, 1))
+        self.layout.versions(memory.buf)[:] = 0
+        self.layout.write(bandits, memory.buf)
+
+        context = multiprocessing.get_context()
+        inboxes = [context.Queue() for _ in range(n_shards or os.cpu_count())]
+        self._connect(memory, inboxes, batch_size, 0)
+        self._owner: bool = True
+        self._acks = context.Queue()
+        self._workers = []
+        for shard in range(self.n_shards):
+            shard_bandits = [bandit for bandit in bandits
+                             if self._shards[bandit.bandit_id] == shard]
+            worker = context.Process(target=_serve_shard, daemon=True,
+                                     args=(shard_bandits, self._memory, self.layout.to_dict(),
+                                           self._inboxes[shard], self._acks))
+            worker.start()
+            self._workers.append(worker)
+
+    @classmethod
+    def attach(cls, handle: ShardHandle, feedback_log: FeedbackLog = None,
+               decisions: DecisionTable = None, metrics: Metrics = None):
+        """
+        Instantiates, in a process started by the owner of `handle`, a ShardedPulpo that serves the
+        same bandits from their shared state and sends its feedback to the same workers. It starts
+        no worker, and `flush` sends its buffered feedback without waiting for it to be applied. It
+        must be closed before its owner.
+
+        :param handle: [ShardHandle], handle returned by `handle` of the owner.
+        """
+        pulpo = cls.__new__(cls)
+        Pulpo.__init__(pulpo, handle.bandits, feedback_log, decisions, metrics)
+        pulpo.layout = StateLayout.from_dict(handle.layout)
+        # The state of the bandits is read from the shared memory on first use
+        pulpo._connect(shared_memory.SharedMemory(name=handle.memory_name), handle.inboxes,
+                       handle.batch_size, -1)
+        pulpo._owner = False
+        pulpo._acks = None
+        pulpo._workers = []
+        return pulpo
+
+    def handle(self) -> ShardHandle:
+        """
+        :return: [ShardHandle], handle to pass to the processes that `attach` to the bandits of this
+        ShardedPulpo.
+        """
+        return ShardHandle(self._memory.name, self.layout.to_dict(), list(self.bandits.values()),
+                           self._inboxes, self.batch_size)
+
+    def _connect(self, memory: shared_memory.SharedMemory, inboxes: list, batch_size: int,
+                 snapshot_version: int):
+        self.n_shards: int = len(inboxes)
+        self.batch_size: int = batch_size
+        self._memory = memory
+        self._inboxes = inboxes
+        self._versions: np.ndarray = self.layout.versions(memory.buf)
+        self._shared: Dict[str, Dict[str, np.ndarray]] = {
+            bandit_id: self.layout.views(memory.buf, bandit_id) for bandit_id in self.bandits}
+        self._snapshot_versions: Dict[str, int] = {bandit_id: snapshot_version
+                                                   for bandit_id in self.bandits}
+
+        self._shards: Dict[str, int] = {bandit_id: shard_of(bandit_id, self.n_shards)
+                                        for bandit_id in self.bandits}
+        self._pending: List[Dict[Tuple[str, int],
+                                 Tuple[Optional[Dict[str, str]], List[str], List[float]]]] = [
+            {} for _ in range(self.n_shards)]
+        self._pending_sizes: List[int] = [0] * self.n_shards
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _apply_reset(self, bandit_id: str):
+        shard = self._shards[bandit_id]
+        self._send(shard)
+        self._inboxes[shard].put((_RESET, bandit_id))
+
+    def choose(self, bandit_id: str, context: Dict[str, str] = None,
+               track: bool = False) -> Union[str, Tuple[str, int]]:
+        self._refresh(bandit_id)
+        return super().choose(bandit_id, context, track)
+
+    def choose_many(self, bandit_id: str, k: int, context: Dict[str, str] = None,
+                    distinct: bool = False) -> List[str]:
+        self._refresh(bandit_id)
+        return super().choose_many(bandit_id, k, context, distinct)
+
+    def _apply_update(self, bandit_id: str, feedback: Feedback):
+        self._apply_update_many(bandit_id, [feedback.arm_id], [feedback.reward], feedback.context)
+
+    def _apply_update_many(self, bandit_id: str, arm_ids: Sequence[str], rewards: Sequence[float],
+                           context: Optional[Dict[str, str]]):
+        shard = self._shards[bandit_id]
+        # Checked before buffering, as a batch that fails in the worker is dropped after it was
+        # logged
+        bandit = self.bandits[bandit_id]
+        for arm_id, reward in zip(arm_ids, rewards):
+            bandit.check_feedback(Feedback(arm_id, reward, context=context))
+        _, pending_arm_ids, pending_rewards = self._pending[shard].setdefault(
+            (bandit_id, context_hash(context)), (context, [], []))
+        pending_arm_ids.extend(arm_ids)
+        pending_rewards.extend(rewards)
+        self._pending_sizes[shard] += len(arm_ids)
+        if self._pending_sizes[shard] >= self.batch_size:
+            self._send(shard)
+
+    def save(self, path: str):
+        """
+        Applies the buffered feedback and saves the bandits with their latest shared state.
+        """
+        self.flush()
+        for bandit_id in self.bandits:
+            self._refresh(bandit_id)
+        super().save(path)
+
+    def flush(self):
+        """
+        Sends the buffered feedback and, unless attached (see `attach`), waits until every worker
+        has applied it.
+        """
+        for shard in range(self.n_shards):
+            self._send(shard)
+        if not self._owner:
+            return
+        for shard in range(self.n_shards):
+            self._inboxes[shard].put((_FLUSH, shard))
+        for _ in range(self.n_shards):
+            self._acks.get()
+
+    def close(self):
+        """
+        Applies the buffered feedback, stops the workers and releases the shared memory. When
+        attached, only sends the buffered feedback and detaches from the shared memory.
+        """
+        if self._memory is None:
+            return
+        self.flush()
+        if self._owner:
+            for inbox in self._inboxes:
+                inbox.put(None)
+            for worker in self._workers:
+                worker.join()
+        # Views of the block must be released before it can be closed
+        self._versions = None
+        self._shared = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+        self._memory = None
+
+    def _send(self, shard: int):
+        if self._pending_sizes[shard]:
+            batch = [(bandit_id, arm_ids, rewards, context)
+                     for (bandit_id, _), (context, arm_ids, rewards)
+                     in self._pending[shard].items()]
+            self._inboxes[shard].put((_UPDATE, batch))
+            self._pending[shard] = {}
+            self._pending_sizes[shard] = 0
+
+    def _refresh(self, bandit_id: str):
+        position = self.layout.positions[bandit_id]
+        if self._versions[position] != self._snapshot_versions[bandit_id]:
+            state = self.bandits[bandit_id].state_arrays()
+            self._snapshot_versions[bandit_id] = read_consistent(self._versions, position,
+                                                                 self._shared[bandit_id], state)
+
+
+def _serve_shard(bandits: List[OnlineBandit], memory: shared_memory.SharedMemory, layout: dict,
+                 inbox: multiprocessing.Queue, acks: multiprocessing.Queue):
+    layout = StateLayout.from_dict(layout)
+    layout.bind(bandits, memory.buf)
+    versions = layout.versions(memory.buf)
+    bandits = {bandit.bandit_id: bandit for bandit in bandits}
+
+    for kind, payload in iter(inbox.get, None):
+        if kind == _UPDATE:
+            for bandit_id, arm_ids, rewards, context in payload:
+                bandit = bandits[bandit_id]
+                try:
+                    write_locked(versions, layout.positions[bandit_id],
+                                 lambda: bandit.update_many(arm_ids, rewards, context))
+                except Exception:
+                    logger.exception("Failed to apply %d feedback events to bandit %s",
+                                     len(arm_ids), bandit_id)
+        elif kind == _RESET:
+            write_locked(versions, layout.positions[payload], bandits[payload].reset)
+        elif kind == _FLUSH:
+            acks.put(payload)
@@ -0,0 +1,179 @@
+from dataclasses import dataclass
+from typing import Dict, Type, Union
+
+import numpy as np
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.bandits.guassian_thompson import GaussianThompsonBandit
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.constants import fields
+
+
+class BernoulliRewards:
+    """
+    Rewards of 1 with probability `means` and 0 otherwise.
+    """
+
+    def __init__(self, means: np.ndarray):
+        """
+        :param means: [np.ndarray], mean reward of every arm, of shape (n_arms,), or (n_replicas,
+        n_arms) to give every replica its own problem.
+        """
+        self.means: np.ndarray = np.asarray(means, dtype=np.float64)
+
+    def sample(self, rng: np.random.Generator, means: np.ndarray, arms: np.ndarray) -> np.ndarray:
+        return (rng.random(len(means)) < means).astype(np.float64)
+
+
+class GaussianRewards:
+    """
+    Normally distributed rewards.
+    """
+
+    def __init__(self, means: np.ndarray, stds: Union[float, np.ndarray] = 1.0):
+        """
+        :param means: [np.ndarray], mean reward of every arm, of shape (n_arms,) or (n_replicas,
+        n_arms).
+        :param stds: [Union[float, np.ndarray], default=1.0], standard deviation of the rewards, for
+        all the arms or per arm.
+        """
+        self.means: np.ndarray = np.asarray(means, dtype=np.float64)
+        self.stds: np.ndarray = np.asarray(stds, dtype=np.float64)
+
+    def sample(self, rng: np.random.Generator, means: np.ndarray, arms: np.ndarray) -> np.ndarray:
+        stds = self.stds[arms] if self.stds.ndim else self.stds
+        return rng.normal(means, stds)
+
+
+Rewards = Union[BernoulliRewards, GaussianRewards]
+
+
+@dataclass
+class SimulationResult:
+    """
+    regret: mean over the replicas of the cumulative regret after every step, of shape (n_steps,).
+    regret_stderr: standard error of `regret`, of shape (n_steps,).
+    final_regret: cumulative regret of every replica at the end, of shape (n_replicas,).
+    pulls: number of times every replica chose every arm, of shape (n_replicas, n_arms).
+    """
+    regret: np.ndarray
+    regret_stderr: np.ndarray
+    final_regret: np.ndarray
+    pulls: np.ndarray
+
+
+class _Replicas:
+    """
+    Statistics of R independent copies of a bandit, stacked as (R, n_arms) arrays, starting from the
+    current statistics of the bandit.
+    """
+
+    def __init__(self, bandit: OnlineBandit, n_replicas: int):
+        self.bandit: OnlineBandit = bandit
+        self.state: Dict[str, np.ndarray] = {
+            field: np.repeat(bandit.store[field][np.newaxis], n_replicas, axis=0)
+            for field in bandit.store.fields}
+
+    def choose(self, rng: np.random.Generator) -> np.ndarray:
+        raise NotImplementedError
+
+    def increments(self, rewards: np.ndarray) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def update(self, arms: np.ndarray, rewards: np.ndarray):
+        # Every replica updates one arm, so the fancy-indexed additions never repeat an index
+        replicas = np.arange(len(arms))
+        for field, increment in self.increments(rewards).items():
+            self.state[field][replicas, arms] += increment
+
+
+class _EGreedyReplicas(_Replicas):
+
+    def choose(self, rng: np.random.Generator) -> np.ndarray:
+        n_replicas, n_arms = self.state[fields.N].shape
+        explore = rng.random(n_replicas) >= self.bandit.epsilon
+        best = np.argmax(self.state[fields.REWARD_SUM] / self.state[fields.N], axis=1)
+        return np.where(explore, rng.integers(n_arms, size=n_replicas), best)
+
+    def increments(self, rewards: np.ndarray) -> Dict[str, np.ndarray]:
+        return {fields.N: 1, fields.REWARD_SUM: rewards}
+
+
+class _BetaThompsonReplicas(_Replicas):
+
+    def choose(self, rng: np.random.Generator) -> np.ndarray:
+        scores = BetaThompsonBandit._sample_scores(rng, self.state[fields.N],
+                                                   self.state[fields.N_REWARDS])
+        return np.argmax(scores, axis=1)
+
+    def increments(self, rewards: np.ndarray) -> Dict[str, np.ndarray]:
+        return {fields.N: 1, fields.N_REWARDS: rewards}
+
+
+class _GaussianThompsonReplicas(_Replicas):
+
+    def choose(self, rng: np.random.Generator) -> np.ndarray:
+        scores = GaussianThompsonBandit._sample_scores(rng, self.state[fields.N],
+                                                       self.state[fields.REWARD_SUM],
+                                                       self.state[fields.SQUARED_REWARD_SUM])
+        return np.argmax(scores, axis=1)
+
+    def increments(self, rewards: np.ndarray) -> Dict[str, np.ndarray]:
+        return {fields.N: 1, fields.REWARD_SUM: rewards,
+                fields.SQUARED_REWARD_SUM: np.square(rewards)}
+
+
+_REPLICAS: Dict[Type[OnlineBandit], Type[_Replicas]] = {
+    EGreedy: _EGreedyReplicas,
+    BetaThompsonBandit: _BetaThompsonReplicas,
+    GaussianThompsonBandit: _GaussianThompsonReplicas,
+}
+
+
+def simulate(bandit: OnlineBandit, rewards: Rewards, n_steps: int, n_replicas: int = 1000,
+             seed: int = None) -> SimulationResult:
+    """
+    Runs `n_replicas` independent trajectories of `n_steps` decisions of a bandit against synthetic
+    rewards, and measures their regret, i.e. the expected reward lost against always choosing the
+    best arm.
+
+    Replicas start from the current statistics and parameters of the bandit, which is left
+    untouched. Every step decides and updates all the replicas at once with operations over
+    (n_replicas, n_arms) arrays, using the same scoring functions as the bandits, so the cost of a
+    step barely depends on the number of replicas until they fill the CPU caches.
+
+    :param bandit: [OnlineBandit], an EGreedy, BetaThompsonBandit or GaussianThompsonBandit, e.g.
+    built by `BanditFactory.make_bandit` from the configuration to tune.
+    :param rewards: [Rewards], reward distribution of the arms, in the order of the arms of the
+    bandit.
+    :param n_steps: [int], number of decisions of every replica.
+    :param n_replicas: [int, default=1000], number of independent replicas.
+    :param seed: [int, default=None], seed of the random generator of the simulation.
+    :return: [SimulationResult], regret curve and arm pulls.
+    """
+    replicas_class = _REPLICAS.get(type(bandit))
+    if replicas_class is None:
+        raise ValueError("Simulation is not supported for {}".format(type(bandit).__name__))
+
+    rng = np.random.default_rng(seed)
+    replicas = replicas_class(bandit, n_replicas)
+    n_arms = len(bandit.store)
+    means = np.broadcast_to(rewards.means, (n_replicas, n_arms))
+    best_means = means.max(axis=1)
+    replica_index = np.arange(n_replicas)
+
+    cumulative = np.zeros(n_replicas)
+    regret = np.empty(n_steps)
+    regret_stderr = np.empty(n_steps)
+    pulls = np.zeros((n_replicas, n_arms), dtype=np.int64)
+    for step in range(n_steps):
+        arms = replicas.choose(rng)
+        chosen_means = means[replica_index, arms]
+        replicas.update(arms, rewards.sample(rng, chosen_means, arms))
+        pulls[replica_index, arms] += 1
+        cumulative += best_means - chosen_means
+        regret[step] = cumulative.mean()
+        regret_stderr[step] = cumulative.std() / np.sqrt(n_replicas)
+
+    return SimulationResult(regret, regret_stderr, cumulative, pulls)
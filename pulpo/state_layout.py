@@ -0,0 +1,133 @@
+import operator
+import time
+from functools import reduce
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from pulpo.bandits.online_bandits import OnlineBandit
+
+_ITEM_SIZE = 8
+
+
+class StateLayout:
+    """
+    Layout of the learned state of several bandits in one flat buffer, such as a shared memory
+    block, a memory-mapped file or a snapshot.
+
+    The buffer starts with one int64 version counter per bandit, followed by every state array of
+    every bandit (see `OnlineBandit.state_arrays`) as float64. The version counters implement a
+    sequence lock: a writer makes the version of a bandit odd while it changes the state of the
+    bandit, so readers can take a consistent copy without locking (see `write_locked` and
+    `read_consistent`).
+    """
+
+    def __init__(self, bandit_ids: List[str],
+                 arrays: Dict[str, Dict[str, Tuple[int, Tuple[int, ...]]]]):
+        """
+        Constructor of StateLayout
+
+        :param bandit_ids: [List[str]], bandit ids, in the order of their version counters.
+        :param arrays: [Dict[str, Dict[str, Tuple[int, Tuple[int, ...]]]]], offset (in items from
+        the start of the buffer) and shape of each state array, keyed by bandit id and array name.
+        """
+        self.bandit_ids: List[str] = bandit_ids
+        self.positions: Dict[str, int] = {bandit_id: position
+                                          for position, bandit_id in enumerate(bandit_ids)}
+        self.arrays: Dict[str, Dict[str, Tuple[int, Tuple[int, ...]]]] = arrays
+        self.n_items: int = len(bandit_ids) + sum(reduce(operator.mul, shape, 1)
+                                                  for bandit_arrays in arrays.values()
+                                                  for _, shape in bandit_arrays.values())
+
+    @classmethod
+    def from_bandits(cls, bandits: List[OnlineBandit]):
+        bandit_ids = [bandit.bandit_id for bandit in bandits]
+        offset = len(bandits)
+        arrays = {}
+        for bandit in bandits:
+            arrays[bandit.bandit_id] = {}
+            for name, array in bandit.state_arrays().items():
+                arrays[bandit.bandit_id][name] = (offset, array.shape)
+                offset += array.size
+        return cls(bandit_ids, arrays)
+
+    @classmethod
+    def from_dict(cls, layout: dict):
+        arrays = {bandit_id: {name: (offset, tuple(shape))
+                              for name, (offset, shape) in bandit_arrays.items()}
+                  for bandit_id, bandit_arrays in layout['arrays'].items()}
+        return cls(layout['bandit_ids'], arrays)
+
+    def to_dict(self) -> dict:
+        """
+        :return: [dict], JSON serializable description of the layout.
+        """
+        arrays = {bandit_id: {name: [offset, list(shape)]
+                              for name, (offset, shape) in bandit_arrays.items()}
+                  for bandit_id, bandit_arrays in self.arrays.items()}
+        return {'bandit_ids': self.bandit_ids, 'arrays': arrays}
+
+    @property
+    def nbytes(self) -> int:
+        return self.n_items * _ITEM_SIZE
+
+    def versions(self, buffer) -> np.ndarray:
+        """
+        :param buffer: buffer of at least `nbytes` bytes.
+        :return: [np.ndarray], view of the version counters in `buffer`.
+        """
+        return np.ndarray((len(self.bandit_ids),), dtype=np.int64, buffer=buffer)
+
+    def views(self, buffer, bandit_id: str) -> Dict[str, np.ndarray]:
+        """
+        :param buffer: buffer of at least `nbytes` bytes.
+        :param bandit_id: [str], bandit id
+        :return: [Dict[str, np.ndarray]], views of the state arrays of the bandit in `buffer`.
+        """
+        return {name: np.ndarray(shape, dtype=np.float64, buffer=buffer, offset=offset * _ITEM_SIZE)
+                for name, (offset, shape) in self.arrays[bandit_id].items()}
+
+    def write(self, bandits: List[OnlineBandit], buffer):
+        """
+        Copies the state of the bandits into `buffer`.
+        """
+        for bandit in bandits:
+            arrays = bandit.state_arrays()
+            for name, view in self.views(buffer, bandit.bandit_id).items():
+                view[...] = arrays[name]
+
+    def bind(self, bandits: List[OnlineBandit], buffer):
+        """
+        Makes the bandits use their views in `buffer` as state storage. Nothing is copied.
+        """
+        for bandit in bandits:
+            bandit.bind_state(self.views(buffer, bandit.bandit_id))
+
+
+def write_locked(versions: np.ndarray, position: int, write: Callable[[], None]):
+    """
+    Runs `write`, which changes the state of the bandit at `position`, with its version made odd.
+    There must be a single writer per bandit.
+    """
+    versions[position] += 1
+    try:
+        write()
+    finally:
+        versions[position] += 1
+
+
+def read_consistent(versions: np.ndarray, position: int, sources: Dict[str, np.ndarray],
+                    targets: Dict[str, np.ndarray]) -> int:
+    """
+    Copies the state arrays of the bandit at `position` without observing a write in progress.
+
+    :return: [int], version of the copied state.
+    """
+    while True:
+        version = int(versions[position])
+        if version % 2 == 0:
+            for name, source in sources.items():
+                np.copyto(targets[name], source)
+            if versions[position] == version:
+                return version
+        time.sleep(0)
@@ -0,0 +1,110 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from pulpo.bandits.contextual import context_hash
+from pulpo.bandits.dataclasses import Feedback
+from pulpo.bandits.online_bandits import OnlineBandit
+from pulpo.decisions import DecisionTable
+from pulpo.feedback_log import FeedbackLog
+from pulpo.metrics import Metrics
+from pulpo.pulpo import Pulpo
+
+
+class ThreadSafePulpo(Pulpo):
+    """
+    Pulpo that can be shared by the threads of a server.
+
+    `choose` reads the arm statistics without taking any lock, so it never waits for updates.
+    Feedback passed to `update` is appended to a buffer of its bandit and merged with one
+    `update_many` call per context by whichever thread acquires the lock of the bandit, so updating
+    threads don't queue behind each other and no feedback is lost.
+
+    Feedback is logged and counted in the metrics when it is buffered. Tracked decisions (see
+    `Pulpo.choose`) are recorded and rewarded under one lock of the decision table.
+
+    Feedback is checked with `OnlineBandit.check_feedback` before it is buffered, so feedback with
+    an unknown arm id raises a KeyError in the thread that sent it, and is neither logged nor
+    merged.
+    """
+
+    def __init__(self, bandits: List[OnlineBandit], merge_size: int = 1,
+                 feedback_log: FeedbackLog = None, decisions: DecisionTable = None,
+                 metrics: Metrics = None):
+        """
+        ThreadSafePulpo constructor.
+
+        :param bandits: List[OnlineBandit], List of bandits that will be managed.
+        :param merge_size: [int, default=1], number of buffered feedback events of a bandit that
+        triggers a merge. With values above 1 the latest feedback becomes visible to `choose` in
+        batches, or on `flush`. See `Pulpo` for the other parameters.
+        """
+        super().__init__(bandits, feedback_log, decisions, metrics)
+        self.merge_size: int = merge_size
+        self._locks: Dict[str, threading.Lock] = {bandit_id: threading.Lock()
+                                                  for bandit_id in self.bandits}
+        self._pending: Dict[str, Deque[Tuple[str, float, Optional[Dict[str, str]]]]] = {
+            bandit_id: deque() for bandit_id in self.bandits}
+        # Reentrant, since tracking a decision expires the old ones
+        self._decisions_lock: threading.RLock = threading.RLock()
+
+    def _apply_reset(self, bandit_id: str):
+        with self._locks[bandit_id]:
+            self._pending[bandit_id].clear()
+            self.bandits[bandit_id].reset()
+
+    def choose(self, bandit_id: str, context: Dict[str, str] = None,
+               track: bool = False) -> Union[str, Tuple[str, int]]:
+        if not track:
+            return super().choose(bandit_id, context)
+        with self._decisions_lock:
+            return super().choose(bandit_id, context, track)
+
+    def update_decision(self, decision_id: int, reward: float, payload: str = None):
+        with self._decisions_lock:
+            super().update_decision(decision_id, reward, payload)
+
+    def expire_decisions(self, reserve: int = 0) -> int:
+        with self._decisions_lock:
+            return super().expire_decisions(reserve)
+
+    def _apply_update(self, bandit_id: str, feedback: Feedback):
+        self.bandits[bandit_id].check_feedback(feedback)
+        self._pending[bandit_id].append((feedback.arm_id, feedback.reward, feedback.context))
+        self._merge(bandit_id, self.merge_size, blocking=False)
+
+    def _apply_update_many(self, bandit_id: str, arm_ids: Sequence[str], rewards: Sequence[float],
+                           context: Optional[Dict[str, str]]):
+        with self._locks[bandit_id]:
+            self._drain(bandit_id)
+            self.bandits[bandit_id].update_many(arm_ids, rewards, context)
+
+    def flush(self):
+        """
+        Merges the buffered feedback of all bandits, waiting for their locks if needed.
+        """
+        for bandit_id in self.bandits:
+            self._merge(bandit_id, 1, blocking=True)
+
+    def _merge(self, bandit_id: str, min_pending: int, blocking: bool):
+        pending = self._pending[bandit_id]
+        lock = self._locks[bandit_id]
+        # The buffer is checked again after every release, so feedback appended while another
+        # thread was merging is never left behind.
+        while len(pending) >= min_pending and lock.acquire(blocking):
+            try:
+                self._drain(bandit_id)
+            finally:
+                lock.release()
+
+    def _drain(self, bandit_id: str):
+        pending = self._pending[bandit_id]
+        events = [pending.popleft() for _ in range(len(pending))]
+        # The buffered feedback is merged with one call per context
+        columns: Dict[int, Tuple[Optional[Dict[str, str]], List[str], List[float]]] = {}
+        for arm_id, reward, context in events:
+            _, arm_ids, rewards = columns.setdefault(context_hash(context), (context, [], []))
+            arm_ids.append(arm_id)
+            rewards.append(reward)
+        for context, arm_ids, rewards in columns.values():
+            self.bandits[bandit_id].update_many(arm_ids, rewards, context)
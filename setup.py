@@ -19,6 +19,7 @@ setup(
     name='pulpo',
     version='0.0.1',
     setup_cfg=True,
+    # pulpo.sharding requires Python 3.8+, for multiprocessing.shared_memory
     python_requires='~=3.6',
     packages=find_packages(where='.'),
     long_description=long_description,
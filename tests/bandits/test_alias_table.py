@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.alias_table import AliasTable
+
+
+class AliasTableTest(TestCase):
+
+    def test_should_match_distribution_of_weights(self):
+        rng = np.random.default_rng(0)
+        for weights in [rng.random(50), np.exp(rng.normal(0, 5, 50)),
+                        np.array([0.0, 1.0, 0.0, 2.0]), np.ones(7)]:
+            table = AliasTable(len(weights))
+
+            table.build(weights)
+
+            np.testing.assert_allclose(table.distribution(), weights / np.sum(weights), atol=1e-12)
+            assert np.all((table.probabilities >= 0) & (table.probabilities <= 1))
+
+    def test_should_sample_with_weights(self):
+        rng = np.random.default_rng(0)
+        table = AliasTable(4)
+        table.build(np.array([1.0, 2.0, 0.0, 7.0]))
+
+        frequencies = np.bincount(table.sample_many(rng, 100000), minlength=4) / 100000
+        single = np.bincount([table.sample(rng) for _ in range(20000)], minlength=4) / 20000
+
+        np.testing.assert_allclose(frequencies, [0.1, 0.2, 0.0, 0.7], atol=0.01)
+        np.testing.assert_allclose(single, [0.1, 0.2, 0.0, 0.7], atol=0.02)
+
+    def test_should_use_given_storage(self):
+        probabilities, aliases = np.zeros(3), np.zeros(3)
+        table = AliasTable(3, probabilities, aliases)
+
+        table.build(np.array([1.0, 1.0, 4.0]))
+
+        assert table.probabilities is probabilities and table.aliases is aliases
+        np.testing.assert_allclose(probabilities, [0.5, 0.5, 1.0])
+        np.testing.assert_allclose(aliases, [2, 2, 2])
+        with self.assertRaises(ValueError):
+            table.bind(np.zeros(4), np.zeros(4))
@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.arm_store import ArmStore
+from pulpo.bandits.dataclasses import GaussianArm, BetaArm
+
+
+class ArmStoreTest(TestCase):
+
+    def test_should_store_one_contiguous_row_per_field(self):
+        arms = [GaussianArm('arm1', 1, 2, 3), GaussianArm('arm2', 4, 5, 6)]
+
+        store = ArmStore.from_arms(GaussianArm, arms)
+
+        assert store.fields == ['n', 'reward_sum', 'squared_reward_sum']
+        assert store.data.shape == (3, 2)
+        assert store['reward_sum'].flags['C_CONTIGUOUS']
+        np.testing.assert_array_equal(store['n'], [1, 4])
+        np.testing.assert_array_equal(store['squared_reward_sum'], [3, 6])
+
+    def test_should_resolve_arm_positions(self):
+        store = ArmStore(BetaArm, ['arm1', 'arm2', 'arm3'])
+
+        assert len(store) == 3
+        assert store.position('arm3') == 2
+        with self.assertRaises(KeyError):
+            store.position('unknown_arm')
+
+    def test_should_add_increments_to_one_arm(self):
+        store = ArmStore.from_arms(BetaArm, [BetaArm('arm1', 2, 1), BetaArm('arm2', 2, 1)])
+
+        store.add(1, {'n': 1, 'n_rewards': 1})
+
+        assert store.arm(0) == BetaArm('arm1', 2, 1)
+        assert store.arm(1) == BetaArm('arm2', 3, 2)
+
+    def test_should_fill_all_arms(self):
+        store = ArmStore.from_arms(BetaArm, [BetaArm('arm1', 5, 1), BetaArm('arm2', 7, 3)])
+
+        store.fill({'n': 2, 'n_rewards': 1})
+
+        assert store.arms() == {'arm1': BetaArm('arm1', 2, 1), 'arm2': BetaArm('arm2', 2, 1)}
+
+    def test_should_return_arm_copies(self):
+        store = ArmStore.from_arms(BetaArm, [BetaArm('arm1', 2, 1)])
+
+        arm = store.arm(0)
+        arm.n = 100
+
+        assert store['n'][0] == 2
+
+    def test_should_use_given_storage(self):
+        data = np.ones((2, 3))
+
+        store = ArmStore(BetaArm, ['arm1', 'arm2', 'arm3'], data=data)
+        store.add(0, {'n': 1})
+
+        assert data[0, 0] == 2
+
+    def test_should_aggregate_repeated_arms_when_adding_many(self):
+        store = ArmStore.from_arms(BetaArm,
+                                   [BetaArm('arm1', 2, 1), BetaArm('arm2', 2, 1),
+                                    BetaArm('arm3', 2, 1)])
+
+        store.add_many(store.positions(['arm3', 'arm1', 'arm3', 'arm3']),
+                       {'n': 1, 'n_rewards': np.array([1, 0, 1, 0])})
+
+        assert store.arms() == {'arm1': BetaArm('arm1', 3, 1), 'arm2': BetaArm('arm2', 2, 1),
+                                'arm3': BetaArm('arm3', 5, 3)}
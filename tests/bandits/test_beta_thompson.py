@@ -15,7 +15,7 @@ class BetaThompsonBanditTest(TestCase):
 
         chosen_arm = beta_bandit.choose()
 
-        assert chosen_arm.arm_id == 'arm1' or chosen_arm.arm_id == 'arm2' or chosen_arm.arm_id == 'arm3'
+        assert chosen_arm.arm_id in ('arm1', 'arm2', 'arm3')
 
     def test_should_update_an_arm_with_feedback(self):
         arm_names = ['arm1', 'arm2', 'arm3']
@@ -98,3 +98,52 @@ class BetaThompsonBanditTest(TestCase):
         assert gaussian_thompson.arms_dict == {"arm1": BetaArm("arm1", 2, 1),
                                                "arm2": BetaArm("arm2", 2, 1),
                                                "arm3": BetaArm("arm3", 2, 1)}
+
+    def test_should_make_reproducible_decisions_with_seed(self):
+        arms = [BetaArm('arm' + str(i), n=2, n_rewards=1) for i in range(500)]
+
+        first_bandit = BetaThompsonBandit('my_bandit', arms, seed=42)
+        second_bandit = BetaThompsonBandit('my_bandit', arms, seed=42)
+
+        assert ([first_bandit.choose().arm_id for _ in range(50)]
+                == [second_bandit.choose().arm_id for _ in range(50)])
+
+    def test_should_read_seed_from_config_parameters(self):
+        config = BanditConfig(bandit_id="test_bandit", arm_ids=["arm" + str(i) for i in range(100)],
+                              parameters={'seed': 7})
+
+        first_bandit = BetaThompsonBandit.make_from_bandit_config(config)
+        second_bandit = BetaThompsonBandit.make_from_bandit_config(config)
+
+        assert ([first_bandit.choose().arm_id for _ in range(20)]
+                == [second_bandit.choose().arm_id for _ in range(20)])
+
+    def test_should_choose_many_arms(self):
+        arms = [BetaArm('arm' + str(i), n=2, n_rewards=1) for i in range(10)]
+
+        beta_bandit = BetaThompsonBandit('my_bandit', arms, seed=1)
+
+        chosen_arms = beta_bandit.choose_many(500)
+
+        assert len(chosen_arms) == 500
+        assert {arm.arm_id for arm in chosen_arms} == {arm.arm_id for arm in arms}
+
+    def test_should_choose_distinct_arms_in_rank_order(self):
+        arms = [BetaArm("arm1", 100000, 10), BetaArm("arm2", 100000, 99999),
+                BetaArm("arm3", 100000, 50000)]
+
+        beta_bandit = BetaThompsonBandit('my_bandit', arms)
+
+        assert [arm.arm_id for arm in beta_bandit.choose_many(2, distinct=True)] == ['arm2', 'arm3']
+        assert ([arm.arm_id for arm in beta_bandit.choose_many(5, distinct=True)]
+                == ['arm2', 'arm3', 'arm1'])
+
+    def test_should_update_many_arms(self):
+        arms = [BetaArm(name, n=2, n_rewards=1) for name in ['arm1', 'arm2']]
+
+        beta_bandit = BetaThompsonBandit('my_bandit', arms)
+
+        beta_bandit.update_many(['arm2', 'arm2', 'arm1'], [1, 0, 1])
+
+        assert beta_bandit.arms_dict == {'arm1': BetaArm('arm1', 3, 2),
+                                         'arm2': BetaArm('arm2', 4, 2)}
@@ -0,0 +1,114 @@
+from unittest import TestCase
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.cached import CachedBandit
+from pulpo.bandits.contextual import ContextualBandit
+from pulpo.bandits.dataclasses import BetaArm, EpsilonGreedyArm, Feedback
+from pulpo.bandits.epsilon_greedy import EGreedy
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_bandit(**kwargs):
+    arms = [EpsilonGreedyArm('arm1', 2, 1), EpsilonGreedyArm('arm2', 1, 0)]
+    return CachedBandit(EGreedy('my_bandit', arms, epsilon=1.0, seed=1), **kwargs)
+
+
+class CachedBanditTest(TestCase):
+
+    def test_should_serve_decisions_from_block(self):
+        arms = [BetaArm('arm' + str(i), n=2, n_rewards=1) for i in range(5)]
+        bandit = CachedBandit(BetaThompsonBandit('my_bandit', arms, seed=1), cache_size=100)
+        expected = BetaThompsonBandit('my_bandit', arms, seed=1).choose_many(100)
+
+        assert [bandit.choose().arm_id for _ in range(100)] == [arm.arm_id for arm in expected]
+
+    def test_should_keep_stale_decisions_until_enough_updates(self):
+        bandit = make_bandit(cache_size=10, cache_updates=3)
+        assert bandit.choose().arm_id == 'arm1'
+
+        bandit.update_many(['arm2', 'arm2'], [1, 1])
+        assert bandit.choose().arm_id == 'arm1'
+
+        bandit.update(Feedback('arm2', 1))
+        assert bandit.choose().arm_id == 'arm2'
+
+    def test_should_refill_exhausted_block(self):
+        bandit = make_bandit(cache_size=2)
+        bandit.choose()
+        bandit.choose()
+        bandit.bandit.update(Feedback('arm2', 1))
+        bandit.bandit.update(Feedback('arm2', 1))
+
+        assert bandit.choose().arm_id == 'arm2'
+
+    def test_should_expire_decisions_after_ttl(self):
+        clock = FakeClock()
+        bandit = make_bandit(cache_ttl=1.0, clock=clock)
+        assert bandit.choose().arm_id == 'arm1'
+        bandit.update_many(['arm2', 'arm2'], [1, 1])
+
+        clock.now = 0.5
+        assert bandit.choose().arm_id == 'arm1'
+        clock.now = 1.0
+        assert bandit.choose().arm_id == 'arm2'
+
+    def test_should_keep_block_per_context(self):
+        arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0)]
+        bandit = CachedBandit(ContextualBandit(EGreedy('my_bandit', arms, epsilon=1.0, seed=1)),
+                              cache_updates=2)
+        bandit.update(Feedback('arm1', 1, context={'country': 'gr'}))
+        bandit.update(Feedback('arm2', 1, context={'country': 'nl'}))
+
+        assert bandit.choose({'country': 'gr'}).arm_id == 'arm1'
+        assert bandit.choose({'country': 'nl'}).arm_id == 'arm2'
+        assert bandit.choose_many(3, {'country': 'nl'}) == [bandit.choose({'country': 'nl'})] * 3
+
+    def test_should_not_cache_beyond_max_contexts(self):
+        bandit = make_bandit(cache_size=10, max_cached_contexts=1)
+        bandit.choose({'country': 'gr'})
+        bandit.update_many(['arm2', 'arm2'], [1, 1])
+
+        assert bandit.choose({'country': 'nl'}).arm_id == 'arm2'
+        assert bandit.choose({'country': 'gr'}).arm_id == 'arm1'
+
+    def test_should_invalidate_on_reset(self):
+        bandit = make_bandit()
+        bandit.update_many(['arm2', 'arm2'], [1, 1])
+        assert bandit.choose().arm_id == 'arm2'
+
+        bandit.reset()
+
+        assert bandit.choose().arm_id == bandit.bandit.choose().arm_id
+
+    def test_should_be_made_by_factory(self):
+        instruction = {'bandit_id': 'my_bandit', 'bandit_type': 'beta_thompson',
+                       'arm_ids': ['arm1', 'arm2'],
+                       'parameters': {'max_contexts': 8, 'cache_size': 1000, 'cache_updates': 100}}
+        bandit = BanditFactory.make_bandit(instruction)
+
+        assert isinstance(bandit, CachedBandit)
+        assert isinstance(bandit.bandit, ContextualBandit)
+        assert (bandit.cache_size, bandit.cache_updates, bandit.cache_ttl) == (1000, 100, None)
+        assert BanditFactory.make_instruction(bandit) == instruction
+
+    def test_should_be_made_from_its_config(self):
+        bandit = BanditFactory.make_bandit({'bandit_id': 'my_bandit',
+                                            'bandit_type': 'epsilon_greedy',
+                                            'arm_ids': ['arm1', 'arm2'],
+                                            'parameters': {'cache_size': 10}})
+
+        config = bandit.to_bandit_config()
+        copy = CachedBandit.make_from_bandit_config(config)
+
+        assert isinstance(copy, CachedBandit)
+        assert isinstance(copy.bandit, EGreedy)
+        assert copy.to_bandit_config() == config
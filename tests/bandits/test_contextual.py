@@ -0,0 +1,106 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.cached import CachedBandit
+from pulpo.bandits.contextual import ContextualBandit, context_hash
+from pulpo.bandits.dataclasses import EpsilonGreedyArm, Feedback
+from pulpo.bandits.epsilon_greedy import EGreedy
+
+
+def make_bandit(max_contexts=4):
+    arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0)]
+    return ContextualBandit(EGreedy('my_bandit', arms, epsilon=1.0, seed=1), max_contexts)
+
+
+class ContextualBanditTest(TestCase):
+
+    def test_should_hash_context_independently_of_key_order(self):
+        assert context_hash({'a': '1', 'b': '2'}) == context_hash({'b': '2', 'a': '1'})
+        assert context_hash({'a': '1', 'b': '2'}) != context_hash({'a': '2', 'b': '1'})
+        assert context_hash(None) == context_hash({})
+
+    def test_should_hash_feature_values(self):
+        assert context_hash({'a': 0.5, 'b': 1}) == context_hash({'b': 1, 'a': 0.5})
+        assert context_hash({'a': 0.5}) != context_hash({'a': 0.25})
+        assert context_hash([0.5, 1.0]) == context_hash(np.array([0.5, 1.0]))
+        assert context_hash([0.5, 1.0]) != context_hash([1.0, 0.5])
+
+    def test_should_learn_separately_per_context(self):
+        bandit = make_bandit()
+
+        bandit.update(Feedback('arm1', 1, context={'country': 'gr'}))
+        bandit.update_many(['arm2', 'arm2'], [1, 1], context={'country': 'nl'})
+
+        assert bandit.choose({'country': 'gr'}).arm_id == 'arm1'
+        assert bandit.choose({'country': 'nl'}).arm_id == 'arm2'
+        assert (bandit.context_bandit({'country': 'nl'}).arms_dict
+                == {'arm1': EpsilonGreedyArm('arm1', 1, 0),
+                    'arm2': EpsilonGreedyArm('arm2', 3, 2)})
+        assert bandit.n_contexts == 2
+
+    def test_should_choose_unseen_context_with_prior(self):
+        bandit = make_bandit()
+        bandit.update(Feedback('arm2', 1, context={'country': 'gr'}))
+
+        assert bandit.context_bandit({'country': 'es'}) is bandit.bandit
+        assert bandit.choose({'country': 'es'}).arm_id == 'arm1'
+        assert bandit.n_contexts == 1
+
+    def test_should_evict_least_recently_updated_context(self):
+        bandit = make_bandit(max_contexts=2)
+        bandit.update(Feedback('arm2', 1, context={'country': 'gr'}))
+        bandit.update(Feedback('arm2', 1, context={'country': 'nl'}))
+        bandit.update(Feedback('arm2', 1, context={'country': 'gr'}))
+
+        bandit.update(Feedback('arm1', 1, context={'country': 'es'}))
+
+        assert bandit.n_contexts == 2
+        assert bandit.context_bandit({'country': 'nl'}) is bandit.bandit
+        assert (bandit.context_bandit({'country': 'gr'}).arms_dict['arm2']
+                == EpsilonGreedyArm('arm2', 3, 2))
+        assert (bandit.context_bandit({'country': 'es'}).arms_dict
+                == {'arm1': EpsilonGreedyArm('arm1', 2, 1),
+                    'arm2': EpsilonGreedyArm('arm2', 1, 0)})
+
+    def test_should_forget_contexts_on_reset(self):
+        bandit = make_bandit()
+        bandit.update(Feedback('arm2', 1, context={'country': 'gr'}))
+
+        bandit.reset()
+
+        assert bandit.n_contexts == 0
+        assert bandit.choose({'country': 'gr'}).arm_id == 'arm1'
+
+    def test_should_rebuild_index_from_copied_state(self):
+        bandit = make_bandit()
+        bandit.update_many(['arm2', 'arm2'], [1, 1], context={'country': 'gr'})
+        copy = make_bandit()
+
+        for name, array in bandit.state_arrays().items():
+            np.copyto(copy.state_arrays()[name], array)
+
+        assert copy.n_contexts == 1
+        assert (copy.context_bandit({'country': 'gr'}).arms_dict
+                == bandit.context_bandit({'country': 'gr'}).arms_dict)
+
+    def test_should_be_made_from_its_config(self):
+        bandit = make_bandit()
+
+        config = bandit.to_bandit_config()
+        copy = ContextualBandit.make_from_bandit_config(config)
+
+        assert isinstance(copy, ContextualBandit)
+        assert isinstance(copy.bandit, EGreedy)
+        assert copy.max_contexts == 4
+        assert copy.to_bandit_config() == config
+
+    def test_should_learn_per_context_around_a_wrapped_bandit(self):
+        arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0)]
+        bandit = ContextualBandit(CachedBandit(EGreedy('my_bandit', arms, epsilon=1.0),
+                                               cache_size=4, cache_updates=1))
+
+        bandit.update(Feedback('arm2', 1, context={'country': 'gr'}))
+
+        assert bandit.choose({'country': 'gr'}).arm_id == 'arm2'
+        assert bandit.choose({'country': 'nl'}).arm_id == 'arm1'
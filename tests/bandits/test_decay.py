@@ -0,0 +1,126 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BetaArm, EpsilonGreedyArm, Feedback
+from pulpo.bandits.decay import DecayedArmStore, WindowedArmStore, make_arm_store
+from pulpo.bandits.epsilon_greedy import EGreedy
+
+
+class Clock:
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class DecayedArmStoreTest(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.store = DecayedArmStore.from_arms(BetaArm,
+                                               [BetaArm('arm1', 2, 1), BetaArm('arm2', 2, 1)],
+                                               half_life=10, clock=self.clock)
+
+    def test_should_halve_increments_after_half_life(self):
+        self.store.add(0, {'n': 4, 'n_rewards': 2})
+        self.clock.now += 10
+
+        np.testing.assert_allclose(self.store['n'], [4, 2])
+        assert self.store.arm(0) == BetaArm('arm1', 4, 2)
+
+    def test_should_weigh_increments_by_their_age(self):
+        self.store.add_many(np.array([0, 0]), {'n': 1, 'n_rewards': np.array([1.0, 0.0])})
+        self.clock.now += 20
+        self.store.add_many(np.array([0, 1]), {'n': 1, 'n_rewards': 1})
+
+        np.testing.assert_allclose(self.store['n'], [2 + 0.5 + 1, 3])
+        np.testing.assert_allclose(self.store['n_rewards'], [1 + 0.25 + 1, 2])
+
+    def test_should_keep_values_when_rebased(self):
+        self.store.add(0, {'n': 1})
+        self.clock.now += 10 * 100
+        self.store.add(1, {'n': 1})
+
+        assert self.store.reference[0] == self.clock.now
+        np.testing.assert_allclose(self.store['n'], [2 + 2.0 ** -100, 3])
+
+    def test_should_clear_evidence_on_fill(self):
+        self.store.add(0, {'n': 1})
+
+        self.store.fill({'n': 2, 'n_rewards': 1})
+
+        np.testing.assert_array_equal(self.store['n'], [2, 2])
+
+
+class WindowedArmStoreTest(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.store = WindowedArmStore.from_arms(BetaArm,
+                                                [BetaArm('arm1', 2, 1), BetaArm('arm2', 2, 1)],
+                                                window=10, n_buckets=5, clock=self.clock)
+
+    def test_should_count_increments_of_window(self):
+        self.store.add(0, {'n': 1, 'n_rewards': 1})
+        self.clock.now += 4
+        self.store.add_many(np.array([0, 1, 0]), {'n': 1, 'n_rewards': np.array([1.0, 0.0, 0.0])})
+
+        np.testing.assert_array_equal(self.store['n'], [5, 3])
+        np.testing.assert_array_equal(self.store['n_rewards'], [3, 1])
+        assert self.store.arm(0) == BetaArm('arm1', 5, 3)
+
+    def test_should_drop_increments_older_than_window(self):
+        self.store.add(0, {'n': 1})
+        self.clock.now += 5
+        self.store.add(0, {'n': 1})
+        self.clock.now += 6
+
+        np.testing.assert_array_equal(self.store['n'], [3, 2])
+        assert self.store.arm(0) == BetaArm('arm1', 3, 1)
+
+    def test_should_reuse_expired_bucket(self):
+        self.store.add(0, {'n': 1})
+        self.clock.now += 10
+        self.store.add(0, {'n': 1})
+
+        np.testing.assert_array_equal(self.store['n'], [3, 2])
+
+
+class DecayedBanditTest(TestCase):
+
+    def test_should_make_store_from_parameters(self):
+        arms = [BetaArm('arm1', 2, 1)]
+
+        assert type(make_arm_store(BetaArm, arms)).__name__ == 'ArmStore'
+        assert isinstance(make_arm_store(BetaArm, arms, half_life=60), DecayedArmStore)
+        assert isinstance(make_arm_store(BetaArm, arms, window=60), WindowedArmStore)
+        with self.assertRaises(ValueError):
+            make_arm_store(BetaArm, arms, half_life=60, window=60)
+
+    def test_should_react_to_change_of_best_arm(self):
+        bandit = EGreedy('my_bandit',
+                         [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0)],
+                         epsilon=1.0, half_life=60)
+        clock = Clock(bandit.store.reference[0])
+        bandit.store.clock = clock
+        bandit.update_many(['arm1'] * 100, [1.0] * 100)
+        clock.now += 600
+        bandit.update_many(['arm1', 'arm2'] * 10, [0.0, 1.0] * 10)
+
+        assert bandit.choose().arm_id == 'arm2'
+
+    def test_should_build_decayed_bandit_from_bandit_factory(self):
+        instruction = {'bandit_id': 'my_bandit', 'bandit_type': 'beta_thompson',
+                       'arm_ids': ['arm1'], 'parameters': {'window': 3600}}
+
+        bandit: BetaThompsonBandit = BanditFactory.make_bandit(instruction)
+        bandit.update(Feedback('arm1', 1))
+
+        assert isinstance(bandit.store, WindowedArmStore)
+        assert bandit.arms_dict == {'arm1': BetaArm('arm1', 3, 2)}
+        assert BanditFactory.make_instruction(bandit) == instruction
@@ -97,3 +97,76 @@ class EGreedyTest(TestCase):
         assert egreedy.arms_dict == {"arm1": EpsilonGreedyArm("arm1", 1, 0),
                                      "arm2": EpsilonGreedyArm("arm2", 1, 0),
                                      "arm3": EpsilonGreedyArm("arm3", 1, 0)}
+
+    def test_should_exploit_best_mean_among_many_arms(self):
+        arms = [EpsilonGreedyArm('arm' + str(i), n=10, reward_sum=i % 97) for i in range(5000)]
+        egreedy = EGreedy('my_bandit', arms, epsilon=1.0)
+
+        assert egreedy.choose().arm_id == 'arm96'
+
+    def test_should_make_reproducible_decisions_with_seed(self):
+        arms = [EpsilonGreedyArm('arm' + str(i), n=1, reward_sum=0) for i in range(100)]
+
+        first_bandit = EGreedy('my_bandit', arms, epsilon=0.5, seed=42)
+        second_bandit = EGreedy('my_bandit', arms, epsilon=0.5, seed=42)
+
+        assert ([first_bandit.choose().arm_id for _ in range(50)]
+                == [second_bandit.choose().arm_id for _ in range(50)])
+
+    def test_should_choose_many_arms_exploiting_with_eps_1(self):
+        loosing_arm = EpsilonGreedyArm('loosing_arm', n=1, reward_sum=1)
+        winning_arm = EpsilonGreedyArm('winning_arm', n=1, reward_sum=1000.0)
+        egreedy = EGreedy('my_bandit', [loosing_arm, winning_arm], epsilon=1.0)
+
+        assert [arm.arm_id for arm in egreedy.choose_many(20)] == ['winning_arm'] * 20
+
+    def test_should_choose_many_arms_exploring_with_eps_0(self):
+        arms = [EpsilonGreedyArm('arm' + str(i), n=1, reward_sum=i) for i in range(5)]
+        egreedy = EGreedy('my_bandit', arms, epsilon=0.0, seed=3)
+
+        assert {arm.arm_id for arm in egreedy.choose_many(200)} == {arm.arm_id for arm in arms}
+
+    def test_should_choose_distinct_arms(self):
+        arms = [EpsilonGreedyArm('arm' + str(i), n=1, reward_sum=i) for i in range(10)]
+
+        exploiting = EGreedy('my_bandit', arms, epsilon=1.0)
+        exploring = EGreedy('my_bandit', arms, epsilon=0.0, seed=3)
+
+        assert ([arm.arm_id for arm in exploiting.choose_many(3, distinct=True)]
+                == ['arm9', 'arm8', 'arm7'])
+        chosen_arm_ids = [arm.arm_id for arm in exploring.choose_many(20, distinct=True)]
+        assert sorted(chosen_arm_ids) == sorted(arm.arm_id for arm in arms)
+
+    def test_should_update_many_arms(self):
+        arms = [EpsilonGreedyArm(name, n=1, reward_sum=1) for name in ['arm1', 'arm2']]
+        egreedy = EGreedy('my_bandit', arms, epsilon=0.1)
+
+        egreedy.update_many(['arm1', 'arm1', 'arm2'], [2, 3, 4])
+
+        assert egreedy.arms_dict == {'arm1': EpsilonGreedyArm('arm1', 3, 6),
+                                     'arm2': EpsilonGreedyArm('arm2', 2, 5)}
+
+    def test_should_exploit_best_mean_after_updates(self):
+        arms = [EpsilonGreedyArm('arm{}'.format(i), 1, 0) for i in range(100)]
+        egreedy = EGreedy('my_bandit', arms, epsilon=1.0)
+
+        egreedy.update(Feedback('arm42', 1.0))
+        assert egreedy.choose().arm_id == 'arm42'
+
+        egreedy.update_many(['arm7', 'arm42', 'arm7'], [1.0, -1.0, 1.0])
+        assert egreedy.choose().arm_id == 'arm7'
+
+        egreedy.reset()
+        assert egreedy.choose().arm_id == 'arm0'
+
+    def test_should_share_best_arm_index_with_state(self):
+        arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0),
+                EpsilonGreedyArm('arm3', 1, 0)]
+        egreedy = EGreedy('my_bandit', arms, epsilon=1.0)
+        copy = EGreedy('my_bandit', arms, epsilon=1.0)
+        egreedy.update(Feedback('arm3', 1.0))
+
+        for name, array in egreedy.state_arrays().items():
+            copy.state_arrays()[name][...] = array
+
+        assert copy.choose().arm_id == 'arm3'
@@ -15,7 +15,7 @@ class GaussianThompsonBanditTest(TestCase):
 
         chosen_arm = gaussian_bandit.choose()
 
-        assert chosen_arm.arm_id == 'arm1' or chosen_arm.arm_id == 'arm2' or chosen_arm.arm_id == 'arm3'
+        assert chosen_arm.arm_id in ('arm1', 'arm2', 'arm3')
 
     def test_should_update_an_arm_with_feedback(self):
         arm_names = ['arm1', 'arm2']
@@ -81,7 +81,8 @@ class GaussianThompsonBanditTest(TestCase):
             priors={'n': 3, 'reward_sum': 3, 'squared_reward_sum': 4}
         )
 
-        gaussian_thompson: GaussianThompsonBandit = GaussianThompsonBandit.make_from_bandit_config(config)
+        gaussian_thompson: GaussianThompsonBandit = \
+            GaussianThompsonBandit.make_from_bandit_config(config)
 
         assert gaussian_thompson.bandit_id == "test_bandit"
         assert gaussian_thompson.arms_dict == {"arm1": GaussianArm("arm1", 3, 3, 4),
@@ -94,9 +95,52 @@ class GaussianThompsonBanditTest(TestCase):
             arm_ids=["arm1", "arm2", "arm3"]
         )
 
-        gaussian_thompson: GaussianThompsonBandit = GaussianThompsonBandit.make_from_bandit_config(config)
+        gaussian_thompson: GaussianThompsonBandit = \
+            GaussianThompsonBandit.make_from_bandit_config(config)
 
         assert gaussian_thompson.bandit_id == "test_bandit"
         assert gaussian_thompson.arms_dict == {"arm1": GaussianArm("arm1", 2, 2, 2),
                                                "arm2": GaussianArm("arm2", 2, 2, 2),
                                                "arm3": GaussianArm("arm3", 2, 2, 2)}
+
+    def test_should_make_reproducible_decisions_with_seed(self):
+        arms = [GaussianArm('arm' + str(i), 2, 2, 3) for i in range(500)]
+
+        first_bandit = GaussianThompsonBandit('my_bandit', arms, seed=42)
+        second_bandit = GaussianThompsonBandit('my_bandit', arms, seed=42)
+
+        assert ([first_bandit.choose().arm_id for _ in range(50)]
+                == [second_bandit.choose().arm_id for _ in range(50)])
+
+    def test_should_choose_arm_with_constant_rewards(self):
+        arms = [GaussianArm('arm1', 3, 0.3, 0.03), GaussianArm('arm2', 3, -0.3, 0.03)]
+
+        gaussian_bandit = GaussianThompsonBandit('my_bandit', arms)
+
+        assert gaussian_bandit.choose().arm_id == 'arm1'
+
+    def test_should_choose_many_arms(self):
+        winning_arm = GaussianArm("winning_arm", 200, 200, 200)
+        losing_arm = GaussianArm("losing_arm", 200, -200, 200)
+
+        gaussian_bandit = GaussianThompsonBandit('my_bandit', [winning_arm, losing_arm])
+
+        assert [arm.arm_id for arm in gaussian_bandit.choose_many(10)] == ["winning_arm"] * 10
+        assert ([arm.arm_id for arm in gaussian_bandit.choose_many(2, distinct=True)]
+                == ["winning_arm", "losing_arm"])
+
+    def test_should_update_many_arms_like_single_updates(self):
+        arm_names = ['arm1', 'arm2', 'arm3']
+        arm_ids = ['arm2', 'arm1', 'arm2', 'arm3', 'arm2']
+        rewards = [1.5, 2.0, -1.0, 0.5, 3.0]
+
+        batch_bandit = GaussianThompsonBandit('my_bandit',
+                                              [GaussianArm(name, 2, 2, 2) for name in arm_names])
+        single_bandit = GaussianThompsonBandit('my_bandit',
+                                               [GaussianArm(name, 2, 2, 2) for name in arm_names])
+
+        batch_bandit.update_many(arm_ids, rewards)
+        for arm_id, reward in zip(arm_ids, rewards):
+            single_bandit.update(Feedback(arm_id, reward))
+
+        assert batch_bandit.arms_dict == single_bandit.arms_dict
@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.dataclasses import Feedback
+from pulpo.bandits.lin_ucb import LinUCB
+
+
+class LinUCBTest(TestCase):
+
+    def test_should_keep_inverse_and_coefficients_of_ridge_regression(self):
+        rng = np.random.default_rng(0)
+        bandit = LinUCB('my_bandit', ['arm1', 'arm2'], ['a', 'b', 'c'], regularization=2.0)
+        contexts = rng.random((20, 3))
+        rewards = rng.random(20)
+
+        for x, reward in zip(contexts, rewards):
+            bandit.update(Feedback('arm1', reward, context=x))
+
+        covariance = 2.0 * np.eye(3) + contexts.T @ contexts
+        np.testing.assert_allclose(bandit.inverse_covariances[0], np.linalg.inv(covariance))
+        np.testing.assert_allclose(bandit.coefficients[0],
+                                   np.linalg.solve(covariance, contexts.T @ rewards))
+        np.testing.assert_allclose(bandit.inverse_covariances[1], np.eye(3) / 2.0)
+
+    def test_should_update_many_arms_like_single_updates(self):
+        context = {'a': 1.0, 'b': '0.5'}
+        single_bandit = LinUCB('my_bandit', ['arm1', 'arm2'], ['a', 'b'])
+        batch_bandit = LinUCB('my_bandit', ['arm1', 'arm2'], ['a', 'b'])
+        arm_ids, rewards = ['arm1', 'arm2', 'arm1', 'arm1'], [1.0, 0.0, 0.5, 2.0]
+
+        for arm_id, reward in zip(arm_ids, rewards):
+            single_bandit.update(Feedback(arm_id, reward, context=context))
+        batch_bandit.update_many(arm_ids, rewards, context)
+
+        for name, array in single_bandit.state_arrays().items():
+            np.testing.assert_allclose(batch_bandit.state_arrays()[name], array)
+
+    def test_should_choose_best_arm_of_each_context(self):
+        bandit = LinUCB('my_bandit', ['arm1', 'arm2'], ['a', 'b'], alpha=0.1)
+        for _ in range(50):
+            bandit.update_many(['arm1', 'arm2'], [1.0, 0.0], {'a': 1})
+            bandit.update_many(['arm1', 'arm2'], [0.0, 1.0], {'b': 1})
+
+        assert bandit.choose({'a': 1}).arm_id == 'arm1'
+        assert bandit.choose({'b': 1}).arm_id == 'arm2'
+        assert ([arm.arm_id for arm in bandit.choose_many(2, {'b': 1}, distinct=True)]
+                == ['arm2', 'arm1'])
+
+    def test_should_prefer_less_explored_arm(self):
+        bandit = LinUCB('my_bandit', ['arm1', 'arm2'], ['a'])
+        bandit.update_many(['arm1'] * 10, [0.5] * 10, {'a': 1})
+        bandit.update_many(['arm2'], [0.5], {'a': 1})
+
+        assert bandit.choose({'a': 1}).arm_id == 'arm2'
+
+    def test_should_reset_to_prior(self):
+        bandit = LinUCB('my_bandit', ['arm1'], ['a', 'b'], regularization=4.0)
+        bandit.update(Feedback('arm1', 1.0, context={'a': 1}))
+
+        bandit.reset()
+
+        np.testing.assert_allclose(bandit.inverse_covariances[0], np.eye(2) / 4.0)
+        assert not bandit.coefficients.any()
+
+    def test_should_require_features_and_a_context(self):
+        with self.assertRaises(ValueError):
+            LinUCB('my_bandit', ['arm1'], [])
+        with self.assertRaises(ValueError):
+            BanditFactory.make_bandit({'bandit_id': 'my_bandit', 'bandit_type': 'lin_ucb',
+                                       'arm_ids': ['arm1']})
+
+        bandit = LinUCB('my_bandit', ['arm1'], ['a', 'b'])
+        with self.assertRaises(ValueError):
+            bandit.choose()
+        with self.assertRaises(ValueError):
+            bandit.update(Feedback('arm1', 1.0))
+        with self.assertRaises(ValueError):
+            bandit.choose([1.0])
+        with self.assertRaises(ValueError):
+            bandit.check_feedback(Feedback('arm1', 1.0))
+        with self.assertRaises(KeyError):
+            bandit.check_feedback(Feedback('unknown', 1.0, context={'a': 1}))
+
+    def test_should_build_from_bandit_factory(self):
+        instruction = {'bandit_id': 'my_bandit', 'bandit_type': 'lin_ucb',
+                       'arm_ids': ['arm1', 'arm2'],
+                       'parameters': {'features': ['a', 'b'], 'alpha': 0.5, 'regularization': 2.0}}
+
+        bandit = BanditFactory.make_bandit(instruction)
+
+        assert isinstance(bandit, LinUCB)
+        assert bandit.features == ['a', 'b']
+        assert bandit.alpha == 0.5
+        assert BanditFactory.make_instruction(bandit) == instruction
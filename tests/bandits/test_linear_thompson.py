@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from pulpo.bandits.linear_thompson import LinearThompsonBandit
+
+
+class LinearThompsonBanditTest(TestCase):
+
+    def test_should_choose_best_arm_of_each_context(self):
+        bandit = LinearThompsonBandit('my_bandit', ['arm1', 'arm2'], ['a', 'b'], alpha=0.1, seed=1)
+        for _ in range(100):
+            bandit.update_many(['arm1', 'arm2'], [1.0, 0.0], {'a': 1})
+            bandit.update_many(['arm1', 'arm2'], [0.0, 1.0], {'b': 1})
+
+        assert {arm.arm_id for arm in bandit.choose_many(20, {'a': 1})} == {'arm1'}
+        assert {arm.arm_id for arm in bandit.choose_many(20, {'b': 1})} == {'arm2'}
+
+    def test_should_explore_arms_without_feedback(self):
+        bandit = LinearThompsonBandit('my_bandit', ['arm1', 'arm2', 'arm3'], ['a'], seed=1)
+
+        chosen = {arm.arm_id for arm in bandit.choose_many(100, {'a': 1})}
+
+        assert chosen == {'arm1', 'arm2', 'arm3'}
+
+    def test_should_repeat_decisions_with_same_seed(self):
+        bandits = [LinearThompsonBandit('my_bandit', ['arm1', 'arm2', 'arm3'], ['a'],
+                                        seed=7) for _ in range(2)]
+
+        decisions = [[bandit.choose({'a': 1}).arm_id for _ in range(10)] for bandit in bandits]
+
+        assert decisions[0] == decisions[1]
+
+    def test_should_choose_distinct_arms(self):
+        bandit = LinearThompsonBandit('my_bandit', ['arm1', 'arm2', 'arm3'], ['a'], seed=1)
+
+        arms = bandit.choose_many(3, {'a': 1}, distinct=True)
+
+        assert sorted(arm.arm_id for arm in arms) == ['arm1', 'arm2', 'arm3']
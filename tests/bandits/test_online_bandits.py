@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from pulpo.bandits.dataclasses import Arm, Feedback
+from pulpo.bandits.online_bandits import OnlineBandit
+
+
+class UniformBandit(OnlineBandit):
+    """
+    Bandit without a vectorized `choose_many`, choosing its arms uniformly.
+    """
+
+    def __init__(self, arm_ids, seed=None):
+        super().__init__('uniform', seed)
+        self.arm_ids = arm_ids
+
+    @classmethod
+    def make_from_bandit_config(cls, config):
+        return cls(config.arm_ids)
+
+    def reset(self):
+        pass
+
+    def choose(self, context=None) -> Arm:
+        return Arm(self.arm_ids[int(self.rng.integers(len(self.arm_ids)))])
+
+    def update(self, feedback: Feedback):
+        pass
+
+
+class OnlineBanditTest(TestCase):
+
+    def test_should_choose_distinct_arms_with_repeated_decisions(self):
+        bandit = UniformBandit(['arm1', 'arm2', 'arm3', 'arm4'], seed=1)
+
+        arm_ids = [arm.arm_id for arm in bandit.choose_many(3, distinct=True)]
+
+        assert len(arm_ids) == 3 and len(set(arm_ids)) == 3
+        assert (sorted(arm.arm_id for arm in bandit.choose_many(10, distinct=True))
+                == ['arm1', 'arm2', 'arm3', 'arm4'])
+        assert len(bandit.choose_many(5)) == 5
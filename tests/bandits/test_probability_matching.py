@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.dataclasses import BanditConfig, EpsilonGreedyArm, Feedback
+from pulpo.bandits.probability_matching import ProbabilityMatchingBandit
+
+
+class ProbabilityMatchingBanditTest(TestCase):
+
+    def test_should_match_probabilities_to_mean_rewards(self):
+        arms = [EpsilonGreedyArm('arm1', 10, 1), EpsilonGreedyArm('arm2', 10, 3),
+                EpsilonGreedyArm('arm3', 10, -2)]
+        bandit = ProbabilityMatchingBandit('my_bandit', arms, min_probability=0.1, seed=1)
+
+        arm_ids = [arm.arm_id for arm in bandit.choose_many(50000)]
+
+        frequencies = [arm_ids.count(arm_id) / len(arm_ids) for arm_id in ['arm1', 'arm2', 'arm3']]
+        np.testing.assert_allclose(frequencies, [0.1 + 0.7 * 0.25, 0.1 + 0.7 * 0.75, 0.1],
+                                   atol=0.01)
+
+    def test_should_choose_uniformly_without_positive_mean(self):
+        arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0)]
+        bandit = ProbabilityMatchingBandit('my_bandit', arms, seed=1)
+
+        np.testing.assert_allclose(bandit.table.distribution(), [0.5, 0.5])
+
+    def test_should_rebuild_table_after_first_reward(self):
+        arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0)]
+        bandit = ProbabilityMatchingBandit('my_bandit', arms, min_probability=0.0, seed=1)
+
+        bandit.update(Feedback('arm2', 1))
+
+        assert {bandit.choose().arm_id for _ in range(100)} == {'arm2'}
+
+    def test_should_reject_min_probability_of_uniform_choice(self):
+        arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0)]
+
+        with self.assertRaises(ValueError):
+            ProbabilityMatchingBandit('my_bandit', arms, min_probability=0.5)
+
+    def test_should_be_constructed_from_config_with_default_fallbacks(self):
+        config = BanditConfig('my_bandit', ['arm1', 'arm2'])
+        bandit = ProbabilityMatchingBandit.make_from_bandit_config(config)
+
+        assert bandit.arms_dict == {'arm1': EpsilonGreedyArm('arm1', 1, 0),
+                                    'arm2': EpsilonGreedyArm('arm2', 1, 0)}
+        assert bandit.min_probability == 0.05
+        assert bandit.rebuild_tolerance == 0.05
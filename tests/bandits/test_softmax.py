@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.contextual import ContextualBandit
+from pulpo.bandits.dataclasses import BanditConfig, EpsilonGreedyArm, Feedback
+from pulpo.bandits.softmax import SoftmaxBandit
+
+
+def make_bandit(**kwargs):
+    arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 0),
+            EpsilonGreedyArm('arm3', 1, 0)]
+    return SoftmaxBandit('my_bandit', arms, seed=1, **kwargs)
+
+
+class SoftmaxBanditTest(TestCase):
+
+    def test_should_choose_with_softmax_probabilities(self):
+        arms = [EpsilonGreedyArm('arm1', 10, 1), EpsilonGreedyArm('arm2', 10, 2),
+                EpsilonGreedyArm('arm3', 10, 5)]
+        bandit = SoftmaxBandit('my_bandit', arms, temperature=0.2, seed=1)
+
+        arm_ids = [arm.arm_id for arm in bandit.choose_many(50000)]
+
+        expected = np.exp(np.array([0.1, 0.2, 0.5]) / 0.2)
+        frequencies = [arm_ids.count(arm_id) / len(arm_ids) for arm_id in ['arm1', 'arm2', 'arm3']]
+        np.testing.assert_allclose(frequencies, expected / expected.sum(), atol=0.01)
+
+    def test_should_rebuild_table_on_update_once_drift_of_an_arm_exceeds_tolerance(self):
+        bandit = make_bandit(temperature=1.0, rebuild_tolerance=0.3)
+        table = bandit.table.probabilities.copy()
+
+        bandit.update(Feedback('arm1', 0.4))
+        bandit.update_many(['arm2', 'arm2'], [0.2, 0.2])
+        np.testing.assert_array_equal(bandit.table.probabilities, table)
+        assert bandit.drift_totals[1] == 0.2
+
+        bandit.update(Feedback('arm1', 0.8))
+        expected = bandit.probabilities(np.array([0.4, 0.4 / 3, 0]))
+        np.testing.assert_allclose(bandit.table.distribution(), expected / np.sum(expected))
+        assert bandit.drift_totals[1] == 0
+
+    def test_should_prefer_best_arm_with_low_temperature(self):
+        bandit = make_bandit(temperature=0.01, rebuild_tolerance=0.0)
+        bandit.update_many(['arm2'] * 10, [1] * 10)
+
+        assert {bandit.choose().arm_id for _ in range(100)} == {'arm2'}
+
+    def test_should_choose_distinct_arms(self):
+        bandit = make_bandit()
+
+        assert (sorted(arm.arm_id for arm in bandit.choose_many(5, distinct=True))
+                == ['arm1', 'arm2', 'arm3'])
+
+    def test_should_compute_distribution_with_decayed_statistics(self):
+        bandit = make_bandit(temperature=0.01, half_life=3600)
+        bandit.update(Feedback('arm3', 1))
+
+        assert bandit.table is None
+        assert bandit.choose().arm_id == 'arm3'
+        assert [arm.arm_id for arm in bandit.choose_many(3)] == ['arm3'] * 3
+
+    def test_should_be_constructed_from_config(self):
+        config = BanditConfig('my_bandit', ['arm1', 'arm2'], priors={'n': 2, 'reward_sum': 1},
+                              parameters={'temperature': 0.5, 'rebuild_tolerance': 0.1})
+
+        bandit = SoftmaxBandit.make_from_bandit_config(config)
+
+        assert bandit.arms_dict == {'arm1': EpsilonGreedyArm('arm1', 2, 1),
+                                    'arm2': EpsilonGreedyArm('arm2', 2, 1)}
+        assert bandit.to_bandit_config() == BanditConfig('my_bandit', ['arm1', 'arm2'],
+                                                         parameters={'temperature': 0.5,
+                                                                     'rebuild_tolerance': 0.1})
+
+    def test_should_keep_table_per_context(self):
+        bandit = ContextualBandit(make_bandit(temperature=0.01, rebuild_tolerance=0.0))
+        bandit.update(Feedback('arm1', 1, context={'country': 'gr'}))
+        bandit.update(Feedback('arm3', 1, context={'country': 'nl'}))
+
+        assert bandit.choose({'country': 'gr'}).arm_id == 'arm1'
+        assert bandit.choose({'country': 'nl'}).arm_id == 'arm3'
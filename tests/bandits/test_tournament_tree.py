@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.tournament_tree import TournamentTree
+
+
+class TournamentTreeTest(TestCase):
+
+    def test_should_find_highest_value_with_ties_to_lowest_position(self):
+        values = np.array([1.0, 3.0, 2.0, 3.0, 0.5])
+        tree = TournamentTree(len(values))
+
+        tree.build(values.__getitem__)
+
+        assert tree.size == 8
+        assert tree.argmax() == 1
+
+    def test_should_follow_updated_values(self):
+        rng = np.random.default_rng(0)
+        values = rng.random(1000)
+        tree = TournamentTree(len(values))
+        tree.build(values.__getitem__)
+
+        for _ in range(500):
+            position = int(rng.integers(len(values)))
+            values[position] = rng.random()
+            tree.update(position, values.__getitem__)
+            assert tree.argmax() == np.argmax(values)
+
+    def test_should_follow_batches_of_updated_values(self):
+        rng = np.random.default_rng(0)
+        values = rng.integers(0, 20, size=777).astype(np.float64)
+        tree = TournamentTree(len(values))
+        tree.build(values.__getitem__)
+
+        for _ in range(100):
+            positions = rng.integers(len(values), size=10)
+            values[positions] = rng.integers(0, 20, size=10)
+            tree.update_many(positions, values.__getitem__)
+            assert tree.argmax() == np.argmax(values)
+
+    def test_should_handle_single_item(self):
+        tree = TournamentTree(1)
+
+        tree.build(np.array([5.0]).__getitem__)
+
+        assert tree.argmax() == 0
@@ -0,0 +1,121 @@
+import math
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.dataclasses import BanditConfig, Feedback, GaussianArm
+from pulpo.bandits.ucb import (UCB1, UCBV, KLUCB, BayesUCB, bernoulli_kl, kl_upper_bounds,
+                               normal_quantile)
+
+
+def make_arms(statistics):
+    return [GaussianArm('arm' + str(i), n, reward_sum, squared_reward_sum)
+            for i, (n, reward_sum, squared_reward_sum) in enumerate(statistics)]
+
+
+class KLUpperBoundsTest(TestCase):
+
+    def test_should_match_bisection(self):
+        rng = np.random.default_rng(0)
+        means = np.concatenate([rng.random(1000), [0.0, 1.0, 0.5, 1 - 1e-9]])
+        levels = np.concatenate([rng.exponential(0.1, 1000), [1.0, 1.0, 0.0, 100.0]])
+
+        bounds = kl_upper_bounds(means, levels)
+
+        low, high = means.copy(), np.ones_like(means)
+        for _ in range(100):
+            middle = (low + high) / 2
+            below = bernoulli_kl(means, middle) <= levels
+            low, high = np.where(below, middle, low), np.where(below, high, middle)
+        np.testing.assert_allclose(bounds, low, atol=1e-9)
+        assert bounds[-2] == 0.5
+
+
+class UCBTest(TestCase):
+
+    def test_should_choose_arms_never_chosen_first(self):
+        bandit = UCB1('my_bandit', make_arms([(10, 9, 9), (0, 0, 0), (0, 0, 0)]))
+
+        assert bandit.choose().arm_id == 'arm1'
+        bandit.update(Feedback('arm1', 0))
+        assert bandit.choose().arm_id == 'arm2'
+
+    def test_should_compute_ucb1_index(self):
+        bandit = UCB1('my_bandit', make_arms([(10, 5, 5), (40, 24, 24)]))
+
+        log_t = math.log(50)
+        np.testing.assert_allclose(bandit.indices(),
+                                   [0.5 + math.sqrt(2 * log_t / 10),
+                                    0.6 + math.sqrt(2 * log_t / 40)])
+        assert bandit.choose().arm_id == 'arm0'
+
+    def test_should_explore_steady_arms_less_with_ucb_v(self):
+        # Same means and counts, but the rewards of arm1 never vary
+        bandit = UCBV('my_bandit', make_arms([(20, 10, 10), (20, 10, 5)]))
+
+        indices = bandit.indices()
+
+        assert indices[0] > indices[1]
+        np.testing.assert_allclose(indices[1], 0.5 + 3 * 1.2 * math.log(40) / 20)
+
+    def test_should_compute_kl_ucb_index(self):
+        bandit = KLUCB('my_bandit', make_arms([(10, 5, 5), (100, 50, 50)]))
+
+        indices = bandit.indices()
+
+        np.testing.assert_allclose(10 * bernoulli_kl(np.array(0.5), indices[0]), math.log(110),
+                                   rtol=1e-9)
+        assert 0.5 < indices[1] < indices[0] < 1
+
+    def test_should_invert_normal_cdf(self):
+        for x in [-8.5, -3.0, -1.96, -0.5, 0.0, 0.1, 1.0, 2.5]:
+            p = 0.5 * math.erfc(-x / math.sqrt(2))
+            assert math.isclose(normal_quantile(p), x, rel_tol=1e-12, abs_tol=1e-12)
+        assert math.isclose(normal_quantile(0.975), 1.959963984540054, rel_tol=1e-14)
+        with self.assertRaises(ValueError):
+            normal_quantile(1.0)
+
+    def test_should_compute_bayes_ucb_index_without_infinite_indices(self):
+        bandit = BayesUCB('my_bandit', make_arms([(0, 0, 0), (8, 6, 6)]))
+
+        indices = bandit.indices()
+
+        assert np.all(np.isfinite(indices))
+        mean = 7 / 10
+        # Quantile of order 1 - 1 / 8 of the standard normal
+        np.testing.assert_allclose(indices[1],
+                                   mean + 1.1503493803760079 * math.sqrt(mean * (1 - mean) / 11),
+                                   rtol=1e-6)
+
+    def test_should_find_best_arm(self):
+        rng = np.random.default_rng(0)
+        probabilities = [0.2, 0.5, 0.7]
+        for bandit_class in [UCB1, UCBV, KLUCB, BayesUCB]:
+            bandit = bandit_class('my_bandit', make_arms([(0, 0, 0)] * 3))
+            for _ in range(2000):
+                arm = bandit.choose()
+                bandit.update(Feedback(arm.arm_id,
+                                       float(rng.random() < probabilities[int(arm.arm_id[3:])])))
+
+            assert max(bandit.arms_dict.values(), key=lambda arm: arm.n).arm_id == 'arm2'
+
+    def test_should_choose_distinct_arms_by_index(self):
+        bandit = UCB1('my_bandit', make_arms([(10, 1, 1), (10, 9, 9), (10, 5, 5)]))
+
+        assert [arm.arm_id for arm in bandit.choose_many(2, distinct=True)] == ['arm1', 'arm2']
+        assert [arm.arm_id for arm in bandit.choose_many(3)] == ['arm1'] * 3
+
+    def test_should_be_made_by_factory(self):
+        instruction = {'bandit_id': 'my_bandit', 'bandit_type': 'kl_ucb',
+                       'arm_ids': ['arm1', 'arm2'],
+                       'priors': {'n': 1, 'reward_sum': 1}, 'parameters': {'alpha': 3}}
+
+        bandit = BanditFactory.make_bandit(instruction)
+
+        assert isinstance(bandit, KLUCB)
+        assert bandit.alpha == 3
+        assert bandit.arms_dict['arm1'] == GaussianArm('arm1', 1, 1, 0)
+        assert bandit.to_bandit_config() == BanditConfig('my_bandit', ['arm1', 'arm2'],
+                                                         parameters={'alpha': 3})
+        assert UCB1.make_from_bandit_config(BanditConfig('my_bandit', ['arm1'])).alpha == 2.0
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+
+from pulpo.async_pulpo import AsyncPulpo
+from pulpo.bandits.contextual import ContextualBandit
+from pulpo.bandits.dataclasses import EpsilonGreedyArm
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.feedback_log import FeedbackLog, LogReader
+from pulpo.pulpo import Pulpo
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class AsyncPulpoTest(TestCase):
+
+    def setUp(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        self.pulpo = Pulpo([EGreedy("bandit1", arms, epsilon=0.9)])
+
+    def test_should_choose_an_arm(self):
+        async def scenario():
+            async with AsyncPulpo(self.pulpo) as async_pulpo:
+                return (await async_pulpo.choose("bandit1"),
+                        await async_pulpo.choose_many("bandit1", 3))
+
+        arm_id, arm_ids = run(scenario())
+
+        assert arm_id in ["arm1", "arm2"]
+        assert len(arm_ids) == 3
+
+    def test_should_apply_feedback_in_batches(self):
+        batches = []
+        update_events = self.pulpo.update_events
+        self.pulpo.update_events = (lambda events: batches.append(len(events))
+                                    or update_events(events))
+
+        async def scenario():
+            async with AsyncPulpo(self.pulpo, flush_interval=10, flush_size=4) as async_pulpo:
+                for _ in range(10):
+                    await async_pulpo.update("bandit1", "arm1", 1)
+
+        run(scenario())
+
+        assert batches == [4, 4, 2]
+        assert self.pulpo.bandits["bandit1"].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 11, 10)
+
+    def test_should_drain_feedback_on_close_without_waiting_for_interval(self):
+        async def scenario():
+            async with AsyncPulpo(self.pulpo, flush_interval=60) as async_pulpo:
+                await async_pulpo.update("bandit1", "arm2", 3)
+
+        run(asyncio.wait_for(scenario(), 5))
+
+        assert self.pulpo.bandits["bandit1"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 2, 3)
+
+    def test_should_apply_feedback_after_flush_interval(self):
+        async def scenario():
+            async with AsyncPulpo(self.pulpo, flush_interval=0.01) as async_pulpo:
+                await async_pulpo.update("bandit1", "arm2", 3)
+                await asyncio.sleep(0.1)
+                return self.pulpo.bandits["bandit1"].arms_dict["arm2"]
+
+        assert run(scenario()) == EpsilonGreedyArm("arm2", 2, 3)
+
+    def test_should_apply_backpressure_when_queue_is_full(self):
+        async def scenario():
+            async_pulpo = AsyncPulpo(self.pulpo, flush_interval=10, flush_size=100, max_pending=2)
+            await async_pulpo.start()
+            for _ in range(3):
+                await async_pulpo.update("bandit1", "arm1", 1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(async_pulpo.update("bandit1", "arm1", 1), 0.05)
+            await async_pulpo.close()
+
+        run(scenario())
+
+        assert self.pulpo.bandits["bandit1"].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 4, 3)
+
+    def test_should_keep_serving_after_a_failed_batch(self):
+        async def scenario():
+            async with AsyncPulpo(self.pulpo, flush_interval=0) as async_pulpo:
+                await async_pulpo.update("bandit1", "unknown_arm", 1)
+                await async_pulpo.flush()
+                await async_pulpo.update("bandit1", "arm2", 1)
+
+        with self.assertLogs("pulpo.async_pulpo"):
+            run(scenario())
+
+        assert self.pulpo.bandits["bandit1"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 2, 1)
+
+    def test_should_refuse_feedback_before_start(self):
+        with self.assertRaises(RuntimeError):
+            run(AsyncPulpo(self.pulpo).update("bandit1", "arm1", 1))
+
+    def test_should_apply_reward_of_decision_in_its_context(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = Pulpo([ContextualBandit(EGreedy("bandit1", arms, epsilon=1.0))])
+
+        async def scenario():
+            async with AsyncPulpo(pulpo, flush_interval=10) as async_pulpo:
+                arm_id, decision_id = await async_pulpo.choose("bandit1", {"country": "gr"},
+                                                               track=True)
+                await async_pulpo.update_decision(decision_id, 1)
+                return arm_id
+
+        arm_id = run(scenario())
+
+        bandit = pulpo.bandits["bandit1"]
+        assert (bandit.context_bandit({"country": "gr"}).arms_dict[arm_id]
+                == EpsilonGreedyArm(arm_id, 2, 1))
+        assert bandit.n_contexts == 1
+
+    def test_should_apply_contextual_feedback(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = Pulpo([ContextualBandit(EGreedy("bandit1", arms, epsilon=1.0))])
+
+        async def scenario():
+            async with AsyncPulpo(pulpo, flush_interval=10) as async_pulpo:
+                await async_pulpo.update("bandit1", "arm1", 1, context={"country": "gr"})
+                await async_pulpo.update("bandit1", "arm2", 1, context={"country": "nl"})
+
+        run(scenario())
+
+        assert pulpo.choose("bandit1", {"country": "gr"}) == "arm1"
+        assert pulpo.choose("bandit1", {"country": "nl"}) == "arm2"
+
+    def test_should_log_payload_of_feedback(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "feedback.log")
+            self.pulpo.feedback_log = FeedbackLog(path)
+
+            async def scenario():
+                async with AsyncPulpo(self.pulpo, flush_interval=10) as async_pulpo:
+                    arm_id, decision_id = await async_pulpo.choose("bandit1", track=True)
+                    await async_pulpo.update("bandit1", "arm1", 1, "payload1")
+                    await async_pulpo.update("bandit1", "arm2", 0)
+                    await async_pulpo.update_decision(decision_id, 1, "payload2")
+
+            run(scenario())
+            self.pulpo.feedback_log.close()
+
+            payloads = [payload for block in LogReader(path).blocks()
+                        for payload in block.payloads()]
+
+        assert payloads == ["payload1", None, "payload2"]
+
+    def test_should_keep_decision_pending_until_its_reward_is_applied(self):
+        pulpo = Pulpo([EGreedy("bandit1", [EpsilonGreedyArm("arm1", 1, 0)], epsilon=0.9)])
+        update_events = pulpo.update_events
+
+        async def scenario():
+            async with AsyncPulpo(pulpo, flush_interval=10) as async_pulpo:
+                _, decision_id = await async_pulpo.choose("bandit1", track=True)
+                pulpo.update_events = lambda events: [(0, OSError("log is full"))]
+                await async_pulpo.update_decision(decision_id, 1)
+                with self.assertRaises(KeyError):
+                    await async_pulpo.update_decision(decision_id, 1)
+                await async_pulpo.flush()
+                pending_after_failure = pulpo.decisions.get(decision_id)
+
+                pulpo.update_events = update_events
+                await async_pulpo.update_decision(decision_id, 1)
+                await async_pulpo.flush()
+                with self.assertRaises(KeyError):
+                    await async_pulpo.update_decision(decision_id, 1)
+                return pending_after_failure
+
+        with self.assertLogs("pulpo.async_pulpo"):
+            pending_after_failure = run(scenario())
+
+        assert pending_after_failure == ("bandit1", "arm1", None)
+        assert pulpo.bandits["bandit1"].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 2, 1)
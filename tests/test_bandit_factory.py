@@ -3,8 +3,10 @@ from typing import List
 from unittest import TestCase
 
 from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.contextual import ContextualBandit
 from pulpo.bandits.dataclasses import EpsilonGreedyArm
 from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.bandits.linear import LinearBandit
 from pulpo.bandits.online_bandits import OnlineBandit
 
 
@@ -61,15 +63,46 @@ class BanditFactoryTest(TestCase):
     def test_should_instantiate_all_types_of_bandit_with_default_values(self):
         bandit_types: List[str] = list(BanditFactory.MAPPING.keys())
 
-        json_string = '[' + ", ".join([BanditFactoryTest._get_default_config(type) for type in bandit_types]) + ']'
+        configs = [BanditFactoryTest._get_default_config(type) for type in bandit_types]
+        json_string = '[' + ", ".join(configs) + ']'
 
         factory = BanditFactory()
 
         assert len(factory.make_bandits_list(json_string)) == len(BanditFactory.MAPPING)
 
+    def test_should_keep_the_seed_in_the_instruction_of_every_type_of_bandit(self):
+        for bandit_type in BanditFactory.MAPPING:
+            instruction = json.loads(BanditFactoryTest._get_default_config(bandit_type))
+            instruction["parameters"] = dict(instruction.get("parameters", {}), seed=7,
+                                             max_contexts=4)
+
+            bandit = BanditFactory.make_bandit(instruction)
+            rebuilt = BanditFactory.make_bandit(BanditFactory.make_instruction(bandit))
+
+            assert BanditFactory.make_instruction(rebuilt)["parameters"]["seed"] == 7, bandit_type
+            assert rebuilt.bandit.seed == 7, bandit_type
+
+    def test_should_build_contextual_bandit_when_max_contexts_is_given(self):
+        instruction = {"bandit_id": "test_bandit", "bandit_type": "epsilon_greedy",
+                       "arm_ids": ["arm1", "arm2"], "parameters": {"max_contexts": 100}}
+
+        bandit = BanditFactory.make_bandit(instruction)
+
+        assert isinstance(bandit, ContextualBandit)
+        assert isinstance(bandit.bandit, EGreedy)
+        assert bandit.max_contexts == 100
+        assert BanditFactory.make_instruction(bandit) == {"bandit_id": "test_bandit",
+                                                          "bandit_type": "epsilon_greedy",
+                                                          "arm_ids": ["arm1", "arm2"],
+                                                          "parameters": {"epsilon": 0.9,
+                                                                         "max_contexts": 100}}
+
     @staticmethod
     def _get_default_config(bandit_type: str):
         default_values = {"bandit_id": "test_bandit_" + bandit_type, "bandit_type": bandit_type,
                           "arm_ids": ["arm1", "arm2", "arm3"]}
+        if issubclass(BanditFactory.MAPPING[bandit_type], LinearBandit):
+            # Linear bandits have no default features
+            default_values["parameters"] = {"features": ["a"]}
 
         return json.dumps(default_values)
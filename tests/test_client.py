@@ -0,0 +1,164 @@
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+from unittest import TestCase
+
+from pulpo.bandits.dataclasses import EpsilonGreedyArm
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.client import PulpoClient, PulpoServerError
+from pulpo.feedback_log import FeedbackLog, LogReader
+from pulpo.pulpo import Pulpo
+from pulpo.server import PulpoServer
+
+
+class LocalServer:
+    """
+    Runs a PulpoServer on a free local port in a background event loop.
+    """
+
+    def __init__(self, pulpo: Pulpo, port: int = 0):
+        self.server = PulpoServer(pulpo, port=port)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        return self
+
+    @property
+    def port(self) -> int:
+        return self.server.port
+
+    def drop_connections(self):
+        def abort():
+            for writer in list(self.server._connections):
+                writer.transport.abort()
+        self.loop.call_soon_threadsafe(abort)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def free_port() -> int:
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        return listener.getsockname()[1]
+
+
+class PulpoClientTest(TestCase):
+
+    def setUp(self):
+        self.pulpo = Pulpo([EGreedy("bandit",
+                                    [EpsilonGreedyArm(arm_id, 1, 0) for arm_id in ["arm1", "arm2"]],
+                                    epsilon=1.0)])
+
+    def arm(self, arm_id: str) -> EpsilonGreedyArm:
+        return self.pulpo.bandits["bandit"].arms_dict[arm_id]
+
+    def test_should_choose_and_send_buffered_feedback_in_batches(self):
+        with LocalServer(self.pulpo) as server:
+            with PulpoClient(port=server.port, batch_size=3, flush_interval=None) as client:
+                client.update("bandit", "arm2", 1.0)
+                client.update("bandit", "arm2", 1.0, context={"country": "gr"})
+                assert self.arm("arm2").n == 1
+
+                client.update("bandit", "arm1", 0.0)
+                assert self.arm("arm2").n == 3
+                assert self.arm("arm1").n == 2
+
+                assert client.choose("bandit") == "arm2"
+                assert client.choose_batch(["bandit", "bandit"]) == ["arm2", "arm2"]
+                client.update_many("bandit", ["arm1"], [1.0])
+            assert self.arm("arm1").n == 3
+
+    def test_should_send_payloads_of_feedback(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "feedback.log")
+            self.pulpo.feedback_log = FeedbackLog(path)
+            with LocalServer(self.pulpo) as server:
+                with PulpoClient(port=server.port, flush_interval=None) as client:
+                    client.update("bandit", "arm1", 1.0, "payload1")
+                    client.update("bandit", "arm2", 1.0, "payload2", context={"country": "gr"})
+                    client.update_many("bandit", ["arm1", "arm2"], [0.0, 1.0],
+                                       payloads=[None, "payload3"])
+            self.pulpo.feedback_log.close()
+
+            payloads = [payload for block in LogReader(path).blocks()
+                        for payload in block.payloads()]
+
+        assert sorted(payloads, key=str) == [None, "payload1", "payload2", "payload3"]
+
+    def test_should_flush_feedback_periodically(self):
+        with LocalServer(self.pulpo) as server:
+            with PulpoClient(port=server.port, flush_interval=0.01) as client:
+                client.update("bandit", "arm2", 1.0)
+                for _ in range(100):
+                    if self.arm("arm2").n == 2:
+                        break
+                    threading.Event().wait(0.01)
+                assert self.arm("arm2").n == 2
+
+    def test_should_share_connection_pool_between_threads(self):
+        with LocalServer(self.pulpo) as server:
+            with PulpoClient(port=server.port, pool_size=2, flush_interval=None) as client:
+                choices = []
+                threads = [threading.Thread(
+                    target=lambda: choices.extend(client.choose("bandit") for _ in range(20)))
+                    for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                assert len(choices) == 80
+                assert client._pool._idle.qsize() <= 2
+
+    def test_should_raise_server_errors(self):
+        with LocalServer(self.pulpo) as server:
+            with PulpoClient(port=server.port, flush_interval=None) as client:
+                with self.assertRaises(KeyError):
+                    client.choose("unknown")
+                client.update("bandit", "unknown", 1.0)
+                with self.assertRaises(PulpoServerError):
+                    client.flush()
+                assert client.choose("bandit") in ["arm1", "arm2"]
+
+    def test_should_reconnect_after_server_closed_idle_connection(self):
+        with LocalServer(self.pulpo) as server:
+            with PulpoClient(port=server.port, flush_interval=None) as client:
+                client.choose("bandit")
+                server.drop_connections()
+                threading.Event().wait(0.05)
+                assert client.choose("bandit") in ["arm1", "arm2"]
+
+    def test_should_keep_feedback_until_the_server_acknowledges_it(self):
+        port = free_port()
+        with PulpoClient(port=port, flush_interval=None) as client:
+            client.update("bandit", "arm2", 1.0)
+            with self.assertRaises(OSError):
+                client.flush()
+            client.update("bandit", "arm1", 1.0, context={"country": "gr"})
+            with self.assertRaises(OSError):
+                client.flush()
+
+            with LocalServer(self.pulpo, port):
+                client.flush()
+                assert self.arm("arm2").n == 2
+                assert self.arm("arm1").n == 2
+                assert client.n_dropped == 0
+
+    def test_should_apply_a_batch_sent_again_once(self):
+        with LocalServer(self.pulpo) as server:
+            with PulpoClient(port=server.port, flush_interval=None) as client:
+                events = [("bandit", "arm2", 1.0, None, None),
+                          ("bandit", "unknown", 1.0, None, None)]
+                first = client._send_events("batch", events)
+                # As when the response of the first request was lost
+                assert client._send_events("batch", events) == first
+                assert [failure["index"] for failure in first] == [1]
+                assert self.arm("arm2").n == 2
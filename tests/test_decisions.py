@@ -0,0 +1,152 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BetaArm
+from pulpo.bandits.lin_ucb import LinUCB
+from pulpo.decisions import DecisionTable
+from pulpo.pulpo import Pulpo
+
+
+class Clock:
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class DecisionTableTest(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.decisions = DecisionTable(ttl=10, capacity=4, clock=self.clock)
+
+    def test_should_pop_decision_once(self):
+        decision_id = self.decisions.add("bandit", "arm1", {"country": "gr"})
+
+        assert self.decisions.pop(decision_id) == ("bandit", "arm1", {"country": "gr"})
+        with self.assertRaises(KeyError):
+            self.decisions.pop(decision_id)
+        with self.assertRaises(KeyError):
+            self.decisions.pop(decision_id + 1)
+
+    def test_should_expire_decisions_older_than_ttl(self):
+        self.decisions.add("bandit1", "arm1")
+        rewarded = self.decisions.add("bandit1", "arm2")
+        self.decisions.add("bandit2", "arm1")
+        self.clock.now = 5
+        kept = self.decisions.add("bandit1", "arm1")
+        self.decisions.pop(rewarded)
+        self.clock.now = 12
+
+        expired = self.decisions.expire()
+
+        assert sorted(expired) == [("bandit1", None, ["arm1"]), ("bandit2", None, ["arm1"])]
+        assert len(self.decisions) == 1
+        assert self.decisions.pop(kept) == ("bandit1", "arm1", None)
+
+    def test_should_expire_oldest_decisions_to_make_room(self):
+        first = self.decisions.add("bandit", "arm1")
+        for _ in range(3):
+            self.decisions.add("bandit", "arm2")
+
+        with self.assertRaises(OverflowError):
+            self.decisions.add("bandit", "arm3")
+        assert self.decisions.expire(reserve=1) == [("bandit", None, ["arm1"])]
+        decision_id = self.decisions.add("bandit", "arm3")
+
+        assert decision_id % 4 == first % 4
+        with self.assertRaises(KeyError):
+            self.decisions.pop(first)
+        assert self.decisions.pop(decision_id) == ("bandit", "arm3", None)
+
+    def test_should_group_expired_decisions_by_context(self):
+        self.decisions.add("bandit", "arm1", {"country": "gr"})
+        self.decisions.add("bandit", "arm2", {"country": "nl"})
+        self.decisions.add("bandit", "arm2", {"country": "gr"})
+        self.clock.now = 20
+
+        expired = self.decisions.expire()
+
+        assert expired == [("bandit", {"country": "gr"}, ["arm1", "arm2"]),
+                           ("bandit", {"country": "nl"}, ["arm2"])]
+
+    def test_should_keep_unapplied_groups_pending(self):
+        self.decisions.add("bandit1", "arm1")
+        self.decisions.add("bandit2", "arm2")
+        self.clock.now = 20
+        applied = []
+
+        def apply(bandit_id, context, arm_ids):
+            if bandit_id == "bandit2":
+                raise KeyError(bandit_id)
+            applied.append((bandit_id, arm_ids))
+
+        with self.assertRaises(KeyError):
+            self.decisions.expire(apply=apply)
+
+        assert len(self.decisions) == 2
+        assert self.decisions.expire(apply=lambda *group: None) == [("bandit2", None, ["arm2"])]
+        assert applied == [("bandit1", ["arm1"])]
+        assert len(self.decisions) == 0
+
+
+class PulpoDecisionsTest(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.pulpo = Pulpo([BetaThompsonBandit("bandit", [BetaArm("arm1", 2, 1)])],
+                           decisions=DecisionTable(ttl=10, clock=self.clock))
+
+    def test_should_update_bandit_of_decision(self):
+        arm_id, decision_id = self.pulpo.choose("bandit", track=True)
+
+        self.pulpo.update_decision(decision_id, 1)
+
+        assert arm_id == "arm1"
+        assert self.pulpo.bandits["bandit"].arms_dict == {"arm1": BetaArm("arm1", 3, 2)}
+
+    def test_should_count_expired_decisions_as_zero_rewards(self):
+        decision_ids = [self.pulpo.choose("bandit", track=True)[1] for _ in range(3)]
+        self.pulpo.update_decision(decision_ids[0], 1)
+        self.clock.now = 11
+
+        assert self.pulpo.expire_decisions() == 2
+        assert self.pulpo.bandits["bandit"].arms_dict == {"arm1": BetaArm("arm1", 5, 2)}
+        with self.assertRaises(KeyError):
+            self.pulpo.update_decision(decision_ids[1], 1)
+
+    def test_should_keep_decision_pending_when_update_fails(self):
+        _, decision_id = self.pulpo.choose("bandit", track=True)
+        update = self.pulpo.update
+        self.pulpo.update = lambda *args: update("unknown_bandit", *args[1:])
+
+        with self.assertRaises(KeyError):
+            self.pulpo.update_decision(decision_id, 1)
+
+        self.pulpo.update = update
+        self.pulpo.update_decision(decision_id, 1)
+        assert self.pulpo.bandits["bandit"].arms_dict == {"arm1": BetaArm("arm1", 3, 2)}
+
+    def test_should_expire_decisions_with_array_contexts(self):
+        pulpo = Pulpo([LinUCB("linear", ["arm1", "arm2"], ["a", "b"])],
+                      decisions=DecisionTable(ttl=10, clock=self.clock))
+        for x in [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]]:
+            pulpo.choose("linear", np.array(x), track=True)
+        self.clock.now = 11
+
+        assert pulpo.expire_decisions() == 3
+        assert pulpo.choose("linear", np.array([1.0, 0.0]), track=True)[0] in ["arm1", "arm2"]
+        assert pulpo.bandits["linear"].expected_rewards([1.0, 0.0]).tolist() == [0.0, 0.0]
+        assert pulpo.bandits["linear"].inverse_covariances[:, 0, 0].sum() < 2
+
+    def test_should_create_decision_table_on_first_tracked_decision(self):
+        pulpo = Pulpo([BetaThompsonBandit("bandit", [BetaArm("arm1", 2, 1)])])
+
+        assert pulpo.choose("bandit") == "arm1"
+        assert pulpo.decisions is None
+        pulpo.choose("bandit", track=True)
+        assert len(pulpo.decisions) == 1
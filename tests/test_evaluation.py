@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.evaluation import LoggedEvents, evaluate, evaluate_many, read_logged_events
+
+
+def make_log(n_events: int, contextual: bool = False, seed: int = 0) -> LoggedEvents:
+    """
+    Uniformly random logging policy over two arms. arm1 always pays 1 and arm2 never pays, except in
+    the context country=us, where it is the other way round.
+    """
+    rng = np.random.default_rng(seed)
+    arms = rng.integers(2, size=n_events)
+    countries = rng.choice(["gr", "us"], size=n_events) if contextual else ["gr"] * n_events
+    rewards = np.array([float(arm == (country == "us")) for arm, country in zip(arms, countries)])
+    contexts = ([{"country": str(country)} for country in countries] if contextual
+                else [None] * n_events)
+    return LoggedEvents(np.array(["arm" + str(arm + 1) for arm in arms], dtype=object), rewards,
+                        np.full(n_events, 0.5), contexts)
+
+
+def make_greedy(seed: int = 0, **parameters):
+    return BanditFactory.make_bandit({"bandit_id": "bandit", "bandit_type": "epsilon_greedy",
+                                      "arm_ids": ["arm1", "arm2"],
+                                      "parameters": dict({"epsilon": 1.0, "seed": seed},
+                                                         **parameters)})
+
+
+class EvaluationTest(TestCase):
+
+    def test_should_estimate_value_of_greedy_policy(self):
+        result = evaluate(make_greedy(), [make_log(2000)], batch_size=10)
+
+        assert result.n_events == 2000
+        assert 900 < result.n_matched < 1100
+        assert result.replay == 1.0
+        assert abs(result.ips - 1.0) < 4 * result.ips_stderr
+        assert abs(result.dr - 1.0) < 0.05
+        assert result.dr_stderr < result.ips_stderr
+
+    def test_should_learn_per_context_with_contextual_bandit(self):
+        log = make_log(4000, contextual=True)
+
+        plain = evaluate(make_greedy(epsilon=0.8), [log])
+        contextual = evaluate(make_greedy(epsilon=0.8, max_contexts=4), [log])
+
+        assert abs(plain.dr - 0.5) < 0.05
+        assert contextual.dr > 0.85
+
+    def test_should_evaluate_candidates_from_log_file_in_parallel(self):
+        log = make_log(1000)
+        instructions = [{"bandit_id": "bandit", "bandit_type": "epsilon_greedy",
+                         "arm_ids": ["arm1", "arm2"],
+                         "parameters": {"epsilon": epsilon, "seed": 0}}
+                        for epsilon in [1.0, 0.5, 0.0]]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "log.jsonl")
+            with open(path, "w") as log_file:
+                for arm_id, reward, propensity in zip(log.arm_ids, log.rewards, log.propensities):
+                    log_file.write(json.dumps({"arm_id": arm_id, "reward": reward,
+                                               "propensity": propensity}) + "\n")
+
+            assert sum(len(chunk) for chunk in read_logged_events(path, chunk_size=300)) == 1000
+            results = evaluate_many(instructions, path, processes=2, chunk_size=300, batch_size=10)
+            expected = [evaluate(BanditFactory.make_bandit(instruction),
+                                 read_logged_events(path, chunk_size=300), 10)
+                        for instruction in instructions]
+
+        assert results == expected
+        assert results[0].ips > results[1].ips > results[2].ips
+
+    def test_should_only_reweight_matched_events(self):
+        log = make_log(200)
+        unmatched = LoggedEvents(np.array(["arm3"] * 200, dtype=object), np.ones(200),
+                                 np.zeros(200), [None] * 200)
+
+        with np.errstate(divide="raise", invalid="raise"):
+            result = evaluate(make_greedy(), [log, unmatched], batch_size=10)
+
+        assert result.n_events == 400
+        assert np.isfinite(result.ips) and np.isfinite(result.dr)
+
+    def test_should_reject_logged_events_without_positive_propensity(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "log.jsonl")
+            with open(path, "w") as log_file:
+                for propensity in [0.5, 0.5, 0.0]:
+                    log_file.write(json.dumps({"arm_id": "arm1", "reward": 1.0,
+                                               "propensity": propensity}) + "\n")
+
+            with self.assertRaises(ValueError):
+                list(read_logged_events(path, chunk_size=2))
@@ -0,0 +1,168 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BetaArm, EpsilonGreedyArm
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.feedback_log import FeedbackLog, LogReader, replay
+from pulpo.pulpo import Pulpo
+
+
+def make_bandits():
+    return [EGreedy("egreedy", [EpsilonGreedyArm("arm1", 1, 0), EpsilonGreedyArm("arm2", 1, 1)],
+                    epsilon=0.1),
+            BetaThompsonBandit("beta", [BetaArm("arm1", 2, 1), BetaArm("arm2", 2, 1)])]
+
+
+class FeedbackLogTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "feedback.log")
+        self.snapshot_path = os.path.join(self.directory.name, "snapshot.npz")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_should_read_back_appended_events(self):
+        log = FeedbackLog(self.path, sync_size=3)
+        log.append("egreedy", "arm1", 1.0, "payload")
+        log.append_many("beta", ["arm2", "arm1"], [0.0, 1.0])
+        log.append("egreedy", "arm2", 0.5)
+        log.close()
+
+        blocks = list(LogReader(self.path).blocks())
+
+        assert len(blocks) == 2
+        assert blocks[0].bandit_ids.tolist() == ["egreedy", "beta", "beta"]
+        assert blocks[0].arm_ids.tolist() == ["arm1", "arm2", "arm1"]
+        assert blocks[0].rewards.tolist() == [1.0, 0.0, 1.0]
+        assert blocks[0].payloads() == ["payload", None, None]
+        assert blocks[1].arm_ids.tolist() == ["arm2"]
+
+    def test_should_only_write_when_sync_size_is_reached(self):
+        log = FeedbackLog(self.path, sync_size=2, sync_interval=60)
+        log.append("egreedy", "arm1", 1.0)
+        size = os.path.getsize(self.path)
+
+        log.append("egreedy", "arm1", 1.0)
+
+        assert os.path.getsize(self.path) > size
+        log.close()
+
+    def test_should_write_after_sync_interval_without_further_appends(self):
+        log = FeedbackLog(self.path, sync_interval=0.01)
+        log.append("egreedy", "arm1", 1.0)
+
+        for _ in range(100):
+            if list(LogReader(self.path).blocks()):
+                break
+            time.sleep(0.01)
+
+        assert [block.arm_ids.tolist() for block in LogReader(self.path).blocks()] == [["arm1"]]
+        log.close()
+
+    def test_should_drop_torn_block_when_reopened(self):
+        log = FeedbackLog(self.path)
+        log.append("egreedy", "arm1", 1.0)
+        log.sync()
+        log.append("egreedy", "arm2", 1.0)
+        log.close()
+        with open(self.path, 'r+b') as log_file:
+            log_file.truncate(os.path.getsize(self.path) - 4)
+
+        log = FeedbackLog(self.path)
+        log.append("egreedy", "arm2", 0.0)
+        log.close()
+
+        blocks = list(LogReader(self.path).blocks())
+        assert [block.arm_ids.tolist() for block in blocks] == [["arm1"], ["arm2"]]
+        assert [block.rewards.tolist() for block in blocks] == [[1.0], [0.0]]
+
+    def test_should_replay_feedback_as_applied(self):
+        pulpo = Pulpo(make_bandits(), FeedbackLog(self.path, sync_size=2))
+        pulpo.update("egreedy", "arm1", 1.0)
+        pulpo.update_many("beta", ["arm1", "arm2", "arm1"], [1, 0, 1])
+        pulpo.reset("egreedy")
+        pulpo.update_many("egreedy", ["arm2", "arm2"], [1, 0])
+        pulpo.feedback_log.close()
+
+        bandits = {bandit.bandit_id: bandit for bandit in make_bandits()}
+        n_events = replay(bandits, self.path, chunk_size=2)
+
+        assert n_events == 7
+        for bandit_id, bandit in bandits.items():
+            assert bandit.arms_dict == pulpo.bandits[bandit_id].arms_dict
+
+    def test_should_replay_feedback_with_context(self):
+        config = '[{"bandit_id": "beta", "bandit_type": "beta_thompson", ' \
+                 '"arm_ids": ["arm1", "arm2"], "parameters": {"max_contexts": 8}}]'
+        pulpo = Pulpo.make_from_json(config)
+        pulpo.feedback_log = FeedbackLog(self.path)
+        pulpo.update("beta", "arm1", 1, context={"country": "gr"})
+        pulpo.update_many("beta", ["arm2", "arm2"], [1, 0], context={"country": "nl"})
+        pulpo.feedback_log.close()
+
+        recovered = Pulpo.make_from_json(config)
+        replay(recovered.bandits, self.path)
+
+        for context in ({"country": "gr"}, {"country": "nl"}):
+            assert recovered.bandits["beta"].context_bandit(context).arms_dict == \
+                pulpo.bandits["beta"].context_bandit(context).arms_dict
+        assert recovered.bandits["beta"].n_contexts == 2
+
+    def test_should_replay_feedback_with_feature_arrays(self):
+        config = '[{"bandit_id": "linear", "bandit_type": "lin_ucb", ' \
+                 '"arm_ids": ["arm1", "arm2"], "parameters": {"features": ["a", "b"]}}]'
+        pulpo = Pulpo.make_from_json(config)
+        pulpo.feedback_log = FeedbackLog(self.path)
+        pulpo.update("linear", "arm1", 1, context=np.array([1.0, 0.5]))
+        pulpo.update_many("linear", ["arm2", "arm1"], [1, 0], context=[0.0, 1.0])
+        pulpo.update("linear", "arm2", 1, context={"a": 2.0})
+        pulpo.feedback_log.close()
+
+        recovered = Pulpo.make_from_json(config)
+        replay(recovered.bandits, self.path)
+
+        np.testing.assert_allclose(recovered.bandits["linear"].coefficients,
+                                   pulpo.bandits["linear"].coefficients)
+
+    def test_should_recover_from_snapshot_and_log(self):
+        pulpo = Pulpo(make_bandits(), FeedbackLog(self.path))
+        pulpo.update_many("beta", ["arm1", "arm2"], [1, 0])
+        pulpo.compact(self.snapshot_path)
+        pulpo.update("beta", "arm1", 1)
+        pulpo.feedback_log.close()
+
+        recovered = Pulpo.recover(self.snapshot_path, self.path)
+
+        assert recovered.bandits["beta"].arms_dict == pulpo.bandits["beta"].arms_dict
+        assert recovered.feedback_log.generation == 1
+        recovered.feedback_log.close()
+
+    def test_should_not_replay_compacted_feedback_when_log_was_not_rotated(self):
+        pulpo = Pulpo(make_bandits(), FeedbackLog(self.path))
+        pulpo.update_many("beta", ["arm1", "arm2"], [1, 0])
+        pulpo.feedback_log.rotate = lambda: None
+        pulpo.compact(self.snapshot_path)
+        pulpo.update("beta", "arm1", 1)
+        pulpo.feedback_log.close()
+
+        recovered = Pulpo.recover(self.snapshot_path, self.path)
+
+        assert recovered.bandits["beta"].arms_dict == pulpo.bandits["beta"].arms_dict
+        assert recovered.feedback_log.generation == 0
+        recovered.feedback_log.close()
+
+    def test_should_reject_log_that_does_not_follow_snapshot(self):
+        pulpo = Pulpo(make_bandits(), FeedbackLog(self.path))
+        pulpo.compact(self.snapshot_path)
+        pulpo.compact(os.path.join(self.directory.name, "newer.npz"))
+        pulpo.feedback_log.close()
+
+        with self.assertRaises(ValueError):
+            Pulpo.recover(self.snapshot_path, self.path)
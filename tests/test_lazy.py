@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from pulpo.lazy import LazyBandits, index_config
+from pulpo.metrics import Metrics
+from pulpo.pulpo import Pulpo
+
+
+def make_config(n_bandits: int) -> list:
+    return [{"bandit_id": "user-é" + str(i), "bandit_type": "epsilon_greedy",
+             "arm_ids": ["arm1", "arm2"], "parameters": {"epsilon": 1.0}} for i in range(n_bandits)]
+
+
+class IndexConfigTest(TestCase):
+
+    def test_should_index_byte_ranges_of_instructions_across_blocks(self):
+        config = make_config(50)
+        encoded = json.dumps(config, ensure_ascii=False, indent=2).encode("utf-8")
+
+        for block_size in [5, 64, 1 << 20]:
+            index = index_config(io.BytesIO(encoded), block_size)
+
+            assert list(index) == [instruction["bandit_id"] for instruction in config]
+            for instruction, (offset, length) in zip(config, index.values()):
+                assert json.loads(encoded[offset:offset + length]) == instruction
+
+    def test_should_reject_truncated_config(self):
+        with self.assertRaises(ValueError):
+            index_config(io.BytesIO(json.dumps(make_config(2))[:-30].encode("utf-8")))
+
+
+class LazyBanditsTest(TestCase):
+
+    def test_should_build_bandits_on_first_use(self):
+        pulpo = Pulpo.make_from_json(json.dumps(make_config(1000)), lazy=True)
+
+        assert len(pulpo.bandits) == 1000
+        assert "user-é7" in pulpo.bandits
+        assert len(pulpo.bandits.resident) == 0
+        assert pulpo.choose("user-é7") in ["arm1", "arm2"]
+        assert list(pulpo.bandits.resident) == ["user-é7"]
+
+    def test_should_spill_evicted_bandits_and_restore_their_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "config.json")
+            with open(config_path, "w") as config_file:
+                json.dump(make_config(10), config_file)
+            spill_dir = os.path.join(directory, "spill")
+
+            pulpo = Pulpo.make_from_json_file(config_path, lazy=True, max_resident=2,
+                                              spill_dir=spill_dir)
+            for i in range(10):
+                pulpo.update("user-é" + str(i), "arm2", 1.0)
+
+            assert len(pulpo.bandits.resident) == 2
+            assert len(os.listdir(spill_dir)) == 8
+            assert pulpo.choose("user-é0") == "arm2"
+
+            pulpo.bandits.spill()
+            restarted = Pulpo.make_from_json_file(config_path, lazy=True, max_resident=2,
+                                                  spill_dir=spill_dir)
+            assert all(restarted.choose("user-é" + str(i)) == "arm2" for i in range(10))
+
+    def test_should_register_bandits_in_metrics_when_they_are_loaded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = Metrics()
+            bandits = LazyBandits.from_json(json.dumps(make_config(3)), max_resident=1,
+                                            spill_dir=directory)
+            pulpo = Pulpo(bandits, metrics=metrics)
+            for bandit_id in ["user-é0", "user-é0", "user-é1", "user-é0"]:
+                pulpo.choose(bandit_id)
+
+            snapshot = metrics.snapshot()
+            assert snapshot["user-é0"]["decisions"] == 3
+            assert snapshot["user-é0"]["explorations"] + snapshot["user-é0"]["exploitations"] == 3
+            assert snapshot["user-é1"]["explorations"] + snapshot["user-é1"]["exploitations"] == 1
+            assert "user-é2" not in snapshot
+            assert list(metrics._sources) == ["user-é0"]
+
+    def test_should_require_spill_dir_to_evict(self):
+        with self.assertRaises(ValueError):
+            LazyBandits.from_json(json.dumps(make_config(1)), max_resident=1)
+
+    def test_should_read_config_file_eagerly_by_default(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "config.json")
+            with open(config_path, "w") as config_file:
+                json.dump(make_config(3), config_file)
+
+            pulpo = Pulpo.make_from_json_file(config_path)
+
+        assert isinstance(pulpo.bandits, dict)
+        assert len(pulpo.bandits) == 3
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BetaArm, EpsilonGreedyArm
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.bandits.softmax import SoftmaxBandit
+from pulpo.mapped_pulpo import MappedPulpo
+
+
+class MappedPulpoTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state.pulpo")
+        self.bandits = [EGreedy("egreedy",
+                                [EpsilonGreedyArm("arm1", 1, 0), EpsilonGreedyArm("arm2", 1, 0)],
+                                1.0),
+                        BetaThompsonBandit("beta", [BetaArm("arm1", 2, 1), BetaArm("arm2", 2, 1)])]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_should_share_writer_updates_with_readers(self):
+        with MappedPulpo.create(self.path, self.bandits) as writer, \
+                MappedPulpo(self.path) as reader:
+            writer.update("egreedy", "arm2", 5)
+            writer.update_many("beta", ["arm1", "arm1"], [1, 1])
+
+            assert reader.choose("egreedy") == "arm2"
+            assert reader.bandits["egreedy"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 2, 5)
+            assert reader.bandits["beta"].arms_dict["arm1"] == BetaArm("arm1", 4, 3)
+            assert reader.version("beta") == 2
+
+    def test_should_serve_alias_table_decisions_from_readers(self):
+        bandits = [SoftmaxBandit("softmax",
+                                 [EpsilonGreedyArm("arm1", 1, 0), EpsilonGreedyArm("arm2", 1, 0)],
+                                 temperature=0.01)]
+        with MappedPulpo.create(self.path, bandits) as writer, MappedPulpo(self.path) as reader:
+            for _ in range(20):
+                writer.update("softmax", "arm2", 1)
+
+            assert {reader.choose("softmax") for _ in range(20)} == {"arm2"}
+            assert reader.choose_many("softmax", 3) == ["arm2"] * 3
+
+    def test_should_refuse_feedback_on_readers(self):
+        MappedPulpo.create(self.path, self.bandits).close()
+
+        with MappedPulpo(self.path) as reader:
+            with self.assertRaises(RuntimeError):
+                reader.update("egreedy", "arm1", 1)
+
+    def test_should_persist_state_across_openings(self):
+        with MappedPulpo.create(self.path, self.bandits) as writer:
+            writer.update("egreedy", "arm1", 3)
+            writer.reset("beta")
+
+        with MappedPulpo(self.path, writable=True) as writer:
+            assert writer.bandits["egreedy"].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 2, 3)
+            assert writer.version("beta") == 2
+            assert writer.choose_many("egreedy", 2) == ["arm1", "arm1"]
+
+    def test_should_keep_bandits_usable_after_close(self):
+        pulpo = MappedPulpo.create(self.path, self.bandits)
+        pulpo.update("egreedy", "arm2", 1)
+        pulpo.close()
+
+        pulpo.bandits["egreedy"].update_many(["arm2"], [1])
+
+        assert pulpo.bandits["egreedy"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 3, 2)
+
+    def test_should_reject_files_of_other_formats(self):
+        with open(self.path, "wb") as state_file:
+            state_file.write(b"not a state file")
+
+        with self.assertRaises(ValueError):
+            MappedPulpo(self.path)
+
+    def test_should_reject_empty_short_and_truncated_files(self):
+        MappedPulpo.create(self.path, self.bandits).close()
+        with open(self.path, "rb") as state_file:
+            content = state_file.read()
+
+        for size in [0, 5, 20, len(content) - 8]:
+            with open(self.path, "wb") as state_file:
+                state_file.write(content[:size])
+            with self.assertRaises(ValueError):
+                MappedPulpo(self.path)
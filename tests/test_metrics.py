@@ -0,0 +1,84 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BetaArm, EpsilonGreedyArm
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.metrics import Histogram, Metrics
+from pulpo.pulpo import Pulpo
+
+
+class HistogramTest(TestCase):
+
+    def test_should_count_observations_in_bucket_of_upper_bound(self):
+        histogram = Histogram([1e-6, 1e-3])
+
+        for value_ns in [500, 1000, 1001, 2000000]:
+            histogram.observe(value_ns)
+
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.count == 4
+        assert histogram.snapshot()['sum'] == 2002501 / 1e9
+
+
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        arms = [EpsilonGreedyArm(arm_id, 1, 0) for arm_id in ["arm1", "arm2"]]
+        self.metrics = Metrics()
+        self.pulpo = Pulpo([EGreedy("greedy", arms, epsilon=0.5, seed=0),
+                            BetaThompsonBandit("beta", [BetaArm("arm1", 2, 1)], seed=0)],
+                           metrics=self.metrics)
+
+    def test_should_count_decisions_and_feedback(self):
+        for _ in range(10):
+            self.pulpo.choose("greedy")
+        self.pulpo.choose_many("greedy", 5)
+        self.pulpo.update("greedy", "arm1", 1.0)
+        self.pulpo.update_many("greedy", ["arm1", "arm2"], [0.5, 0.0])
+
+        snapshot = self.metrics.snapshot()["greedy"]
+
+        assert snapshot["decisions"] == 15
+        assert snapshot["explorations"] + snapshot["exploitations"] == 15
+        assert snapshot["explorations"] > 0 and snapshot["exploitations"] > 0
+        assert snapshot["updates"] == 3
+        assert snapshot["reward_sum"] == 1.5
+        assert snapshot["choose_latency"]["count"] == 2 + 9
+        assert snapshot["update_latency"]["count"] == 2
+
+    def test_should_not_report_exploration_of_bandits_that_do_not_explore_explicitly(self):
+        self.pulpo.choose("beta")
+
+        snapshot = self.metrics.snapshot()["beta"]
+
+        assert snapshot["decisions"] == 1
+        assert snapshot["explorations"] is None
+
+    def test_should_export_prometheus_text_file(self):
+        self.pulpo.choose("greedy")
+        self.pulpo.update("greedy", "arm1", 1.0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pulpo.prom")
+            self.metrics.write_prometheus(path)
+            with open(path) as prometheus_file:
+                lines = prometheus_file.read().splitlines()
+            assert os.listdir(directory) == ["pulpo.prom"]
+
+        assert '# TYPE pulpo_decisions_total counter' in lines
+        assert 'pulpo_decisions_total{bandit_id="greedy"} 1' in lines
+        assert 'pulpo_reward_total{bandit_id="greedy"} 1.0' in lines
+        assert not any(line.startswith('pulpo_explorations_total{bandit_id="beta"}')
+                       for line in lines)
+        assert 'pulpo_update_latency_seconds_bucket{bandit_id="greedy",le="+Inf"} 1' in lines
+        assert 'pulpo_update_latency_seconds_count{bandit_id="greedy"} 1' in lines
+
+    def test_should_not_measure_without_metrics(self):
+        pulpo = Pulpo(list(self.pulpo.bandits.values()))
+
+        pulpo.choose("greedy")
+
+        assert pulpo.metrics is None
+        assert self.metrics.snapshot()["greedy"]["decisions"] == 0
@@ -0,0 +1,96 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BetaArm, EpsilonGreedyArm, GaussianArm
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.bandits.guassian_thompson import GaussianThompsonBandit
+from pulpo.bandits.lin_ucb import LinUCB
+from pulpo.persistence import save_bandits, load_bandits, load_snapshot
+
+
+class PersistenceTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "snapshot.npz")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_should_restore_bandits_with_their_state(self):
+        bandits = [EGreedy("egreedy",
+                           [EpsilonGreedyArm("arm1", 3, 2), EpsilonGreedyArm("arm2", 1, 0)],
+                           epsilon=0.7),
+                   GaussianThompsonBandit("gaussian", [GaussianArm("arm1", 4, 3, 5)]),
+                   BetaThompsonBandit("beta", [BetaArm("arm1", 10, 4), BetaArm("arm2", 6, 1)])]
+
+        save_bandits(bandits, self.path)
+        restored = load_bandits(self.path)
+
+        assert [type(bandit) for bandit in restored] == [EGreedy, GaussianThompsonBandit,
+                                                         BetaThompsonBandit]
+        assert restored[0].epsilon == 0.7
+        for bandit, restored_bandit in zip(bandits, restored):
+            assert restored_bandit.bandit_id == bandit.bandit_id
+            assert restored_bandit.arms_dict == bandit.arms_dict
+
+    def test_should_keep_learning_after_restore(self):
+        save_bandits([BetaThompsonBandit("beta", [BetaArm("arm1", 10, 4)])], self.path)
+
+        bandit = load_bandits(self.path)[0]
+        bandit.update_many(["arm1", "arm1"], [1, 0])
+
+        assert bandit.arms_dict == {"arm1": BetaArm("arm1", 12, 5)}
+
+    def test_should_replace_previous_snapshot(self):
+        save_bandits([BetaThompsonBandit("beta", [BetaArm("arm1", 10, 4)])], self.path)
+        save_bandits([BetaThompsonBandit("beta", [BetaArm("arm1", 20, 4)])], self.path)
+
+        assert load_bandits(self.path)[0].arms_dict == {"arm1": BetaArm("arm1", 20, 4)}
+        assert os.listdir(self.directory.name) == ["snapshot.npz"]
+
+    def test_should_describe_bandit_as_factory_instruction(self):
+        bandit = EGreedy("egreedy", [EpsilonGreedyArm("arm1", 3, 2)], epsilon=0.7)
+
+        instruction = BanditFactory.make_instruction(bandit)
+
+        assert instruction == {"bandit_id": "egreedy", "bandit_type": "epsilon_greedy",
+                               "arm_ids": ["arm1"], "parameters": {"epsilon": 0.7}}
+
+    def test_should_restore_contextual_bandit_with_its_contexts(self):
+        bandit = BanditFactory.make_bandit({"bandit_id": "beta", "bandit_type": "beta_thompson",
+                                            "arm_ids": ["arm1"], "parameters": {"max_contexts": 8}})
+        bandit.update_many(["arm1", "arm1"], [1, 1], context={"country": "gr"})
+
+        save_bandits([bandit], self.path)
+        restored = load_bandits(self.path)[0]
+
+        assert restored.n_contexts == 1
+        assert (restored.context_bandit({"country": "gr"}).arms_dict
+                == {"arm1": BetaArm("arm1", 4, 3)})
+        assert (restored.context_bandit({"country": "nl"}).arms_dict
+                == {"arm1": BetaArm("arm1", 2, 1)})
+
+    def test_should_restore_linear_bandit_with_its_regressions(self):
+        bandit = LinUCB("linear", ["arm1", "arm2"], ["a", "b"], alpha=0.5)
+        bandit.update_many(["arm1", "arm2", "arm1"], [1, 0, 1], {"a": 1, "b": 2})
+
+        save_bandits([bandit], self.path)
+        restored = load_bandits(self.path)[0]
+
+        assert restored.features == ["a", "b"]
+        assert restored.alpha == 0.5
+        assert (restored.coefficients == bandit.coefficients).all()
+        assert (restored.inverse_covariances == bandit.inverse_covariances).all()
+
+    def test_should_restore_metadata_saved_with_bandits(self):
+        save_bandits([BetaThompsonBandit("beta", [BetaArm("arm1", 10, 4)])], self.path,
+                     {"feedback_log": {"offset": 16}})
+
+        bandits, metadata = load_snapshot(self.path)
+
+        assert bandits[0].arms_dict == {"arm1": BetaArm("arm1", 10, 4)}
+        assert metadata == {"feedback_log": {"offset": 16}}
@@ -1,10 +1,14 @@
 import json
+import os
+import tempfile
 from typing import List
 from unittest import TestCase
 
 from pulpo.bandit_factory import BanditFactory
+from pulpo.bandits.contextual import ContextualBandit
 from pulpo.bandits.dataclasses import EpsilonGreedyArm
 from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.bandits.linear import LinearBandit
 from pulpo.pulpo import Pulpo
 
 
@@ -66,7 +70,8 @@ class PulpoTest(TestCase):
     def test_should_be_created_from_json(self):
         bandit_types: List[str] = list(BanditFactory.MAPPING.keys())
 
-        json_string = '[' + ", ".join([PulpoTest._get_default_config(type) for type in bandit_types]) + ']'
+        configs = [PulpoTest._get_default_config(type) for type in bandit_types]
+        json_string = '[' + ", ".join(configs) + ']'
 
         pulpo = Pulpo.make_from_json(json_string)
 
@@ -76,5 +81,106 @@ class PulpoTest(TestCase):
     def _get_default_config(bandit_type: str):
         default_values = {"bandit_id": "test_bandit_" + bandit_type, "bandit_type": bandit_type,
                           "arm_ids": ["arm1", "arm2", "arm3"]}
+        if issubclass(BanditFactory.MAPPING[bandit_type], LinearBandit):
+            # Linear bandits have no default features
+            default_values["parameters"] = {"features": ["a"]}
 
         return json.dumps(default_values)
+
+    def test_should_choose_many_arms(self):
+        arms = [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 10)]
+
+        pulpo = Pulpo([EGreedy("bandit1", arms, epsilon=1.0)])
+
+        assert pulpo.choose_many('bandit1', 3) == ['arm2', 'arm2', 'arm2']
+        assert pulpo.choose_many('bandit1', 2, distinct=True) == ['arm2', 'arm1']
+
+    def test_should_choose_for_a_batch_of_bandits(self):
+        bandit1 = EGreedy("bandit1",
+                          [EpsilonGreedyArm('arm1', 1, 0), EpsilonGreedyArm('arm2', 1, 10)],
+                          epsilon=1.0)
+        bandit2 = EGreedy("bandit2",
+                          [EpsilonGreedyArm('arm3', 1, 10), EpsilonGreedyArm('arm4', 1, 0)],
+                          epsilon=1.0)
+
+        pulpo = Pulpo([bandit1, bandit2])
+
+        assert pulpo.choose_batch(['bandit2', 'bandit1', 'bandit2']) == ['arm3', 'arm2', 'arm3']
+
+    def test_should_be_updated_with_many_feedback_events(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+
+        pulpo = Pulpo([EGreedy("bandit1", arms, epsilon=0.9),
+                       EGreedy("bandit2", arms, epsilon=0.9)])
+
+        pulpo.update_many("bandit1", ["arm1", "arm2", "arm1"], [1, 2, 3])
+        pulpo.update_events([("bandit2", "arm2", 5), ("bandit1", "arm2", 1),
+                             ("bandit2", "arm2", 5)])
+
+        assert pulpo.bandits['bandit1'].arms_dict == {"arm1": EpsilonGreedyArm("arm1", 3, 4),
+                                                      "arm2": EpsilonGreedyArm("arm2", 3, 3)}
+        assert pulpo.bandits['bandit2'].arms_dict == {"arm1": EpsilonGreedyArm("arm1", 1, 0),
+                                                      "arm2": EpsilonGreedyArm("arm2", 3, 10)}
+
+    def test_should_be_updated_with_contextual_feedback_events(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = Pulpo([ContextualBandit(EGreedy("bandit1", arms, epsilon=1.0))])
+
+        pulpo.update_events([("bandit1", "arm1", 1, {"country": "gr"}),
+                             ("bandit1", "arm2", 1, {"country": "nl"}), ("bandit1", "arm2", 1)])
+
+        bandit = pulpo.bandits["bandit1"]
+        assert (bandit.context_bandit({"country": "gr"}).arms_dict["arm1"]
+                == EpsilonGreedyArm("arm1", 2, 1))
+        assert (bandit.context_bandit({"country": "nl"}).arms_dict["arm2"]
+                == EpsilonGreedyArm("arm2", 2, 1))
+        assert bandit.context_bandit().arms_dict["arm2"] == EpsilonGreedyArm("arm2", 2, 1)
+        assert bandit.n_contexts == 3
+
+    def test_should_apply_valid_events_of_a_batch_with_failed_events(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = Pulpo([EGreedy("bandit1", arms, epsilon=0.9),
+                       EGreedy("bandit2", arms, epsilon=0.9)])
+
+        failures = pulpo.update_events([("bandit1", "arm1", 1), ("bandit2", "unknown", 1),
+                                        ("bandit2", "arm2", 1), ("unknown", "arm1", 1)])
+
+        assert ([(position, type(error)) for position, error in failures]
+                == [(1, KeyError), (3, KeyError)])
+        assert pulpo.bandits['bandit1'].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 2, 1)
+        assert pulpo.bandits['bandit2'].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 2, 1)
+
+    def test_should_not_apply_events_again_when_logging_them_fails(self):
+        class FailingLog:
+            def append_many(self, *args):
+                raise OSError("disk full")
+
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = Pulpo([EGreedy("bandit1", arms, epsilon=0.9)], feedback_log=FailingLog())
+
+        failures = pulpo.update_events([("bandit1", "arm1", 1), ("bandit1", "arm1", 1)])
+
+        assert ([(position, type(error)) for position, error in failures]
+                == [(0, OSError), (1, OSError)])
+        assert pulpo.bandits['bandit1'].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 3, 2)
+
+    def test_should_reject_columns_of_different_length(self):
+        pulpo = Pulpo([EGreedy("bandit1", [EpsilonGreedyArm("arm1", 1, 0)], epsilon=0.9)])
+
+        with self.assertRaises(ValueError):
+            pulpo.update_many("bandit1", ["arm1", "arm1"], [1])
+
+    def test_should_save_and_load_learned_state(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = Pulpo([EGreedy("bandit1", arms, epsilon=0.9),
+                       EGreedy("bandit2", arms, epsilon=0.5)])
+        pulpo.update("bandit2", "arm2", 100)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pulpo.npz")
+            pulpo.save(path)
+            restored = Pulpo.load(path)
+
+        assert list(restored.bandits.keys()) == ["bandit1", "bandit2"]
+        assert restored.bandits["bandit2"].epsilon == 0.5
+        assert restored.bandits["bandit2"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 2, 100)
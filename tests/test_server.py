@@ -0,0 +1,161 @@
+import asyncio
+import json
+from typing import List, Tuple
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.dataclasses import EpsilonGreedyArm
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.bandits.lin_ucb import LinUCB
+from pulpo.pulpo import Pulpo
+from pulpo.server import Coalescer, PulpoServer
+
+
+def make_pulpo() -> Pulpo:
+    return Pulpo([EGreedy(bandit_id,
+                          [EpsilonGreedyArm(arm_id, 1, 0) for arm_id in ["arm1", "arm2"]],
+                          epsilon=1.0)
+                  for bandit_id in ["bandit1", "bandit2"]])
+
+
+def encode(path: str, payload) -> bytes:
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    head = "POST {} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {}\r\n\r\n"
+    return head.format(path, len(body)).encode() + body
+
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, dict]:
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    length = next(int(line.split(":")[1]) for line in head
+                  if line.lower().startswith("content-length"))
+    return int(head[0].split(" ")[1]), json.loads(await reader.readexactly(length))
+
+
+async def exchange(port: int, requests: List[Tuple[str, object]]) -> List[Tuple[int, dict]]:
+    """
+    Sends all the requests pipelined on one connection, then reads the responses.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"".join(encode(path, payload) for path, payload in requests))
+    responses = [await read_response(reader) for _ in requests]
+    writer.close()
+    return responses
+
+
+class PulpoServerTest(TestCase):
+
+    def run_with_server(self, scenario, pulpo: Pulpo = None):
+        async def run():
+            async with PulpoServer(pulpo or make_pulpo(), port=0) as server:
+                return await scenario(server)
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+    def test_should_choose_and_update_over_keep_alive_connection(self):
+        async def scenario(server):
+            return await exchange(server.port, [
+                ("/update", {"bandit_id": "bandit1", "arm_id": "arm2", "reward": 1.0}),
+                ("/choose", {"bandit_id": "bandit1"}),
+                ("/choose_batch", {"bandit_ids": ["bandit1", "bandit2", "bandit1"]}),
+                ("/update_events",
+                 {"events": [["bandit2", "arm2", 1.0], ["bandit2", "arm1", 0.0]]}),
+                ("/choose", {"bandit_id": "bandit2", "context": {"country": "gr"}})])
+
+        responses = self.run_with_server(scenario)
+
+        # The pipelined requests are handled in the same iteration, so all the feedback precedes the
+        # decisions
+        assert responses == [(200, {}), (200, {"arm_id": "arm2"}),
+                             (200, {"arm_ids": ["arm2", "arm2", "arm2"]}),
+                             (200, {"failed": []}), (200, {"arm_id": "arm2"})]
+
+    def test_should_coalesce_concurrent_calls_of_a_bandit(self):
+        pulpo = make_pulpo()
+
+        async def scenario(server):
+            requests = [[("/update", {"bandit_id": "bandit1", "arm_id": "arm2", "reward": 1.0}),
+                         ("/choose", {"bandit_id": "bandit1"})]] * 20
+            responses = await asyncio.gather(*[exchange(server.port, pair) for pair in requests])
+            return responses, server.coalescer
+
+        responses, coalescer = self.run_with_server(scenario, pulpo)
+
+        assert all(response == [(200, {}), (200, {"arm_id": "arm2"})] for response in responses)
+        assert coalescer.n_calls == 40
+        assert coalescer.n_batches < 40
+        assert pulpo.bandits["bandit1"].arms_dict["arm2"].n == 21
+
+    def test_should_report_errors_and_apply_valid_feedback(self):
+        pulpo = make_pulpo()
+
+        async def scenario(server):
+            return await exchange(server.port, [
+                ("/choose", {"bandit_id": "unknown"}),
+                ("/choose", {"context": {}}),
+                ("/unknown", {}),
+                ("/choose", b"{not json"),
+                ("/update", {"bandit_id": "bandit1", "arm_id": "unknown", "reward": 1.0}),
+                ("/update", {"bandit_id": "bandit1", "arm_id": "arm1", "reward": 1.0})])
+
+        statuses = [status for status, _ in self.run_with_server(scenario, pulpo)]
+
+        assert statuses == [404, 400, 404, 400, 400, 200]
+        assert pulpo.bandits["bandit1"].arms_dict["arm1"].n == 2
+
+    def test_should_report_failed_events_and_apply_the_others(self):
+        pulpo = make_pulpo()
+
+        async def scenario(server):
+            return await exchange(server.port, [
+                ("/update_events",
+                 {"events": [["bandit1", "arm1", 1.0], ["bandit1", "unknown", 1.0],
+                             ["unknown", "arm1", 1.0], ["bandit2", "arm2", 1.0]]})])
+
+        [(status, body)] = self.run_with_server(scenario, pulpo)
+
+        assert status == 200
+        assert [failure["index"] for failure in body["failed"]] == [1, 2]
+        assert pulpo.bandits["bandit1"].arms_dict["arm1"].n == 2
+        assert pulpo.bandits["bandit2"].arms_dict["arm2"].n == 2
+
+    def test_should_apply_a_batch_sent_again_once(self):
+        pulpo = make_pulpo()
+        batch = {"batch_id": "batch1",
+                 "events": [["bandit1", "arm1", 1.0], ["bandit1", "unknown", 1.0]]}
+
+        async def scenario(server):
+            responses = await exchange(server.port,
+                                       [("/update_events", batch), ("/update_events", batch)])
+            return responses + await exchange(server.port, [("/update_events", batch)])
+
+        responses = self.run_with_server(scenario, pulpo)
+
+        assert [status for status, _ in responses] == [200, 200, 200]
+        assert all(body == responses[0][1] for _, body in responses)
+        assert [failure["index"] for failure in responses[0][1]["failed"]] == [1]
+        assert pulpo.bandits["bandit1"].arms_dict["arm1"].n == 2
+
+    def test_should_coalesce_calls_with_feature_array_contexts(self):
+        pulpo = Pulpo([LinUCB("linear", ["arm1", "arm2"], ["a", "b"])])
+        coalescer = Coalescer(pulpo)
+
+        async def scenario():
+            updates = [coalescer.update("linear", "arm2", 1.0, np.array([1.0, 0.0]))
+                       for _ in range(3)]
+            updates.append(coalescer.update("linear", "unknown", 1.0, np.array([1.0, 0.0])))
+            choices = [coalescer.choose("linear", np.array([1.0, 0.0])) for _ in range(2)]
+            return await asyncio.gather(*updates, *choices, return_exceptions=True)
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(scenario())
+        finally:
+            loop.close()
+
+        assert results[:3] == [None] * 3
+        assert isinstance(results[3], KeyError)
+        assert results[4:] == ["arm2", "arm2"]
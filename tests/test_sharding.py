@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import TestCase
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.contextual import ContextualBandit
+from pulpo.bandits.dataclasses import EpsilonGreedyArm, BetaArm
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.decisions import DecisionTable
+from pulpo.feedback_log import FeedbackLog, LogReader
+from pulpo.metrics import Metrics
+from pulpo.pulpo import Pulpo
+from pulpo.sharding import ShardedPulpo, shard_of
+
+
+def serve_attached(handle, results):
+    with ShardedPulpo.attach(handle) as pulpo:
+        results.put(pulpo.choose_many("bandit0", 3))
+        pulpo.update("bandit0", "arm2", 10)
+
+
+class ShardedPulpoTest(TestCase):
+
+    def _make_bandits(self):
+        return [EGreedy("bandit" + str(i),
+                        [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]], epsilon=1.0)
+                for i in range(6)]
+
+    def test_should_partition_bandits_by_stable_hash(self):
+        assert shard_of("bandit1", 4) == shard_of("bandit1", 4)
+        assert {shard_of("bandit" + str(i), 4) for i in range(100)} == {0, 1, 2, 3}
+
+    def test_should_apply_feedback_in_owner_shards_and_serve_choose_from_shared_state(self):
+        with ShardedPulpo(self._make_bandits(), n_shards=3, batch_size=4) as pulpo:
+            for i in range(6):
+                pulpo.update_many("bandit" + str(i), ["arm2"] * (i + 1), [1.0] * (i + 1))
+            pulpo.update("bandit0", "arm1", 10)
+            pulpo.flush()
+
+            assert pulpo.choose("bandit0") == "arm1"
+            assert pulpo.choose_many("bandit5", 2) == ["arm2", "arm2"]
+            assert pulpo.bandits["bandit0"].arms_dict == {"arm1": EpsilonGreedyArm("arm1", 2, 10),
+                                                          "arm2": EpsilonGreedyArm("arm2", 2, 1)}
+            assert pulpo.bandits["bandit5"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 7, 6)
+
+    def test_should_not_lose_feedback_across_batches(self):
+        bandits = [BetaThompsonBandit("bandit" + str(i),
+                                      [BetaArm("arm1", 2, 1), BetaArm("arm2", 2, 1)])
+                   for i in range(4)]
+
+        with ShardedPulpo(bandits, n_shards=2, batch_size=16) as pulpo:
+            pulpo.update_events(("bandit" + str(i % 4), "arm" + str(i % 2 + 1), i % 3 == 0)
+                                for i in range(1000))
+            pulpo.flush()
+            pulpo.choose_batch(["bandit0", "bandit1", "bandit2", "bandit3"])
+
+            arms = [arm for bandit in pulpo.bandits.values() for arm in bandit.arms_dict.values()]
+            assert sum(arm.n for arm in arms) == 2 * 8 + 1000
+            assert sum(arm.n_rewards for arm in arms) == 8 + 334
+
+    def test_should_reject_unknown_arm_without_dropping_the_batch(self):
+        with ShardedPulpo(self._make_bandits(), n_shards=2, batch_size=4) as pulpo:
+            pulpo.update("bandit0", "arm1", 1.0)
+            with self.assertRaises(KeyError):
+                pulpo.update("bandit0", "unknown", 1.0)
+            with self.assertRaises(KeyError):
+                pulpo.update_many("bandit0", ["arm2", "unknown"], [1.0, 1.0])
+            pulpo.update("bandit0", "arm2", 1.0)
+            pulpo.flush()
+            pulpo.choose("bandit0")
+
+            assert pulpo.bandits["bandit0"].arms_dict == {"arm1": EpsilonGreedyArm("arm1", 2, 1),
+                                                          "arm2": EpsilonGreedyArm("arm2", 2, 1)}
+
+    def test_should_reset_in_owner_shard(self):
+        with ShardedPulpo(self._make_bandits(), n_shards=2) as pulpo:
+            pulpo.update("bandit1", "arm1", 5)
+            pulpo.reset("bandit1")
+            pulpo.flush()
+            pulpo.choose("bandit1")
+
+            assert pulpo.bandits["bandit1"].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 0.001, 0)
+
+    def test_should_save_latest_shared_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pulpo.npz")
+            with ShardedPulpo(self._make_bandits(), n_shards=2) as pulpo:
+                pulpo.update("bandit3", "arm2", 5)
+                pulpo.save(path)
+
+            restored = Pulpo.load(path)
+
+        assert restored.bandits["bandit3"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 2, 5)
+
+    def test_should_log_and_measure_feedback(self):
+        metrics = Metrics()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "feedback.log")
+            with ShardedPulpo(self._make_bandits(), n_shards=2, feedback_log=FeedbackLog(path),
+                              metrics=metrics) as pulpo:
+                pulpo.update("bandit1", "arm1", 1)
+                pulpo.update_many("bandit2", ["arm2", "arm2"], [1, 0])
+                pulpo.reset("bandit2")
+                pulpo.feedback_log.close()
+            blocks = list(LogReader(path).blocks())
+
+        assert metrics.snapshot()["bandit1"]["updates"] == 1
+        assert metrics.snapshot()["bandit2"]["reward_sum"] == 1
+        assert ([arm_id for block in blocks for arm_id in block.arm_ids]
+                == ["arm1", "arm2", "arm2", None])
+
+    def test_should_serve_decisions_from_attached_processes(self):
+        with ShardedPulpo(self._make_bandits(), n_shards=2) as pulpo:
+            pulpo.update("bandit0", "arm1", 1)
+            pulpo.flush()
+            context = multiprocessing.get_context()
+            results = context.Queue()
+            process = context.Process(target=serve_attached, args=(pulpo.handle(), results))
+            process.start()
+            arm_ids = results.get(timeout=10)
+            process.join()
+            pulpo.flush()
+
+            assert arm_ids == ["arm1", "arm1", "arm1"]
+            assert pulpo.choose("bandit0") == "arm2"
+            assert pulpo.bandits["bandit0"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 2, 10)
+
+    def test_should_track_decisions(self):
+        clock = [0.0]
+        with ShardedPulpo(self._make_bandits(), n_shards=2) as pulpo:
+            pulpo.decisions = DecisionTable(ttl=10, clock=lambda: clock[0])
+            arm_id, decision_id = pulpo.choose("bandit1", track=True)
+            pulpo.choose("bandit2", track=True)
+            pulpo.update_decision(decision_id, 1)
+            clock[0] = 20
+            assert pulpo.expire_decisions() == 1
+            pulpo.flush()
+            pulpo.choose_batch(["bandit1", "bandit2"])
+
+            assert pulpo.bandits["bandit1"].arms_dict[arm_id] == EpsilonGreedyArm(arm_id, 2, 1)
+            assert pulpo.bandits["bandit2"].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 2, 0)
+            assert len(pulpo.decisions) == 0
+
+    def test_should_apply_contextual_feedback_in_owner_shards(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        bandits = [ContextualBandit(EGreedy("bandit" + str(i), arms, epsilon=1.0))
+                   for i in range(2)]
+
+        with ShardedPulpo(bandits, n_shards=2) as pulpo:
+            pulpo.update("bandit0", "arm2", 1, context={"country": "gr"})
+            pulpo.update_events([("bandit0", "arm1", 1, {"country": "nl"}),
+                                 ("bandit1", "arm2", 1, {"country": "nl"})])
+            pulpo.flush()
+
+            assert pulpo.choose("bandit0", {"country": "gr"}) == "arm2"
+            assert pulpo.choose("bandit0", {"country": "nl"}) == "arm1"
+            assert pulpo.choose("bandit1", {"country": "nl"}) == "arm2"
+            assert pulpo.bandits["bandit1"].context_bandit({"country": "nl"}).arms_dict["arm2"] == \
+                EpsilonGreedyArm("arm2", 2, 1)
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandit_factory import BanditFactory
+from pulpo.simulation import BernoulliRewards, GaussianRewards, simulate
+
+
+def make_bandit(bandit_type: str, n_arms: int = 2, **parameters):
+    return BanditFactory.make_bandit({"bandit_id": "bandit", "bandit_type": bandit_type,
+                                      "arm_ids": ["arm" + str(i) for i in range(n_arms)],
+                                      "parameters": parameters})
+
+
+class SimulationTest(TestCase):
+
+    def test_should_learn_best_arm_with_sublinear_regret(self):
+        for bandit_type in ["epsilon_greedy", "beta_thompson", "gaussian_thompson"]:
+            result = simulate(make_bandit(bandit_type), BernoulliRewards([0.2, 0.8]), n_steps=500,
+                              n_replicas=200, seed=0)
+
+            assert result.regret.shape == (500,)
+            assert np.all(np.diff(result.regret) >= 0)
+            assert result.regret[-1] < 0.25 * 500 * 0.6, bandit_type
+            assert result.pulls.shape == (200, 2)
+            assert np.all(result.pulls.sum(axis=1) == 500)
+            assert result.pulls[:, 1].mean() > result.pulls[:, 0].mean()
+
+    def test_should_have_more_regret_with_more_exploration(self):
+        rewards = BernoulliRewards([0.2, 0.8])
+
+        exploring = simulate(make_bandit("epsilon_greedy", epsilon=0.5), rewards, n_steps=300,
+                             seed=0)
+        exploiting = simulate(make_bandit("epsilon_greedy", epsilon=0.95), rewards, n_steps=300,
+                              seed=0)
+
+        assert exploring.regret[-1] > exploiting.regret[-1] + 2 * exploring.regret_stderr[-1]
+
+    def test_should_give_each_replica_its_own_problem(self):
+        means = np.array([[0.0, 1.0], [1.0, 0.0]])
+
+        result = simulate(make_bandit("gaussian_thompson"), GaussianRewards(means, stds=[0.1, 0.1]),
+                          n_steps=200, n_replicas=2, seed=0)
+
+        assert result.pulls[0, 1] > result.pulls[0, 0]
+        assert result.pulls[1, 0] > result.pulls[1, 1]
+
+    def test_should_be_reproducible_and_leave_bandit_untouched(self):
+        bandit = make_bandit("beta_thompson", n_arms=5)
+        state = bandit.store.data.copy()
+        rewards = BernoulliRewards(np.linspace(0, 1, 5))
+
+        first = simulate(bandit, rewards, n_steps=50, n_replicas=10, seed=1)
+        second = simulate(bandit, rewards, n_steps=50, n_replicas=10, seed=1)
+
+        np.testing.assert_array_equal(first.regret, second.regret)
+        np.testing.assert_array_equal(bandit.store.data, state)
+
+    def test_should_reject_unsupported_bandit(self):
+        with self.assertRaises(ValueError):
+            simulate(make_bandit("lin_ucb", features=["x"]), BernoulliRewards([0.5, 0.5]),
+                     n_steps=1)
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.dataclasses import BetaArm, GaussianArm
+from pulpo.bandits.guassian_thompson import GaussianThompsonBandit
+from pulpo.state_layout import StateLayout, read_consistent, write_locked
+
+
+class StateLayoutTest(TestCase):
+
+    def setUp(self):
+        self.bandits = [BetaThompsonBandit("beta", [BetaArm("arm1", 2, 1), BetaArm("arm2", 3, 1)]),
+                        GaussianThompsonBandit("gaussian", [GaussianArm("arm1", 2, 2, 2)])]
+
+    def test_should_place_versions_before_state_arrays(self):
+        layout = StateLayout.from_bandits(self.bandits)
+
+        assert layout.n_items == 2 + 4 + 3
+        assert layout.nbytes == 8 * 9
+        assert layout.arrays == {"beta": {"arm_statistics": (2, (2, 2))},
+                                 "gaussian": {"arm_statistics": (6, (3, 1))}}
+
+    def test_should_round_trip_through_dict(self):
+        layout = StateLayout.from_bandits(self.bandits)
+
+        copy = StateLayout.from_dict(layout.to_dict())
+
+        assert copy.bandit_ids == layout.bandit_ids and copy.arrays == layout.arrays
+
+    def test_should_bind_bandits_to_buffer_views(self):
+        layout = StateLayout.from_bandits(self.bandits)
+        buffer = bytearray(layout.nbytes)
+
+        layout.write(self.bandits, buffer)
+        layout.bind(self.bandits, buffer)
+        self.bandits[0].update_many(["arm2"], [1])
+
+        np.testing.assert_array_equal(layout.views(buffer, "beta")["arm_statistics"],
+                                      [[2, 4], [1, 2]])
+        np.testing.assert_array_equal(layout.views(buffer, "gaussian")["arm_statistics"],
+                                      [[2], [2], [2]])
+
+    def test_should_read_state_written_under_version_lock(self):
+        layout = StateLayout.from_bandits(self.bandits)
+        buffer = bytearray(layout.nbytes)
+        layout.write(self.bandits, buffer)
+        versions = layout.versions(buffer)
+        shared = layout.views(buffer, "beta")
+
+        write_locked(versions, 0, lambda: shared["arm_statistics"].__setitem__((0, 0), 10))
+        snapshot = {"arm_statistics": np.zeros((2, 2))}
+        version = read_consistent(versions, 0, shared, snapshot)
+
+        assert version == 2
+        np.testing.assert_array_equal(snapshot["arm_statistics"], [[10, 3], [1, 1]])
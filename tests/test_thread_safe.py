@@ -0,0 +1,162 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from pulpo.bandits.dataclasses import EpsilonGreedyArm, BetaArm
+from pulpo.bandits.beta_thompson import BetaThompsonBandit
+from pulpo.bandits.contextual import ContextualBandit
+from pulpo.bandits.epsilon_greedy import EGreedy
+from pulpo.bandits.lin_ucb import LinUCB
+from pulpo.decisions import DecisionTable
+from pulpo.feedback_log import FeedbackLog, LogReader
+from pulpo.metrics import Metrics
+from pulpo.thread_safe import ThreadSafePulpo
+
+
+class ThreadSafePulpoTest(TestCase):
+
+    def test_should_not_lose_updates_from_concurrent_threads(self):
+        arm_names = ["arm" + str(i) for i in range(5)]
+        pulpo = ThreadSafePulpo([BetaThompsonBandit("bandit1",
+                                                    [BetaArm(name, 2, 1) for name in arm_names])])
+        num_threads = 8
+        num_updates = 2000
+
+        def serve():
+            for _ in range(num_updates):
+                arm_id = pulpo.choose("bandit1")
+                pulpo.update("bandit1", arm_id, 1)
+
+        threads = [threading.Thread(target=serve) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pulpo.flush()
+
+        arms = pulpo.bandits["bandit1"].arms_dict.values()
+        assert sum(arm.n for arm in arms) == 2 * len(arm_names) + num_threads * num_updates
+        assert sum(arm.n_rewards for arm in arms) == len(arm_names) + num_threads * num_updates
+
+    def test_should_buffer_updates_until_merge_size(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = ThreadSafePulpo([EGreedy("bandit1", arms, epsilon=0.9)], merge_size=3)
+
+        pulpo.update("bandit1", "arm1", 1)
+        pulpo.update("bandit1", "arm1", 1)
+        assert pulpo.bandits["bandit1"].arms_dict["arm1"].n == 1
+
+        pulpo.update("bandit1", "arm2", 1)
+        assert pulpo.bandits["bandit1"].arms_dict == {"arm1": EpsilonGreedyArm("arm1", 3, 2),
+                                                      "arm2": EpsilonGreedyArm("arm2", 2, 1)}
+
+    def test_should_reject_unknown_arm_before_buffering_it(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        with tempfile.TemporaryDirectory() as directory:
+            log = FeedbackLog(os.path.join(directory, "feedback.log"))
+            pulpo = ThreadSafePulpo([EGreedy("bandit1", arms, epsilon=0.9)], merge_size=3,
+                                    feedback_log=log)
+
+            pulpo.update("bandit1", "arm1", 1)
+            with self.assertRaises(KeyError):
+                pulpo.update("bandit1", "unknown", 1)
+            pulpo.update("bandit1", "arm2", 1)
+            pulpo.update("bandit1", "arm2", 1)
+            log.close()
+
+            assert pulpo.bandits["bandit1"].arms_dict == {"arm1": EpsilonGreedyArm("arm1", 2, 1),
+                                                          "arm2": EpsilonGreedyArm("arm2", 3, 2)}
+            assert ([arm_id for block in LogReader(log.path).blocks() for arm_id in block.arm_ids]
+                    == ["arm1", "arm2", "arm2"])
+
+    def test_should_merge_pending_updates_on_flush_and_update_many(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = ThreadSafePulpo([EGreedy("bandit1", arms, epsilon=0.9)], merge_size=100)
+
+        pulpo.update("bandit1", "arm1", 1)
+        pulpo.update_many("bandit1", ["arm2"], [5])
+        assert pulpo.bandits["bandit1"].arms_dict["arm1"].n == 2
+
+        pulpo.update("bandit1", "arm2", 1)
+        pulpo.flush()
+        assert pulpo.bandits["bandit1"].arms_dict["arm2"] == EpsilonGreedyArm("arm2", 3, 6)
+
+    def test_should_discard_pending_updates_on_reset(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = ThreadSafePulpo([EGreedy("bandit1", arms, epsilon=0.9)], merge_size=100)
+
+        pulpo.update("bandit1", "arm1", 1)
+        pulpo.reset("bandit1")
+        pulpo.flush()
+
+        assert pulpo.bandits["bandit1"].arms_dict["arm1"] == EpsilonGreedyArm("arm1", 0.001, 0)
+
+    def test_should_log_and_measure_feedback(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        metrics = Metrics()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "feedback.log")
+            pulpo = ThreadSafePulpo([EGreedy("bandit1", arms, epsilon=0.9)], merge_size=100,
+                                    feedback_log=FeedbackLog(path), metrics=metrics)
+
+            pulpo.update("bandit1", "arm1", 1)
+            pulpo.update_many("bandit1", ["arm2", "arm2"], [1, 0])
+            pulpo.feedback_log.close()
+            blocks = list(LogReader(path).blocks())
+
+        assert metrics.snapshot()["bandit1"]["updates"] == 3
+        assert metrics.snapshot()["bandit1"]["reward_sum"] == 2
+        assert [arm_id for block in blocks for arm_id in block.arm_ids] == ["arm1", "arm2", "arm2"]
+
+    def test_should_track_decisions(self):
+        clock = [0.0]
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = ThreadSafePulpo([ContextualBandit(EGreedy("bandit1", arms, epsilon=1.0))],
+                                merge_size=100)
+        pulpo.decisions = DecisionTable(ttl=10, clock=lambda: clock[0])
+
+        arm_id, decision_id = pulpo.choose("bandit1", {"country": "gr"}, track=True)
+        pulpo.choose("bandit1", {"country": "nl"}, track=True)
+        pulpo.update_decision(decision_id, 1)
+        clock[0] = 20
+        assert pulpo.expire_decisions() == 1
+        pulpo.flush()
+
+        bandit = pulpo.bandits["bandit1"]
+        assert (bandit.context_bandit({"country": "gr"}).arms_dict[arm_id]
+                == EpsilonGreedyArm(arm_id, 2, 1))
+        assert (bandit.context_bandit({"country": "nl"}).arms_dict[arm_id]
+                == EpsilonGreedyArm(arm_id, 2, 0))
+        assert len(pulpo.decisions) == 0
+
+    def test_should_merge_contextual_feedback_per_context(self):
+        arms = [EpsilonGreedyArm(name, 1, 0) for name in ["arm1", "arm2"]]
+        pulpo = ThreadSafePulpo([ContextualBandit(EGreedy("bandit1", arms, epsilon=1.0))],
+                                merge_size=100)
+
+        pulpo.update("bandit1", "arm1", 1, context={"country": "gr"})
+        pulpo.update("bandit1", "arm2", 1, context={"country": "nl"})
+        pulpo.update("bandit1", "arm1", 1, context={"country": "gr"})
+        pulpo.flush()
+        pulpo.update_many("bandit1", ["arm2"], [1], context={"country": "nl"})
+
+        bandit = pulpo.bandits["bandit1"]
+        assert (bandit.context_bandit({"country": "gr"}).arms_dict["arm1"]
+                == EpsilonGreedyArm("arm1", 3, 2))
+        assert (bandit.context_bandit({"country": "nl"}).arms_dict["arm2"]
+                == EpsilonGreedyArm("arm2", 3, 2))
+        assert pulpo.choose("bandit1", {"country": "nl"}) == "arm2"
+
+    def test_should_merge_linear_feedback_per_context(self):
+        pulpo = ThreadSafePulpo([LinUCB("bandit1", ["arm1", "arm2"], ["a", "b"])], merge_size=100)
+
+        pulpo.update("bandit1", "arm1", 1, context={"a": 1.0})
+        pulpo.update("bandit1", "arm2", 1, context=[0.0, 1.0])
+        pulpo.update("bandit1", "arm1", 1, context={"a": 1.0})
+        pulpo.flush()
+
+        bandit = pulpo.bandits["bandit1"]
+        assert bandit.expected_rewards({"a": 1.0})[0] > 0.5
+        assert bandit.expected_rewards([0.0, 1.0])[1] > 0
+        assert pulpo.choose("bandit1", [0.0, 1.0]) == "arm2"